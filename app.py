@@ -22,6 +22,7 @@ import settings
 import utils
 from instance import instance_manager
 from instance.game_instance import GameInstance
+from installation.prefetcher import global_prefetcher
 from localizer import _, global_translator
 from logger import log
 from ui.tabs.tab_about import AboutTab
@@ -79,6 +80,8 @@ class LocalizationInstallerApp:
         self._center_main_window()
 
         self.master.after(100, self.run_initial_detection)
+        # (新增) 空闲时在后台预取新的本地化子版本
+        global_prefetcher.schedule(self.master)
 
     def _setup_styles(self, is_dark: bool, font_family: str):
         """定义自定义字体和样式"""
@@ -0,0 +1,87 @@
+#  LKInstaller Next, a blazing-speed localization installer for Mir Korabley
+#  Copyright (C) 2025 LocalizedKorabli <localizedkorabli@outlook.com>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+先写临时文件、再 os.replace 的原子写入。
+落盘 (fsync) 的时机由设置 download.fsync 决定:
+    'full'      数据文件与元数据都在替换前 fsync (默认)
+    'metadata'  只 fsync 元数据 JSON
+    'none'      不 fsync，由操作系统决定何时落盘
+"""
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any
+
+FSYNC_FULL = 'full'
+FSYNC_METADATA = 'metadata'
+FSYNC_NONE = 'none'
+FSYNC_POLICIES = (FSYNC_FULL, FSYNC_METADATA, FSYNC_NONE)
+
+
+def get_fsync_policy() -> str:
+    import settings  # Local import
+    policy = settings.global_settings.get('download.fsync', FSYNC_FULL)
+    return policy if policy in FSYNC_POLICIES else FSYNC_FULL
+
+
+def get_temp_path(dest: Path) -> Path:
+    """dest 的临时兄弟文件: global.mo -> global.mo.tmp"""
+    return dest.with_name(dest.name + '.tmp')
+
+
+def _fsync_path(path: Path):
+    # Windows 上 FlushFileBuffers 需要写权限，因此以 r+b 打开
+    with open(path, 'r+b') as f:
+        os.fsync(f.fileno())
+
+
+def _fsync_dir(path: Path):
+    """使目录项 (重命名) 落盘。Windows 不支持打开目录，直接跳过。"""
+    if os.name == 'nt':
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def replace_file(src: Path, dest: Path, metadata: bool = False):
+    """按落盘策略 fsync src，然后原子地替换 dest。metadata 表示 src 是元数据文件。"""
+    policy = get_fsync_policy()
+    sync = policy == FSYNC_FULL or (metadata and policy == FSYNC_METADATA)
+    if sync:
+        _fsync_path(src)
+    os.replace(src, dest)
+    if sync:
+        _fsync_dir(dest.parent)
+
+
+def write_json(path: Path, data: Any):
+    """原子地写入 JSON (元数据)。临时文件名唯一，并发写入同一文件时不会互相覆盖未写完的内容。"""
+    fd, temp_name = tempfile.mkstemp(prefix=path.name + '.', suffix='.tmp', dir=path.parent)
+    temp_path = Path(temp_name)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        replace_file(temp_path, path, metadata=True)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,158 @@
+#  LKInstaller Next, a blazing-speed localization installer for Mir Korabley
+#  Copyright (C) 2025 LocalizedKorabli <localizedkorabli@outlook.com>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+instance.pe_version 的基准测试：在合成的 PE 文件上比较读取 ProductVersion 的耗时。
+
+    python benchmarks/bench_pe_version.py [重复次数]
+
+合成文件只包含 DOS 头、PE32+ 头、一个 .rsrc 节与 VS_VERSIONINFO，版本资源之前用稀疏的空洞
+模拟真实 Korabli64.exe 的体积。对比:
+- mmap:       pe_version.read_product_version (只访问文件头与资源所在的页面)
+- full read:  读入整个文件后用相同的解析器解析 (模拟逐字节读取整个文件的实现)
+- win32api:   GetFileVersionInfo (仅在安装了 pywin32 的 Windows 上)
+"""
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from instance import pe_version  # noqa: E402
+
+FIXTURE_SIZES_MB = [1, 64, 256]
+SECTION_VIRTUAL_ADDRESS = 0x1000
+FILE_ALIGNMENT = 0x200
+
+
+def _pad4(data: bytes) -> bytes:
+    return data + b'\0' * (-len(data) % 4)
+
+
+def _block(key: str, value: bytes = b'', value_length: int = 0, text: bool = False,
+           children: List[bytes] = ()) -> bytes:
+    """构造一个 VS_VERSIONINFO 块 (wLength 不含末尾的对齐填充)。"""
+    data = struct.pack('<HHH', 0, value_length, 1 if text else 0) + (key + '\0').encode('utf-16-le')
+    data = _pad4(data) + value
+    if children:
+        data = _pad4(data) + b''.join(_pad4(child) for child in children)
+    return struct.pack('<H', len(data)) + data[2:]
+
+
+def _string(key: str, value: str) -> bytes:
+    return _block(key, (value + '\0').encode('utf-16-le'), len(value) + 1, text=True)
+
+
+def build_version_info(product_version: str) -> bytes:
+    parts = [int(p) for p in product_version.replace(',', '.').split('.')]
+    ms, ls = (parts[0] << 16) | parts[1], (parts[2] << 16) | (parts[3] & 0xffff)
+    fixed = struct.pack('<13I', 0xFEEF04BD, 0x10000, ms, ls, ms, ls, 0x3F, 0, 0x40004, 1, 0, 0, 0)
+    string_table = _block('040904b0', text=True, children=[
+        _string('CompanyName', 'Lesta Games'),
+        _string('FileVersion', product_version),
+        _string('ProductVersion', product_version),
+    ])
+    return _block('VS_VERSION_INFO', fixed, len(fixed), children=[
+        _block('StringFileInfo', text=True, children=[string_table]),
+        _block('VarFileInfo', text=True, children=[
+            _block('Translation', struct.pack('<HH', 0x0409, 0x04B0), 4)
+        ]),
+    ])
+
+
+def build_resource_section(product_version: str) -> bytes:
+    """资源目录: RT_VERSION -> ID 1 -> 语言 0x409 -> 数据项 -> VS_VERSIONINFO。"""
+    version_info = build_version_info(product_version)
+
+    def directory(entry_id: int, offset_to_data: int) -> bytes:
+        return struct.pack('<IIHHHH', 0, 0, 0, 0, 0, 1) + struct.pack('<II', entry_id, offset_to_data)
+
+    section = directory(16, 0x80000000 | 0x18)
+    section += directory(1, 0x80000000 | 0x30)
+    section += directory(0x409, 0x48)
+    section += struct.pack('<IIII', SECTION_VIRTUAL_ADDRESS + 0x58, len(version_info), 0, 0)
+    return section + version_info
+
+
+def build_synthetic_pe(path: Path, product_version: str, size_mb: int):
+    """写入一个合成的 PE32+ 文件，版本资源位于约 size_mb MB 处。"""
+    rsrc = build_resource_section(product_version)
+    raw_pointer = max(FILE_ALIGNMENT, size_mb * 1024 * 1024 - len(rsrc)) // FILE_ALIGNMENT * FILE_ALIGNMENT
+    raw_size = len(rsrc) + (-len(rsrc) % FILE_ALIGNMENT)
+
+    dos = b'MZ' + b'\0' * 0x3A + struct.pack('<I', 0x40)
+    coff = struct.pack('<HHIIIHH', 0x8664, 1, 0, 0, 0, 240, 0x22)
+    optional = bytearray(240)
+    struct.pack_into('<H', optional, 0, 0x20B)
+    struct.pack_into('<I', optional, 108, 16)
+    struct.pack_into('<II', optional, 112 + 2 * 8, SECTION_VIRTUAL_ADDRESS, len(rsrc))
+    section = struct.pack('<8sIIIIIIHHI', b'.rsrc', len(rsrc), SECTION_VIRTUAL_ADDRESS, raw_size, raw_pointer,
+                          0, 0, 0, 0, 0x40000040)
+
+    with open(path, 'wb') as f:
+        f.write(dos + b'PE\0\0' + coff + bytes(optional) + section)
+        # 中间留作稀疏的空洞，不占用磁盘空间
+        f.seek(raw_pointer)
+        f.write(rsrc + b'\0' * (raw_size - len(rsrc)))
+
+
+def _read_full(path: Path) -> str:
+    data = path.read_bytes()
+    with mmap.mmap(-1, len(data)) as buffer:
+        buffer.write(data)
+        return pe_version._read_product_version(buffer)
+
+
+def _read_win32(path: Path) -> str:
+    import win32api
+    lang, codepage = win32api.GetFileVersionInfo(str(path), '\\VarFileInfo\\Translation')[0]
+    return win32api.GetFileVersionInfo(str(path), f'\\StringFileInfo\\{lang:04x}{codepage:04x}\\ProductVersion')
+
+
+def _bench(func: Callable[[Path], str], path: Path, repeat: int, expected: str) -> float:
+    assert func(path) == expected, f"{func.__name__} returned an unexpected version"
+    began = time.perf_counter()
+    for _ in range(repeat):
+        func(path)
+    return (time.perf_counter() - began) / repeat
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    readers = {'mmap': pe_version.read_product_version, 'full read': _read_full}
+    try:
+        import win32api  # noqa: F401
+        readers['win32api'] = _read_win32
+    except ImportError:
+        pass
+
+    expected = '25,11,0,8828504'
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'size':>8}  " + "  ".join(f"{name:>12}" for name in readers))
+        for size_mb in FIXTURE_SIZES_MB:
+            path = Path(tmp) / f"Korabli64_{size_mb}.exe"
+            build_synthetic_pe(path, expected, size_mb)
+            timings = [_bench(func, path, repeat, expected) for func in readers.values()]
+            print(f"{size_mb:>6}MB  " + "  ".join(f"{t * 1000:>10.3f}ms" for t in timings))
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
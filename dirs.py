@@ -16,6 +16,9 @@
 import os
 import sys
 from pathlib import Path
+from typing import Optional
+
+from file_lock import FileLock
 
 base_path: Path = Path(getattr(sys, '_MEIPASS', os.path.abspath(os.path.dirname(__file__))))
 
@@ -30,6 +33,21 @@ except Exception:
     APP_DATA_PATH = base_path / 'lki_data'
 
 CACHE_DIR = APP_DATA_PATH / 'cache'
-TEMP_DIR = APP_DATA_PATH / 'temp'
+TEMP_ROOT = APP_DATA_PATH / 'temp'
+# (已修改) 每个进程使用独立的临时目录 temp/<pid>，同时运行的多个进程不会互相清除工作文件
+TEMP_DIR = TEMP_ROOT / str(os.getpid())
 SETTINGS_DIR = APP_DATA_PATH / 'settings'
-LOG_DIR = APP_DATA_PATH / 'logs'
\ No newline at end of file
+LOG_DIR = APP_DATA_PATH / 'logs'
+
+# 进程存活期间一直持有的锁文件；其他进程据此判断该临时目录是否已被遗弃
+ALIVE_LOCK_NAME = '.alive'
+_alive_lock: Optional[FileLock] = None
+
+
+def ensure_temp_dir():
+    """创建本进程的临时目录，并在进程退出前一直持有其中的 .alive 锁。"""
+    global _alive_lock
+    os.makedirs(TEMP_DIR, exist_ok=True)
+    if _alive_lock is None:
+        _alive_lock = FileLock(TEMP_DIR / ALIVE_LOCK_NAME)
+        _alive_lock.acquire(blocking=False)
\ No newline at end of file
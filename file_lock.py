@@ -0,0 +1,100 @@
+#  LKInstaller Next, a blazing-speed localization installer for Mir Korabley
+#  Copyright (C) 2025 LocalizedKorabli <localizedkorabli@outlook.com>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import os
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+try:
+    import msvcrt
+except ImportError:  # 非 Windows
+    msvcrt = None
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# 等待锁时的轮询间隔 (秒)
+POLL_INTERVAL = 0.2
+
+
+class FileLock:
+    """
+    跨进程的排他文件锁 (Windows 使用 msvcrt.locking，其他系统使用 fcntl.flock)。
+    锁随文件句柄关闭 (包括进程异常退出) 自动释放；锁文件本身会保留。
+    两者都不可用时退化为不加锁。
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    @property
+    def locked(self) -> bool:
+        return self._fd is not None
+
+    @staticmethod
+    def _try_lock(fd: int) -> bool:
+        try:
+            if msvcrt:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            elif fcntl:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    def acquire(self, blocking: bool = True, is_cancelled: Callable[[], bool] = lambda: False) -> bool:
+        """
+        获取锁。blocking 为 False 时只尝试一次；
+        否则一直等待，直到获得锁或 is_cancelled() 为真 (此时返回 False)。
+        """
+        if self._fd is not None:
+            return True
+        os.makedirs(self.path.parent, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        while True:
+            if self._try_lock(fd):
+                self._fd = fd
+                return True
+            if not blocking or is_cancelled():
+                os.close(fd)
+                return False
+            time.sleep(POLL_INTERVAL)
+
+    def release(self):
+        if self._fd is None:
+            return
+        fd, self._fd = self._fd, None
+        try:
+            if msvcrt:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+            elif fcntl:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
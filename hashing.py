@@ -0,0 +1,163 @@
+#  LKInstaller Next, a blazing-speed localization installer for Mir Korabley
+#  Copyright (C) 2025 LocalizedKorabli <localizedkorabli@outlook.com>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+统一的文件哈希服务 (SHA-256)，供安装、缓存校验与组件验证共用。
+
+- 使用 hashlib.file_digest (Python 3.11+) 或 1 MB 缓冲区读取文件；
+- 按 (路径, 大小, mtime_ns, inode) 记住最近的结果，文件未变化时不再重复读取
+  (需要确认数据完好的校验应传入 memo=False)；
+- sha256_files() 在线程池中并发计算多个文件，线程数取自设置 hashing.workers (0 表示自动)；
+- get_stats() 返回累计的文件数、字节数、耗时与命中次数。
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from logger import log
+
+BUFFER_SIZE = 1024 * 1024
+# 记住的结果数上限 (按最近使用淘汰)
+MEMO_CAPACITY = 4096
+# 自动模式下的最大线程数：固态硬盘可以并发读取，机械硬盘并发过多反而更慢
+AUTO_MAX_WORKERS = 4
+
+
+def _digest_file(path: Path) -> str:
+    with open(path, 'rb') as f:
+        if hasattr(hashlib, 'file_digest'):
+            return hashlib.file_digest(f, 'sha256').hexdigest()
+        sha256_hash = hashlib.sha256()
+        buffer = bytearray(BUFFER_SIZE)
+        view = memoryview(buffer)
+        while True:
+            size = f.readinto(buffer)
+            if not size:
+                break
+            sha256_hash.update(view[:size])
+        return sha256_hash.hexdigest()
+
+
+class HashingService:
+    """带结果缓存与统计的并发哈希计算。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._memo: 'OrderedDict[Tuple[str, int, int, int], str]' = OrderedDict()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._workers = 0
+        self.files_hashed = 0
+        self.bytes_hashed = 0
+        self.seconds = 0.0
+        self.memo_hits = 0
+
+    @staticmethod
+    def get_worker_count() -> int:
+        import settings  # Local import
+        try:
+            workers = int(settings.global_settings.get('hashing.workers', 0) or 0)
+        except (TypeError, ValueError):
+            workers = 0
+        if workers <= 0:
+            workers = min(AUTO_MAX_WORKERS, os.cpu_count() or 1)
+        return workers
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        workers = self.get_worker_count()
+        with self._lock:
+            if self._executor is None or self._workers != workers:
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False)
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='hashing')
+                self._workers = workers
+            return self._executor
+
+    def sha256(self, path: Path, memo: bool = True) -> Optional[str]:
+        """计算文件的 SHA-256；文件不存在或无法读取时返回 None。"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        key = (str(path), stat.st_size, stat.st_mtime_ns, stat.st_ino)
+        if memo:
+            with self._lock:
+                digest = self._memo.get(key)
+                if digest is not None:
+                    self._memo.move_to_end(key)
+                    self.memo_hits += 1
+                    return digest
+
+        began = time.perf_counter()
+        try:
+            digest = _digest_file(path)
+        except OSError as e:
+            log(f"Error calculating SHA256 for {path}: {e}")
+            return None
+        elapsed = time.perf_counter() - began
+
+        with self._lock:
+            self.files_hashed += 1
+            self.bytes_hashed += stat.st_size
+            self.seconds += elapsed
+            self._memo[key] = digest
+            self._memo.move_to_end(key)
+            while len(self._memo) > MEMO_CAPACITY:
+                self._memo.popitem(last=False)
+        return digest
+
+    def sha256_files(self, paths: Iterable[Path], memo: bool = True) -> Dict[Path, Optional[str]]:
+        """并发计算多个文件的 SHA-256，返回 路径 -> 哈希 (无法读取的为 None)。"""
+        paths = list(dict.fromkeys(paths))
+        if len(paths) <= 1:
+            return {path: self.sha256(path, memo) for path in paths}
+
+        before = self.get_stats()
+        began = time.perf_counter()
+        digests = list(self._get_executor().map(lambda p: self.sha256(p, memo), paths))
+        after = self.get_stats()
+        log(f"Hashed {len(paths)} files in {time.perf_counter() - began:.2f}s "
+            f"({after['bytes_hashed'] - before['bytes_hashed']} bytes read, "
+            f"{after['memo_hits'] - before['memo_hits']} unchanged)")
+        return dict(zip(paths, digests))
+
+    def get_stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                'files_hashed': self.files_hashed,
+                'bytes_hashed': self.bytes_hashed,
+                'seconds': self.seconds,
+                'memo_hits': self.memo_hits,
+                'throughput': self.bytes_hashed / self.seconds if self.seconds else 0.0,
+            }
+
+
+global_hashing_service = HashingService()
+
+
+def sha256_file(path: Path, memo: bool = True) -> Optional[str]:
+    return global_hashing_service.sha256(path, memo)
+
+
+def sha256_files(paths: Iterable[Path], memo: bool = True) -> Dict[Path, Optional[str]]:
+    return global_hashing_service.sha256_files(paths, memo)
+
+
+def get_stats() -> Dict[str, float]:
+    return global_hashing_service.get_stats()
@@ -0,0 +1,266 @@
+#  LKInstaller Next, a blazing-speed localization installer for Mir Korabley
+#  Copyright (C) 2025 LocalizedKorabli <localizedkorabli@outlook.com>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+缓存容量管理：按设置 cache.max_size_mb 限制 blobs 的总大小，超出时按最近使用时间 (LRU) 淘汰条目。
+
+- 条目的最近使用时间记录在索引的 'last_used' 中 (见 cache_store.touch)；
+- 任一实例当前已安装的 MO 子版本、EE 与字体对应的条目不会被淘汰；
+- 多个条目可能引用同一数据文件，只有最后一个引用被淘汰时才会删除数据文件；
+- 没有任何条目引用的数据文件 (被新版本替换的 EE / 字体、中断的提交) 超过 ORPHAN_GRACE 后直接删除；
+  删除数据文件前持有 cache_store.lock_blobs() 并重新确认没有条目引用它；
+- 旧版本留在原目录结构中的数据文件 (global.mo / ee.zip) 计入容量，并随条目一起删除。
+"""
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+import installation.cache_store as cache_store
+import installation.installation_utils as utils
+import settings
+from logger import log
+from network import downloader
+
+MB = 1024 * 1024
+# 无人引用的数据文件保留的时间 (秒)，避免删除其他进程正在提交的数据
+ORPHAN_GRACE = 3600
+
+# 缓存根目录 -> (数据文件名, 索引文件名)
+ENTRY_LAYOUT = {
+    utils.L10N_CACHE: ("global.mo", "file_info.json"),
+    utils.EE_CACHE: ("ee.zip", "file_info.json"),
+    utils.FONTS_CACHE: ("srcwagon_mk.mkmod", "cache_info.json"),
+}
+
+_enforce_lock = threading.Lock()
+
+
+class CacheEntry:
+    """一个索引条目。"""
+
+    def __init__(self, root: Path, data_path: Path, info_path: Path, info: Dict):
+        self.root = root
+        self.data_path = data_path
+        self.info_path = info_path
+        self.sha256: str = info['file_sha256']
+        self.last_used: float = info.get('last_used') or info_path.stat().st_mtime
+
+
+def get_max_size() -> int:
+    """容量上限 (字节)，0 表示不限制。"""
+    try:
+        return max(0, int(settings.global_settings.get('cache.max_size_mb', 0))) * MB
+    except (TypeError, ValueError):
+        return 0
+
+
+def scan_entries() -> List[CacheEntry]:
+    entries = []
+    for root, (data_name, info_name) in ENTRY_LAYOUT.items():
+        if not root.is_dir():
+            continue
+        for info_path in root.rglob(info_name):
+            try:
+                with open(info_path, 'r', encoding='utf-8') as f:
+                    info = json.load(f)
+                if isinstance(info, dict) and info.get('file_sha256'):
+                    entries.append(CacheEntry(root, info_path.parent / data_name, info_path, info))
+            except (OSError, ValueError) as e:
+                log(f"Skipping unreadable cache index {info_path}: {e}")
+    return entries
+
+
+def scan_blobs() -> Dict[str, Path]:
+    if not cache_store.BLOB_DIR.is_dir():
+        return {}
+    return {path.name: path for path in cache_store.BLOB_DIR.glob('*/*') if path.is_file()}
+
+
+def get_usage() -> int:
+    """blobs 与尚未迁移的旧版本数据文件的总大小 (字节)。"""
+    total = sum(_get_legacy_size(entry) for entry in scan_entries())
+    for path in scan_blobs().values():
+        try:
+            total += path.stat().st_size
+        except OSError:
+            pass
+    return total
+
+
+def get_pinned_info_paths() -> Set[Path]:
+    """任一实例当前已安装的 MO、EE 与字体对应的索引文件。"""
+    from instance.instance_manager import global_instance_manager
+
+    pinned: Set[Path] = set()
+    for instance_data in global_instance_manager.get_all().values():
+        instance_path = Path(instance_data.get('path', ''))
+        instance_type = instance_data.get('type', 'production')
+        info_root = instance_path / 'lki' / 'info'
+        if not info_root.is_dir():
+            continue
+        for info_file in info_root.glob('*/installation_info.json'):
+            try:
+                with open(info_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            version, sub, lang_code = data.get('version'), data.get('l10n_sub_version'), data.get('lang_code')
+            if not sub or not lang_code or not version or not version.endswith(f".{sub}"):
+                continue
+            major = version[:-len(sub) - 1]
+            pinned.add(utils.L10N_CACHE / lang_code / major / sub / "file_info.json")
+            files = data.get('files', {})
+            if files.get('ee'):
+                pinned.add(utils.EE_CACHE / lang_code / instance_type / "file_info.json")
+            if files.get('font'):
+                pinned.add(utils.FONTS_CACHE / "cache_info.json")
+    return pinned
+
+
+def _remove_file(path: Path) -> bool:
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return True
+    except OSError as e:
+        log(f"Could not remove {path}: {e}")
+        return False
+
+
+def _evict_entry(entry: CacheEntry) -> bool:
+    """
+    删除条目的索引、旧版本留在原目录结构中的数据文件与下载残留；条目正在被其他进程使用时返回 False。
+    锁文件保留：删除后，等待旧锁文件的进程与新建锁文件的进程会同时认为自己持有锁。
+    """
+    lock = cache_store.lock_entry(entry.data_path)
+    if not lock.acquire(blocking=False):
+        return False
+    try:
+        cache_store.invalidate(entry.info_path)
+        _remove_file(entry.data_path)
+        downloader.discard_partial(entry.data_path)
+    finally:
+        lock.release()
+    return True
+
+
+def _get_legacy_size(entry: CacheEntry) -> int:
+    """旧版本留在原目录结构中、尚未迁移到 blobs 的数据文件的大小。"""
+    try:
+        return entry.data_path.stat().st_size
+    except OSError:
+        return 0
+
+
+def _remove_unreferenced_blobs(candidates: Dict[str, Path], min_age: float = 0) -> int:
+    """
+    持有 blobs 锁，重新扫描索引后删除仍然无人引用、且至少 min_age 秒未修改的数据文件。
+    扫描之后其他进程可能已经提交了引用同一内容的条目，因此不能只依据之前的扫描结果。
+    返回释放的字节数。
+    """
+    if not candidates:
+        return 0
+    freed = 0
+    with cache_store.lock_blobs():
+        referenced = {entry.sha256 for entry in scan_entries()}
+        now = time.time()
+        for sha256, path in candidates.items():
+            if sha256 in referenced:
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if now - stat.st_mtime >= min_age and _remove_file(path):
+                freed += stat.st_size
+    return freed
+
+
+def enforce_budget(max_size: Optional[int] = None) -> int:
+    """
+    删除过期的无人引用的数据文件，并按 LRU 淘汰条目直到不超过容量上限。
+    返回释放的字节数。同一时间只运行一次。
+    """
+    if max_size is None:
+        max_size = get_max_size()
+    if not _enforce_lock.acquire(blocking=False):
+        return 0
+    try:
+        return _enforce_budget(max_size)
+    except Exception as e:
+        log(f"Cache eviction failed: {e}")
+        return 0
+    finally:
+        _enforce_lock.release()
+
+
+def _enforce_budget(max_size: int) -> int:
+    entries = scan_entries()
+    blobs = scan_blobs()
+    references: Dict[str, int] = {}
+    for entry in entries:
+        references[entry.sha256] = references.get(entry.sha256, 0) + 1
+
+    total = 0
+    now = time.time()
+    orphans: Dict[str, Path] = {}
+    for sha256, path in blobs.items():
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        total += stat.st_size
+        if sha256 not in references and now - stat.st_mtime > ORPHAN_GRACE:
+            orphans[sha256] = path
+    legacy_sizes = {entry.info_path: _get_legacy_size(entry) for entry in entries}
+    total += sum(legacy_sizes.values())
+
+    freed = _remove_unreferenced_blobs(orphans, ORPHAN_GRACE)
+    total -= freed
+
+    if not max_size or total <= max_size:
+        if freed:
+            log(f"Cache cleanup: removed {freed} bytes of unreferenced data")
+        return freed
+
+    pinned = get_pinned_info_paths()
+    candidates = sorted((e for e in entries if e.info_path not in pinned), key=lambda e: e.last_used)
+    evicted = 0
+    for entry in candidates:
+        if total <= max_size:
+            break
+        if not _evict_entry(entry):
+            continue
+        evicted += 1
+        total -= legacy_sizes[entry.info_path]
+        freed += legacy_sizes[entry.info_path]
+        references[entry.sha256] -= 1
+        blob_path = blobs.get(entry.sha256)
+        if references[entry.sha256] == 0 and blob_path:
+            blob_freed = _remove_unreferenced_blobs({entry.sha256: blob_path})
+            total -= blob_freed
+            freed += blob_freed
+
+    log(f"Cache eviction: removed {evicted} entries, freed {freed} bytes, "
+        f"{total} bytes in use (limit {max_size})")
+    return freed
+
+
+def enforce_budget_in_background():
+    threading.Thread(target=enforce_budget, daemon=True).start()
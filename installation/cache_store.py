@@ -0,0 +1,230 @@
+#  LKInstaller Next, a blazing-speed localization installer for Mir Korabley
+#  Copyright (C) 2025 LocalizedKorabli <localizedkorabli@outlook.com>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+内容寻址的缓存存储。
+
+数据文件按 SHA-256 存放在 CACHE_DIR/blobs/<前两位>/<sha256> 中，相同内容只保存一份
+(例如正式服与测试服相同的 EE 压缩包、不同子版本目录中相同的 global.mo)。
+原有的目录结构 (i18n/<语言>/<主版本>/<子版本>、ee/<语言>/<类型>、fonts) 中只保留索引条目
+(例如 file_info.json)，记录数据的 SHA-256 与数据文件的指纹 (大小、mtime_ns、inode)。
+命中缓存时只比对指纹；指纹不符 (例如文件被外部修改或替换)、距离上次完整校验超过
+cache.verify_interval_days 天、或以 --paranoid 运行时，才会重新计算完整哈希。
+
+提交顺序:
+    1. 删除旧索引，使旧条目失效；
+    2. 数据文件 os.replace 到 blobs 中 (已有相同内容时直接丢弃新文件)；
+    3. 原子地写入新索引。
+任何一步中断都只会留下没有索引的条目 (视为未缓存) 或暂时无人引用的数据文件，
+不会留下索引与数据不符的条目。
+
+下载器仍然把文件写入原目录结构中的数据路径 (例如 global.mo，以便续传)，由 commit() 移入 blobs；
+旧版本直接保存在原目录结构中的数据文件会在第一次读取时迁移。
+
+多个进程可能同时需要同一条目，检查与写入条目时应持有 lock_entry() 返回的跨进程锁；
+引用 blobs 中数据文件的步骤 (commit、adopt) 与删除数据文件的步骤还会持有 lock_blobs()。
+"""
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+import atomic_io
+import settings
+from dirs import CACHE_DIR
+from file_lock import FileLock
+from hashing import sha256_file
+from logger import log
+
+BLOB_DIR = CACHE_DIR / 'blobs'
+DAY = 24 * 3600
+
+# 由 --paranoid 设置：每次命中缓存都重新计算完整哈希
+paranoid = False
+
+
+def get_blob_path(sha256: str) -> Path:
+    return BLOB_DIR / sha256[:2] / sha256
+
+
+def get_entry_path(info: Dict[str, Any]) -> Path:
+    """load() 返回的索引对应的数据文件。"""
+    return get_blob_path(info['file_sha256'])
+
+
+def lock_entry(data_path: Path) -> FileLock:
+    """返回缓存条目的跨进程锁 (锁文件: global.mo -> global.mo.lock)，由调用者获取与释放。"""
+    return FileLock(data_path.with_name(data_path.name + '.lock'))
+
+
+def lock_blobs() -> FileLock:
+    """
+    blobs 的跨进程锁：commit() 与 adopt() 持有它直到新索引写入完成，
+    cache_manager 删除无人引用的数据文件前也要获取它，避免删除刚被其他进程引用的数据文件。
+    """
+    return FileLock(BLOB_DIR / 'blobs.lock')
+
+
+def invalidate(info_path: Path):
+    """删除索引，使条目失效。"""
+    try:
+        os.remove(info_path)
+    except FileNotFoundError:
+        pass
+
+
+def _store_blob(src: Path, sha256: str) -> Path:
+    """将 src 移入 blobs；已有大小一致的相同内容时删除 src。"""
+    blob_path = get_blob_path(sha256)
+    try:
+        if blob_path.stat().st_size == src.stat().st_size:
+            os.remove(src)
+            return blob_path
+    except FileNotFoundError:
+        pass
+    os.makedirs(blob_path.parent, exist_ok=True)
+    atomic_io.replace_file(src, blob_path)
+    return blob_path
+
+
+def _get_fingerprint(path: Path) -> Dict[str, int]:
+    stat = path.stat()
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'inode': stat.st_ino}
+
+
+def _is_verify_due(info: Dict[str, Any]) -> bool:
+    if paranoid:
+        return True
+    try:
+        interval = float(settings.global_settings.get('cache.verify_interval_days', 0)) * DAY
+    except (TypeError, ValueError):
+        interval = 0
+    return interval > 0 and time.time() - info.get('verified', 0) > interval
+
+
+def commit(data_path: Path, info_path: Path, info: Dict[str, Any], temp_path: Optional[Path] = None) -> Path:
+    """
+    提交缓存条目，info 中必须包含 'file_sha256'。
+    数据取自 temp_path (不为 None 时) 或下载器已经提交到位的 data_path。
+    返回 blobs 中的数据文件。
+    """
+    src = temp_path if temp_path is not None else data_path
+    invalidate(info_path)
+    with lock_blobs():
+        blob_path = _store_blob(src, info['file_sha256'])
+        if src != data_path and data_path.is_file():
+            # 旧版本留在原目录结构中的数据文件
+            os.remove(data_path)
+        # SHA-256 由调用者在写入时同步计算，提交时视为刚刚完成完整校验
+        now = time.time()
+        atomic_io.write_json(info_path, {**info, **_get_fingerprint(blob_path), 'verified': now, 'last_used': now})
+    return blob_path
+
+
+def adopt(info_path: Path, sha256: str, size: Optional[int] = None) -> Optional[Path]:
+    """
+    blobs 中已有内容为 sha256 的数据文件 (例如其他语言或实例类型的条目) 时，
+    校验后直接为其建立索引，无需下载。返回数据文件；不存在或校验失败时返回 None。
+    """
+    blob_path = get_blob_path(sha256)
+    with lock_blobs():
+        try:
+            fingerprint = _get_fingerprint(blob_path)
+        except OSError:
+            return None
+        if size is not None and fingerprint['size'] != size:
+            return None
+        if sha256_file(blob_path) != sha256:
+            return None
+        now = time.time()
+        invalidate(info_path)
+        atomic_io.write_json(info_path, {'file_sha256': sha256, **fingerprint, 'verified': now, 'last_used': now})
+    return blob_path
+
+
+def touch(info_path: Path):
+    """记录条目的最近使用时间 (供 cache_manager 按 LRU 淘汰)。"""
+    try:
+        with open(info_path, 'r', encoding='utf-8') as f:
+            info = json.load(f)
+        if isinstance(info, dict):
+            atomic_io.write_json(info_path, {**info, 'last_used': time.time()})
+    except (OSError, ValueError) as e:
+        log(f"Could not update cache index {info_path}: {e}")
+
+
+def load(data_path: Path, info_path: Path) -> Optional[Dict[str, Any]]:
+    """
+    读取缓存条目的索引；数据文件缺失、大小不符或完整校验失败时返回 None。
+    数据文件可以通过 get_entry_path() 取得。
+    旧版本直接保存在 data_path 的条目会在校验完整哈希后迁移到 blobs。
+    """
+    if not info_path.is_file():
+        return None
+    try:
+        with open(info_path, 'r', encoding='utf-8') as f:
+            info = json.load(f)
+    except (OSError, ValueError) as e:
+        log(f"Invalid cache metadata {info_path}: {e}")
+        return None
+    if not isinstance(info, dict) or not info.get('file_sha256'):
+        return None
+
+    if not data_path.is_file():
+        return _verify_blob(info_path, info)
+
+    # (已修改) data_path 也可能是下载器刚写入、尚未提交的新数据 (例如提交前中断的 EE 更新)，
+    # 大小相同并不说明内容相同，因此迁移前总是校验完整哈希 (每个旧条目只需一次)。
+    # 不一致时 data_path 不属于该索引，索引仍可能指向 blobs 中有效的数据文件
+    size = data_path.stat().st_size
+    if info.get('size', size) != size or sha256_file(data_path, memo=False) != info['file_sha256']:
+        return _verify_blob(info_path, info)
+    try:
+        commit(data_path, info_path, info)
+    except OSError as e:
+        log(f"Could not migrate cache entry {data_path}: {e}")
+        return None
+    return {**info, 'size': size}
+
+
+def _verify_blob(info_path: Path, info: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """指纹一致时直接信任；否则 (或需要定期校验时) 重新计算完整哈希并更新指纹。"""
+    blob_path = get_entry_path(info)
+    try:
+        fingerprint = _get_fingerprint(blob_path)
+    except OSError:
+        return None
+    if fingerprint['size'] != info.get('size'):
+        return None
+    if all(info.get(key) == value for key, value in fingerprint.items()) and not _is_verify_due(info):
+        return info
+
+    # 需要确认数据完好，不使用记住的结果
+    if sha256_file(blob_path, memo=False) != info['file_sha256']:
+        log(f"Cache data {blob_path} is corrupted, discarding")
+        # 删除损坏的数据文件，否则重新下载后提交时会被当作已有的相同内容
+        try:
+            os.remove(blob_path)
+        except OSError as e:
+            log(f"Could not remove {blob_path}: {e}")
+        return None
+
+    info = {**info, **fingerprint, 'verified': time.time()}
+    try:
+        atomic_io.write_json(info_path, info)
+    except OSError as e:
+        log(f"Could not update cache index {info_path}: {e}")
+    return info
@@ -13,11 +13,13 @@
 #
 #  You should have received a copy of the GNU Affero General Public License
 #  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import asyncio
 import json
 import os
 import queue
 import shutil
 import threading
+import time
 import tkinter as tk
 import zipfile
 from pathlib import Path
@@ -30,31 +32,74 @@ from typing import List, Dict, Callable, Optional, Set, Tuple
 import requests
 
 # (移除 _ 的顶层导入)
+import atomic_io
 import settings
+from file_lock import FileLock
+from hashing import sha256_file, get_stats as get_hashing_stats
+import installation.cache_manager as cache_manager
+import installation.cache_store as cache_store
 import installation.installation_utils as utils
+import installation.mo_delta as mo_delta
+from installation.offline_manifest import global_offline_manifest
+from installation.prefetcher import global_prefetcher
+from installation.source_manifest import SourceManifest, ManifestFile
 import utils as root_utils
 from instance.game_instance import GameInstance
-from localization_sources import global_source_manager, get_route_id_to_name
+from network import downloader
+from network.circuit_breaker import global_circuit_breaker, is_route_failure
+from network.engine import global_network_engine
+from network.http_cache import global_http_cache
+from network.rate_limiter import global_bandwidth_limiter
+from network.route_selector import race_routes, race_routes_async, global_route_health, RouteSkipped
+from network.transfer_stats import TransferStats, TransferSnapshot, SAMPLE_INTERVAL, combine, format_size, \
+    format_duration
+from localization_sources import global_source_manager, get_route_id_to_name, get_download_route_priority
 from ui.windows.window_action import ActionProgressWindow
 
 # (从 utils 导入常量)
 L10N_CACHE = utils.L10N_CACHE
 EE_CACHE = utils.EE_CACHE
 
+# 同时进行的文件下载数
+MAX_PARALLEL_DOWNLOADS = 6
+# Tk 线程检查结果队列的间隔 (毫秒)
+UI_POLL_INTERVAL_MS = 50
+# 每采样多少次下载进度写一次日志
+PROGRESS_LOG_EVERY = 10
+
 
 class DownloadJob:
     """代表一个单一的下载任务（一个文件）。"""
 
-    def __init__(self, job_id: str, file_type: str, lang_code: str):
+    def __init__(self, job_id: str, file_type: str, lang_code: str, segments: Optional[int] = None):
         self.job_id = job_id
         self.file_type = file_type
         self.lang_code = lang_code
         self.dependent_tasks: Set['InstallationTask'] = set()
         self.result_path: Optional[Path] = None
 
+        # 分段下载的连接数 (1 = 单连接)，默认取自设置
+        if segments is None:
+            segments = settings.global_settings.get('download.segments', 4)
+        self.segments: int = max(1, int(segments))
+        # 是否允许同时从多个镜像线路拉取同一文件的不同数据块
+        self.striping: bool = settings.global_settings.get('download.striping', True)
+
+        # 接收字节数、速度与剩余时间
+        self.stats = TransferStats()
+
         # MO 特有
         self.version_info: Optional[Dict[str, str]] = None
 
+        # (新增) 来源清单给出的文件 (URL、SHA-256 与大小) 及提供清单的线路；没有清单时为 None
+        self.expected: Optional[ManifestFile] = None
+        self.expected_route: Optional[str] = None
+
+        # (新增) 下载成功后继续持有的缓存条目锁，直到依赖的任务都复制完成 (或失败、取消)，
+        # 期间其他进程的容量管理不会淘汰该条目的 blob
+        self.entry_lock: Optional[FileLock] = None
+        self.released_tasks: Set['InstallationTask'] = set()
+
 
 class InstallationTask:
     """代表一个要安装到单个实例的完整任务。"""
@@ -97,15 +142,25 @@ class InstallationManager:
     def __init__(self, root_tk: tk.Tk):
         self.root_tk = root_tk
         self.tasks: List[InstallationTask] = []
-        self.download_queue: queue.Queue = queue.Queue()
+        # (已修改：后台网络事件循环的结果统一通过该队列交回 Tk 线程)
+        self._ui_queue: queue.Queue = queue.Queue()
         self.download_jobs: Dict[str, DownloadJob] = {}
+        # (新增) version.info URL -> 进行中或已完成的请求，同一 (语言, 实例类型, 线路) 只请求一次
+        self._version_fetches: Dict[str, asyncio.Future] = {}
+        self._version_route_allowed_cache: Dict[str, bool] = {}
         self.window: Optional[ActionProgressWindow] = None
         self.download_routes_priority: List[str] = []
         self._cancel_event = threading.Event()
         self._lock = threading.Lock()
+        self._pin_lock = threading.Lock()
         self.on_complete_callback: Optional[Callable] = None
         self.is_uninstalling: bool = False  # (新增)
         self._install_phase_started = False  # <-- (修改 1: 新增标志)
+        self._progress_samples = 0
+        # (新增) 离线模式：只使用本地缓存，不访问网络 (--offline 或所有线路都无法连接时)
+        self._offline = False
+        # (新增) 安装开始时的哈希统计，结束时报告本次安装的增量
+        self._hashing_stats_start: Dict[str, float] = {}
 
     def start_installation(self, tasks: List[InstallationTask], on_complete_callback: Optional[Callable] = None):
         from localizer import _  # (为 Messagebox 导入)
@@ -117,11 +172,17 @@ class InstallationManager:
             return
 
         self._cancel_event.clear()
+        # (新增) 暂停后台预取，让出带宽；已下载的部分由安装从断点继续
+        global_prefetcher.pause()
         self.tasks = tasks
         self.on_complete_callback = on_complete_callback
         self.is_uninstalling = False  # (新增)
         self._install_phase_started = False  # <-- (修改 2: 重置标志)
-        self.download_routes_priority = settings.global_settings.get('download_routes_priority')
+        self._offline = global_offline_manifest.forced
+        self._hashing_stats_start = get_hashing_stats()
+        # (已修改：按历史延迟与成功率对线路重新排序，局域网缓存服务器优先)
+        self.download_routes_priority = get_download_route_priority()
+        global_bandwidth_limiter.refresh()
 
         tasks_data = {t.task_name : t.instance for t in self.tasks}
         # (已修改：传入 title 和 strings)
@@ -146,7 +207,10 @@ class InstallationManager:
             )
             task.progress_callback = safe_progress_callback
 
-        threading.Thread(target=self._control_thread, daemon=True).start()
+        self._pump_ui_queue()
+        self._progress_samples = 0
+        self._sample_download_progress()
+        global_network_engine.submit(self._download_pipeline())
 
     def cancel_installation(self):
         from localizer import _  # (为日志导入)
@@ -154,11 +218,13 @@ class InstallationManager:
         cancel_key = 'lki.uninstall.status.cancelling' if self.is_uninstalling else 'lki.install.status.cancelling'
         _log_overall(self, _(cancel_key))
         self._cancel_event.set()
-        while not self.download_queue.empty():
-            try:
-                self.download_queue.get_nowait()
-            except queue.Empty:
-                break
+        # (新增) 取消后任务不会全部标记为完成或失败，_check_if_all_finished 不会恢复预取，需要在这里恢复
+        global_prefetcher.resume()
+        # (新增) 尚未开始复制的任务不再需要缓存文件；正在复制的任务结束时自行释放
+        if not self.is_uninstalling:
+            for task in self.tasks:
+                if task.status != "installing":
+                    self._unpin_task(task)
 
     def start_uninstallation(self, tasks: List[InstallationTask], on_complete_callback: Optional[Callable] = None):
         from localizer import _
@@ -169,6 +235,7 @@ class InstallationManager:
             return
 
         self._cancel_event.clear()
+        global_prefetcher.pause()
         self.tasks = tasks
         self.on_complete_callback = on_complete_callback
         self.is_uninstalling = True  # (新增)
@@ -207,48 +274,99 @@ class InstallationManager:
             task.status = "running"  # (使用 'running' 状态)
             threading.Thread(target=self._uninstall_worker, args=(task,), daemon=True).start()
 
-    def _control_thread(self):
+    def _post_ui(self, func: Callable, *args):
+        """(任意线程) 将回调放入结果队列，由 Tk 线程执行。"""
+        self._ui_queue.put((func, args))
+
+    def _pump_ui_queue(self):
+        """(在主线程中) 执行结果队列中的所有回调，并在窗口存在期间持续轮询。"""
+        while True:
+            try:
+                func, args = self._ui_queue.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                func(*args)
+            except Exception as e:
+                log(f"Error in UI callback {getattr(func, '__name__', func)}: {e}")
+
+        try:
+            if self.window and self.window.winfo_exists():
+                self.root_tk.after(UI_POLL_INTERVAL_MS, self._pump_ui_queue)
+        except tk.TclError:
+            pass  # 窗口已销毁
+
+    def _sample_download_progress(self):
+        """(在主线程中) 按固定间隔汇总各下载作业的进度，更新任务行并定期写入日志。"""
+        from localizer import _
+
+        try:
+            if not (self.window and self.window.winfo_exists()):
+                return
+        except tk.TclError:
+            return
+
+        self._progress_samples += 1
+        write_log = self._progress_samples % PROGRESS_LOG_EVERY == 0
+
+        task_snapshots: Dict[InstallationTask, List[TransferSnapshot]] = {}
+        for job in list(self.download_jobs.values()):
+            if not job.stats.active:
+                continue
+            snapshot = job.stats.sample()
+            if write_log:
+                log(f"[{job.job_id}] {snapshot.format()}")
+            for task in job.dependent_tasks:
+                task_snapshots.setdefault(task, []).append(snapshot)
+
+        for task, snapshots in task_snapshots.items():
+            if task.status != "downloading":
+                continue
+            combined = combine(snapshots)
+            progress = combined.fraction * 100 if combined.fraction is not None else task.progress_callback()
+            self.window.update_task_progress(task.task_name, progress,
+                                             _('lki.install.status.downloading_file') % _format_transfer(combined))
+
+        self.root_tk.after(int(SAMPLE_INTERVAL * 1000), self._sample_download_progress)
+
+    async def _download_pipeline(self):
+        """(在网络事件循环中) 解析所有任务的版本，然后并发下载所需文件。"""
         from localizer import _  # <-- (修复 UnboundLocalError)
 
         _log_overall(self, _('lki.install.status.preparing_files'))
-        utils.clear_temp_dir()
+        await asyncio.to_thread(utils.clear_temp_dir)
         self.download_jobs = {}
+        self._version_fetches = {}
+        self._version_route_allowed_cache = {}
+        if self._offline:
+            _log_overall(self, _('lki.install.status.offline_mode'))
 
         _log_overall(self, _('lki.install.status.getting_versions'))
-        version_threads = []
-        for task in self.tasks:
-            if self._cancel_event.is_set(): return
-
-            t = threading.Thread(target=self._resolve_task_version, args=(task,), daemon=True)
-            t.start()
-            version_threads.append(t)
-
-        for t in version_threads: t.join()
+        await global_network_engine.gather((self._resolve_task_version(task) for task in self.tasks),
+                                           self._cancel_event)
 
         if self._cancel_event.is_set(): return
 
-        for job in self.download_jobs.values():
-            self.download_queue.put(job)
-
-        if self.download_queue.empty():
+        jobs = list(self.download_jobs.values())
+        if not jobs:
             # (修改 3: 使用新键并设置标志)
             _log_overall(self, _('lki.install.status.install_phase'))
             self._install_phase_started = True
-            self.root_tk.after(0, self._on_download_complete, None, True)
+            self._post_ui(self._on_download_complete, None, True)
             return
 
-        num_workers = min(6, self.download_queue.qsize())
-        _log_overall(self, _('lki.install.status.downloading_files') % self.download_queue.qsize())
+        _log_overall(self, _('lki.install.status.downloading_files') % len(jobs))
 
-        for _ in range(num_workers):
-            threading.Thread(target=self._download_worker, daemon=True).start()
+        download_slots = asyncio.Semaphore(MAX_PARALLEL_DOWNLOADS)
+        await global_network_engine.gather((self._download_job(job, download_slots) for job in jobs),
+                                           self._cancel_event)
 
-    def _resolve_task_version(self, task: InstallationTask):
+    async def _resolve_task_version(self, task: InstallationTask):
         from localizer import _
 
         if self._cancel_event.is_set(): return
 
-        latest_version_obj = task.instance.get_latest_version()
+        latest_version_obj = await asyncio.to_thread(task.instance.get_latest_version)
         if not latest_version_obj or not latest_version_obj.exe_version:
             _log_task(task, _('lki.install.status.no_version_info'))
             self._mark_task_failed(task)
@@ -269,7 +387,7 @@ class InstallationManager:
         for route_id in available_route_ids:
             info_map = source.get_urls(task.instance.type, route_id)
 
-            if info_map and 'version' in info_map:
+            if info_map and ('version' in info_map or 'manifest' in info_map):
                 has_valid_config = True
                 break
 
@@ -278,36 +396,210 @@ class InstallationManager:
             self._mark_task_failed(task)
             return
 
-        sub_version = None
-        for route_id in self.download_routes_priority:
-            if self._cancel_event.is_set(): return
+        if self._offline:
+            self._resolve_offline_version(task, major_version)
+            return
 
+        # (已修改：各线路错峰并发请求，取第一个匹配的结果)
+        version_routes = []
+        for route_id in self.download_routes_priority:
             route_urls = source.get_urls(task.instance.type, route_id)
-            if not route_urls: continue
+            if route_urls and (route_urls.get('manifest') or route_urls.get('version')):
+                version_routes.append(route_id)
+
+        reachable = False
 
-            v_url = route_urls.get('version')
+        def _match_manifest(route_id: str, text: str, manifest_url: str) -> Optional[SourceManifest]:
+            """(新增) 解析来源清单；清单无效时返回 None (回退到 version.info)。"""
+            try:
+                manifest = SourceManifest.parse(text, manifest_url)
+            except Exception as e:
+                # (已修改) 任何无效的清单都只意味着没有清单，不能中断版本解析
+                log(f"Invalid source manifest {manifest_url}: {e}")
+                return None
+            manifest.route_id = route_id
+            return manifest
+
+        async def _probe_version(route_id: str) -> Optional[Tuple[str, Optional[SourceManifest]]]:
+            nonlocal reachable
+            urls = source.get_urls(task.instance.type, route_id)
             _log_task(task, _('lki.install.status.getting_version_from') % get_route_id_to_name().get(route_id, route_id))
 
+            # (新增) 线路提供来源清单时，一次请求即可得到子版本、兼容的主版本与各文件的哈希
+            manifest_url = urls.get('manifest')
+            if manifest_url:
+                try:
+                    manifest = _match_manifest(route_id, await self._fetch_version_text(route_id, manifest_url),
+                                               manifest_url)
+                except requests.exceptions.RequestException as e:
+                    if is_route_failure(e) or not urls.get('version'):
+                        _log_task(task, f"{_('lki.install.status.failed')}: {route_id} ({e})")
+                        raise
+                    log(f"Source manifest unavailable on {route_id}: {e}")
+                    manifest = None
+                if manifest:
+                    reachable = True
+                    if manifest.supports(major_version):
+                        return manifest.sub, manifest
+                    _log_task(task, _('lki.install.status.version_mismatch') % (", ".join(manifest.majors),
+                                                                               major_version))
+                    return None
+                if not urls.get('version'):
+                    return None
+
+            v_url = urls.get('version')
             try:
-                proxies = root_utils.get_configured_proxies()
-                resp = requests.get(v_url, timeout=5, proxies=proxies)
-                resp.raise_for_status()
-                lines = resp.text.splitlines()
-                if len(lines) >= 2 and lines[1].strip() == major_version:
-                    sub_version = lines[0].strip()
+                # (已修改：使用相同语言与实例类型的任务共享同一请求)
+                text = await self._fetch_version_text(route_id, v_url)
+            except requests.exceptions.RequestException as e:
+                _log_task(task, f"{_('lki.install.status.failed')}: {route_id} ({e})")
+                raise
+            reachable = True
+            remote_sub, remote_major = utils.parse_version_info(text)
+            if remote_major == major_version and remote_sub:
+                return remote_sub, None
+            _log_task(task, _('lki.install.status.version_mismatch') % (remote_major, major_version))
+            return None
+
+        sub_version = None
+        manifest = None
+        # (新增：有效期内的缓存版本与游戏版本匹配时，无需访问网络)
+        for route_id in version_routes:
+            route_urls = source.get_urls(task.instance.type, route_id)
+            if route_urls.get('manifest'):
+                cached_text = global_http_cache.get_fresh_text(route_urls['manifest'])
+                cached_manifest = _match_manifest(route_id, cached_text, route_urls['manifest']) \
+                    if cached_text is not None else None
+                if cached_manifest and cached_manifest.supports(major_version):
+                    sub_version, manifest = cached_manifest.sub, cached_manifest
                     _log_task(task, _('lki.install.status.version_match_found') % sub_version)
                     break
-                else:
-                    _log_task(task, _('lki.install.status.version_mismatch') % (lines[1].strip(), major_version))
+            cached_text = global_http_cache.get_fresh_text(route_urls.get('version')) \
+                if route_urls.get('version') else None
+            if cached_text is None:
+                continue
+            remote_sub, remote_major = utils.parse_version_info(cached_text)
+            if remote_major == major_version and remote_sub:
+                sub_version = remote_sub
+                _log_task(task, _('lki.install.status.version_match_found') % sub_version)
+                break
 
-            except requests.exceptions.RequestException as e:
-                _log_task(task, f"{_('lki.install.status.failed')}: {route_id} ({e})")
+        if not sub_version:
+            # (新增：跳过断路器处于断开状态的线路)
+            version_routes = [r for r in version_routes
+                              if self._version_route_allowed(task, r, self._get_version_probe_url(source, task, r))]
+            race_result = await race_routes_async(version_routes, _probe_version, record=False)
+            if self._cancel_event.is_set(): return
+            if race_result:
+                sub_version, manifest = race_result[1]
+                _log_task(task, _('lki.install.status.version_match_found') % sub_version)
+            elif not reachable:
+                # (新增) 所有线路都无法连接：本次运行切换到离线模式，使用缓存的版本
+                if not self._offline:
+                    self._offline = True
+                    _log_overall(self, _('lki.install.status.offline_mode'))
+                self._resolve_offline_version(task, major_version)
+                return
 
         if not sub_version:
             _log_task(task, _('lki.install.status.no_compatible_version'))
             self._mark_task_failed(task)
             return
 
+        global_offline_manifest.record_version(task.lang_code, task.instance.type, major_version, sub_version)
+        self._add_download_jobs(task, major_version, sub_version, manifest)
+
+    async def _fetch_version_text(self, route_id: str, v_url: str) -> str:
+        """
+        (新增) 获取 version.info (条件请求，304 时使用缓存的版本文件)。
+        同一 URL 在本次运行中只请求一次，结果 (或异常) 分发给所有等待的任务；
+        某个任务的竞速被取消时，共享的请求继续进行，不影响其他任务。
+        (已修改) 断路器与线路的延迟、成功率只由发出请求的这一次记录，不随等待的任务数重复计入。
+        """
+        fetch = self._version_fetches.get(v_url)
+        if fetch is None:
+            async def _fetch() -> str:
+                began = time.monotonic()
+                try:
+                    text = await global_network_engine.run_blocking(v_url, global_http_cache.get_text, v_url, 5,
+                                                                    use_fresh=False)
+                except requests.exceptions.RequestException as e:
+                    global_circuit_breaker.record(route_id, v_url, e)
+                    if is_route_failure(e):
+                        global_route_health.record_failure(route_id)
+                    else:
+                        global_route_health.record_success(route_id, time.monotonic() - began)
+                    raise
+                global_circuit_breaker.record_success(route_id, v_url)
+                global_route_health.record_success(route_id, time.monotonic() - began)
+                return text
+
+            fetch = asyncio.ensure_future(_fetch())
+            # 所有等待者都被取消时也要取走异常，避免 "exception was never retrieved"
+            fetch.add_done_callback(lambda f: f.cancelled() or f.exception())
+            self._version_fetches[v_url] = fetch
+        return await asyncio.shield(fetch)
+
+    @staticmethod
+    def _get_version_probe_url(source, task: InstallationTask, route_id: str) -> str:
+        """(新增) 解析版本时首先请求的 URL：来源清单 (如有) 或 version.info。"""
+        urls = source.get_urls(task.instance.type, route_id)
+        return urls.get('manifest') or urls.get('version')
+
+    def _version_route_allowed(self, task: InstallationTask, route_id: str, v_url: str) -> bool:
+        """
+        (新增) 同一 version.info 在本次运行中只询问断路器一次：
+        半开状态只放行一次试探请求，而该请求由所有相关任务共享。
+        """
+        from localizer import _
+
+        allowed = self._version_route_allowed_cache.get(v_url)
+        if allowed is None:
+            return self._version_route_allowed_cache.setdefault(v_url, self._route_allowed(task, route_id, v_url))
+        if not allowed:
+            _log_task(task, _('lki.install.status.route_circuit_open') % get_route_id_to_name().get(route_id, route_id))
+        return allowed
+
+    def _route_allowed(self, task: InstallationTask, route_id: str, url: str) -> bool:
+        """(新增) 断路器是否允许访问该线路；不允许时记录日志。"""
+        from localizer import _
+
+        if global_circuit_breaker.allow(route_id, url):
+            return True
+        _log_task(task, _('lki.install.status.route_circuit_open') % get_route_id_to_name().get(route_id, route_id))
+        return False
+
+    def _resolve_offline_version(self, task: InstallationTask, major_version: str):
+        """
+        (新增，离线模式) 使用离线清单中记录的子版本；清单中没有或其缓存已失效时，
+        使用同一主版本下最近缓存的有效子版本。
+        """
+        from localizer import _
+
+        main_dir = L10N_CACHE / task.lang_code / major_version
+        candidates = []
+        recorded = global_offline_manifest.get_version(task.lang_code, task.instance.type, major_version)
+        if recorded:
+            candidates.append(main_dir / recorded)
+        if main_dir.is_dir():
+            cached = [d for d in main_dir.iterdir() if (d / "file_info.json").is_file()]
+            candidates += sorted(cached, key=lambda d: (d / "file_info.json").stat().st_mtime, reverse=True)
+
+        for cache_path in candidates:
+            if cache_store.load(cache_path / "global.mo", cache_path / "file_info.json"):
+                _log_task(task, _('lki.install.status.offline_version') % cache_path.name)
+                self._add_download_jobs(task, major_version, cache_path.name)
+                return
+
+        _log_task(task, _('lki.install.error.offline_not_cached') % f"{task.lang_code}_{major_version}")
+        self._mark_task_failed(task)
+
+    def _add_download_jobs(self, task: InstallationTask, major_version: str, sub_version: str,
+                           manifest: Optional[SourceManifest] = None):
+        """
+        为任务登记所需的下载作业 (相同的文件只下载一次)。
+        (已修改) 通过来源清单解析版本时，作业会记录清单给出的文件与哈希。
+        """
         mo_job_id = f"{task.lang_code}_{major_version}_{sub_version}"
         task.mo_job_id = mo_job_id
 
@@ -315,11 +607,13 @@ class InstallationManager:
             if mo_job_id not in self.download_jobs:
                 job = DownloadJob(mo_job_id, 'mo', task.lang_code)
                 job.version_info = {'main': major_version, 'sub': sub_version}
+                self._set_expected(job, manifest, 'mo')
                 self.download_jobs[mo_job_id] = job
             self.download_jobs[mo_job_id].dependent_tasks.add(task)
 
             if task.use_ee and task.ee_job_id not in self.download_jobs:
                 ee_job = DownloadJob(task.ee_job_id, 'ee', task.lang_code)
+                self._set_expected(ee_job, manifest, 'ee')
                 self.download_jobs[task.ee_job_id] = ee_job
             if task.use_ee:
                 self.download_jobs[task.ee_job_id].dependent_tasks.add(task)
@@ -334,43 +628,128 @@ class InstallationManager:
 
             task.status = "downloading"
 
-    def _download_worker(self):
+    @staticmethod
+    def _set_expected(job: DownloadJob, manifest: Optional[SourceManifest], file_type: str):
+        if manifest and manifest.get_file(file_type):
+            job.expected = manifest.get_file(file_type)
+            job.expected_route = manifest.route_id
+
+    async def _download_job(self, job: DownloadJob, download_slots: asyncio.Semaphore):
         from localizer import _  # <-- (修复 UnboundLocalError)
 
-        while not self.download_queue.empty():
+        async with download_slots:
             if self._cancel_event.is_set(): return
 
-            try:
-                job = self.download_queue.get_nowait()
-            except queue.Empty:
-                return  # 队列已空
-
-            if not job:
-                self.download_queue.task_done()
-                continue
-
             # (新增) 为下载函数选择一个“代表性”任务以进行日志记录
             # 这对于 _log_task 来说是必需的
             try:
                 representative_task = next(iter(job.dependent_tasks))
             except StopIteration:
-                self.download_queue.task_done()
-                continue  # 没有任务依赖此作业
+                return  # 没有任务依赖此作业
 
             for task in job.dependent_tasks:
                 _log_task(task, _('lki.install.status.downloading_file') % job.job_id)
 
-            success, result_path = self._perform_download(job, representative_task)
+            # (文件下载本身仍是阻塞的，在网络引擎的有界线程池中执行)
+            try:
+                success, result_path = await asyncio.to_thread(self._perform_download_exclusive, job,
+                                                               representative_task)
+            except Exception as e:
+                # (已修改) 下载线程中的意外错误 (写入缓存、等待锁、补丁等) 也要通知依赖的任务，
+                # 否则这些任务会一直停在“下载中”
+                import traceback
+                log(f"Error in download job {job.job_id}: {e}")
+                traceback.print_exc()
+                success, result_path = False, None
+            finally:
+                job.stats.finish()
+
+        if self._cancel_event.is_set():
+            return
+
+        if success:
+            job.result_path = result_path
 
-            if self._cancel_event.is_set():
-                self.download_queue.task_done()
-                return
+        self._post_ui(self._on_download_complete, job, success)
 
+    def _get_cache_entry_path(self, job: DownloadJob, task: InstallationTask) -> Path:
+        """作业对应的缓存数据文件 (与 _perform_download 中使用的路径一致)。"""
+        if job.file_type == 'mo':
+            return L10N_CACHE / job.lang_code / job.version_info['main'] / job.version_info['sub'] / "global.mo"
+        if job.file_type == 'ee':
+            return EE_CACHE / job.lang_code / task.instance.type / "ee.zip"
+        return utils.FONTS_CACHE / "srcwagon_mk.mkmod"
+
+    def _get_cache_info_path(self, job: DownloadJob, task: InstallationTask) -> Path:
+        """作业对应的缓存索引文件。"""
+        info_name = "cache_info.json" if job.file_type == 'fonts' else "file_info.json"
+        return self._get_cache_entry_path(job, task).parent / info_name
+
+    def _perform_download_exclusive(self, job: DownloadJob,
+                                    task: InstallationTask) -> Tuple[bool, Optional[Path]]:
+        """
+        (新增) 持有缓存条目的跨进程锁执行 _perform_download。
+        多个进程 (例如同时启动的多个 --auto-execute-preset 快捷方式) 需要同一条目时，
+        只有一个进程下载，其余进程等待锁释放后直接命中缓存。
+        """
+        from localizer import _
+
+        lock = cache_store.lock_entry(self._get_cache_entry_path(job, task))
+        if not lock.acquire(blocking=False):
+            _log_task(task, _('lki.install.status.waiting_for_lock') % job.job_id)
+            if not lock.acquire(is_cancelled=self._cancel_event.is_set):
+                return False, None
+        success, result_path = False, None
+        try:
+            if self._offline:
+                success, result_path = self._perform_offline(job, task)
+            else:
+                success, result_path = self._perform_download(job, task)
+                if not success and job.file_type != 'mo' and not self._cancel_event.is_set():
+                    # (新增) EE 与字体下载失败时，退回到最近一次有效的缓存
+                    success, result_path = self._perform_offline(job, task)
             if success:
-                job.result_path = result_path
+                # (新增) 记录最近使用时间，供容量管理按 LRU 淘汰
+                cache_store.touch(self._get_cache_info_path(job, task))
+            return success, result_path
+        finally:
+            # (已修改) 成功时继续持有条目锁，直到依赖的任务从 result_path 复制完成 (见 _unpin_task)
+            if not (success and self._pin_entry(job, lock)):
+                lock.release()
+
+    def _pin_entry(self, job: DownloadJob, lock: FileLock) -> bool:
+        """(新增) 保存作业的条目锁；已取消或依赖的任务都不再需要该文件时返回 False，由调用者释放。"""
+        with self._pin_lock:
+            if self._cancel_event.is_set() or job.dependent_tasks <= job.released_tasks:
+                return False
+            job.entry_lock = lock
+            return True
+
+    def _unpin_task(self, task: InstallationTask):
+        """(新增) 任务不再需要缓存文件 (复制完成、失败或取消)；作业的所有依赖任务都释放后解锁条目。"""
+        for job_id in (task.mo_job_id, task.ee_job_id, task.fo_job_id):
+            job = self.download_jobs.get(job_id) if job_id else None
+            if not job:
+                continue
+            with self._pin_lock:
+                job.released_tasks.add(task)
+                if not job.dependent_tasks <= job.released_tasks:
+                    continue
+                lock, job.entry_lock = job.entry_lock, None
+            if lock:
+                lock.release()
+
+    def _perform_offline(self, job: DownloadJob, task: InstallationTask) -> Tuple[bool, Optional[Path]]:
+        """(新增，离线模式) 只使用本地缓存完成作业，不访问网络。"""
+        from localizer import _
 
-            self.root_tk.after(0, self._on_download_complete, job, success)
-            self.download_queue.task_done()
+        info = cache_store.load(self._get_cache_entry_path(job, task), self._get_cache_info_path(job, task))
+
+        if info:
+            log(_('lki.install.debug.cache_hit') % job.job_id)
+            return True, cache_store.get_entry_path(info)
+        _log_task(task, _('lki.install.error.offline_not_cached') % job.job_id)
+        return False, None
 
     def _perform_download(self, job: DownloadJob, task: InstallationTask) -> Tuple[bool, Optional[Path]]:
         from localizer import _  # <-- (修复 UnboundLocalError)
@@ -383,35 +762,55 @@ class InstallationManager:
             mo_path = cache_path / "global.mo"
             info_path = cache_path / "file_info.json"
 
-            if info_path.is_file() and mo_path.is_file():
-                try:
-                    with open(info_path, 'r') as f:
-                        info_data = json.load(f)
-                    expected_hash = info_data.get('file_sha256')
-                    actual_hash = utils.get_sha256(mo_path)
-
-                    if expected_hash and actual_hash == expected_hash:
-                        log(_('lki.install.debug.cache_hit') % job.job_id)
-                        return True, mo_path
-                except Exception as e:
-                    log(_('lki.install.debug.cache_check_failed') % e)
+            # (已修改：缓存命中只需读取索引，数据文件在内容寻址的 blobs 中)
+            try:
+                mo_info = cache_store.load(mo_path, info_path)
+                if mo_info:
+                    log(_('lki.install.debug.cache_hit') % job.job_id)
+                    return True, cache_store.get_entry_path(mo_info)
+            except Exception as e:
+                log(_('lki.install.debug.cache_check_failed') % e)
 
             utils.mkdir(cache_path)
+            cache_store.invalidate(info_path)
+
+            # (新增：来源清单给出的内容已在缓存中时无需下载)
+            adopted_path = self._adopt_expected(job, info_path)
+            if adopted_path:
+                return True, adopted_path
+
+            # (新增：优先基于已缓存的子版本应用增量补丁)
+            delta_result = self._try_delta_update(job, task, mo_path, info_path, f"MO ({job.job_id})")
+            if delta_result:
+                return True, delta_result
+
+            # (已修改：下载时同步计算的 SHA-256 直接写入 file_info.json，不再重新读取文件)
+            dl_hash = self._check_expected(job, mo_path, f"MO ({job.job_id})",
+                                           self._try_striped_download(job, task, 'mo', mo_path, f"MO ({job.job_id})", 5))
+            if dl_hash:
+                return True, cache_store.commit(mo_path, info_path, {'file_sha256': dl_hash})
+
+            # (新增：清单中的 URL 指向确切的子版本)
+            dl_hash = self._download_expected(job, mo_path, f"MO ({job.job_id})")
+            if dl_hash:
+                return True, cache_store.commit(mo_path, info_path, {'file_sha256': dl_hash})
 
             for route_id in self.download_routes_priority:
                 if self._cancel_event.is_set(): return False, None
 
-                urls = source.get_urls(task.instance.type, route_id)
+                # (已修改：局域网线路只提供与本次解析的版本一致的 MO)
+                urls = source.get_urls(task.instance.type, route_id,
+                                       job.version_info['main'], job.version_info['sub'])
                 if not urls or not urls.get('mo'):
                     continue
 
                 mo_url = urls.get('mo')
 
-                if self._download_file_with_retry(mo_url, mo_path, f"MO ({job.job_id}) - {route_id}", 5):
-                    dl_hash = utils.get_sha256(mo_path)
-                    with open(info_path, 'w') as f:
-                        json.dump({'file_sha256': dl_hash}, f)
-                    return True, mo_path
+                dl_hash = self._download_file_with_retry(mo_url, mo_path, f"MO ({job.job_id}) - {route_id}", 5,
+                                                         segments=job.segments, stats=job.stats, route_id=route_id)
+                dl_hash = self._check_expected(job, mo_path, f"MO ({job.job_id}) - {route_id}", dl_hash)
+                if dl_hash:
+                    return True, cache_store.commit(mo_path, info_path, {'file_sha256': dl_hash})
 
             return False, None
 
@@ -419,8 +818,63 @@ class InstallationManager:
         if job.file_type == 'ee':
             cache_path = EE_CACHE / job.lang_code / task.instance.type
             ee_zip_path = cache_path / "ee.zip"
+            info_path = cache_path / "file_info.json"
 
             utils.mkdir(cache_path)
+
+            # (新增：EE 同样通过索引条目指向 blobs 中的数据文件；下载失败时旧条目保持有效)
+            cached_path = ee_zip_path
+            try:
+                ee_info = cache_store.load(ee_zip_path, info_path)
+                if ee_info:
+                    cached_path = cache_store.get_entry_path(ee_info)
+                    # (新增：与来源清单的哈希一致时无需访问网络)
+                    if job.expected and ee_info['file_sha256'] == job.expected.sha256:
+                        log(_('lki.install.debug.cache_hit') % job.job_id)
+                        return True, cached_path
+            except Exception as e:
+                log(_('lki.install.debug.cache_check_failed') % e)
+
+            adopted_path = self._adopt_expected(job, info_path)
+            if adopted_path:
+                return True, adopted_path
+
+            # (新增：向首选线路发送条件请求，远端未变化时直接使用缓存的 EE 压缩包)
+            validated_url = None
+            validators: Dict[str, Optional[str]] = {}
+            # (已修改：清单已给出哈希时，缓存的内容必然不同，无需再发送条件请求)
+            revalidate_routes = [] if job.expected and job.expected.sha256 else self.download_routes_priority
+            for route_id in revalidate_routes:
+                if self._cancel_event.is_set(): return False, None
+                urls = source.get_urls(task.instance.type, route_id)
+                if not urls or not urls.get('ee') or not self._route_allowed(task, route_id, urls.get('ee')):
+                    continue
+                try:
+                    is_fresh, validators = global_http_cache.revalidate_file(urls.get('ee'), cached_path, 5)
+                except requests.exceptions.RequestException as e:
+                    log(f"EE revalidation failed on {route_id}: {e}")
+                    global_circuit_breaker.record(route_id, urls.get('ee'), e)
+                    continue
+                global_circuit_breaker.record_success(route_id, urls.get('ee'))
+                if is_fresh:
+                    log(_('lki.install.debug.cache_hit') % job.job_id)
+                    return True, cached_path
+                validated_url = urls.get('ee')
+                break
+
+            dl_hash = self._check_expected(job, ee_zip_path, f"EE ({job.job_id})",
+                                           self._try_striped_download(job, task, 'ee', ee_zip_path,
+                                                                      f"EE ({job.job_id})", 5))
+            if dl_hash:
+                ee_blob_path = cache_store.commit(ee_zip_path, info_path, {'file_sha256': dl_hash})
+                if validated_url:
+                    global_http_cache.remember_file(validated_url, ee_blob_path, validators)
+                return True, ee_blob_path
+
+            dl_hash = self._download_expected(job, ee_zip_path, f"EE ({job.job_id})")
+            if dl_hash:
+                return True, cache_store.commit(ee_zip_path, info_path, {'file_sha256': dl_hash})
+
             # 循环尝试所有路由
             for route_id in self.download_routes_priority:
                 if self._cancel_event.is_set(): return False, None
@@ -431,8 +885,14 @@ class InstallationManager:
 
                 ee_url = urls.get('ee')
                 # 如果下载成功，返回 True；否则继续
-                if self._download_file_with_retry(ee_url, ee_zip_path, f"EE ({job.job_id}) - {route_id}", 5):
-                    return True, ee_zip_path
+                dl_hash = self._download_file_with_retry(ee_url, ee_zip_path, f"EE ({job.job_id}) - {route_id}", 5,
+                                                         segments=job.segments, stats=job.stats, route_id=route_id)
+                dl_hash = self._check_expected(job, ee_zip_path, f"EE ({job.job_id}) - {route_id}", dl_hash)
+                if dl_hash:
+                    ee_blob_path = cache_store.commit(ee_zip_path, info_path, {'file_sha256': dl_hash})
+                    if ee_url == validated_url:
+                        global_http_cache.remember_file(ee_url, ee_blob_path, validators)
+                    return True, ee_blob_path
 
             return False, None
 
@@ -444,56 +904,112 @@ class InstallationManager:
             info_path = cache_dir / "cache_info.json"
             utils.mkdir(cache_dir)
 
-            proxies = root_utils.get_configured_proxies()
-
+            fonts_routes = []
             for route_id in self.download_routes_priority:
+                urls = global_source_manager.get_global_asset_urls(asset_id, route_id)
+                if urls and urls.get('zip') and urls.get('version') and route_id not in fonts_routes:
+                    fonts_routes.append(route_id)
+
+            # (已修改：跳过冷却期内的线路；此处不占用半开试探名额，实际访问线路时才调用 allow())
+            open_routes = [r for r in fonts_routes if global_circuit_breaker.is_open(
+                r, global_source_manager.get_global_asset_urls(asset_id, r).get('version'))]
+            for route_id in open_routes:
+                _log_task(task, _('lki.install.status.route_circuit_open') % get_route_id_to_name().get(route_id, route_id))
+            fonts_routes = [r for r in fonts_routes if r not in open_routes]
+            # 已通过 allow() 获得访问许可的线路，下载 zip 时无需再次占用试探名额
+            admitted_routes = set()
+
+            def _fetch_fonts_version(route_id: str, use_fresh: bool) -> Optional[str]:
+                ver_url = global_source_manager.get_global_asset_urls(asset_id, route_id).get('version')
+                if not self._route_allowed(task, route_id, ver_url):
+                    raise RouteSkipped(route_id)
+                admitted_routes.add(route_id)
+                try:
+                    text = global_http_cache.get_text(ver_url, 5, use_fresh=use_fresh)
+                except requests.exceptions.RequestException as e:
+                    global_circuit_breaker.record(route_id, ver_url, e)
+                    raise
+                global_circuit_breaker.record_success(route_id, ver_url)
+                return json.loads(text).get('version')
+
+            def _probe_fonts_version(route_id: str) -> Optional[str]:
+                # (已修改：条件请求，304 时使用缓存的版本文件)
+                return _fetch_fonts_version(route_id, use_fresh=False)
+
+            raced_versions: Dict[str, str] = {}
+            race_result = None
+
+            # (新增：有效期内的缓存版本无需访问网络)
+            for route_id in fonts_routes:
+                cached_text = global_http_cache.get_fresh_text(
+                    global_source_manager.get_global_asset_urls(asset_id, route_id).get('version'))
+                if cached_text is None:
+                    continue
+                try:
+                    cached_version = json.loads(cached_text).get('version')
+                except ValueError:
+                    continue
+                if cached_version:
+                    race_result = (route_id, cached_version)
+                    break
+
+            # (新增：先让各线路竞速获取版本，最快的线路排在最前面)
+            if not race_result:
+                race_result = race_routes(fonts_routes, _probe_fonts_version, self._cancel_event.is_set)
+            if self._cancel_event.is_set(): return False, None
+            if not race_result:
+                # 所有线路都无法提供有效版本，无需再逐条重试
+                _log_task(task, _('lki.install.error.fonts_no_url'))
+                return False, None
+            raced_versions[race_result[0]] = race_result[1]
+            fonts_routes.remove(race_result[0])
+            fonts_routes.insert(0, race_result[0])
+
+            for route_id in fonts_routes:
                 if self._cancel_event.is_set(): return False, None
 
                 # URL
                 urls = global_source_manager.get_global_asset_urls(asset_id, route_id)
-                if not urls or not urls.get('zip') or not urls.get('version'):
-                    continue  # 当前路由配置无效，跳过
-
-                VER_URL = urls.get('version')
                 ZIP_URL = urls.get('zip')
 
-                remote_version = None
+                remote_version = raced_versions.get(route_id)
 
                 # Version
-                try:
+                if not remote_version:
+                    try:
+                        _log_task(task, _('lki.install.status.fonts_route') % get_route_id_to_name().get(route_id, route_id))
+                        remote_version = _fetch_fonts_version(route_id, use_fresh=True)
+                    except RouteSkipped:
+                        continue
+                    except Exception as e:
+                        # 当前路由连接失败，记录日志并尝试下一个路由
+                        _log_task(task, _('lki.install.error.fonts_version_check') % f"{route_id}: {e}")
+                        continue
+                else:
                     _log_task(task, _('lki.install.status.fonts_route') % get_route_id_to_name().get(route_id, route_id))
-                    resp = requests.get(VER_URL, timeout=5, proxies=proxies)
-                    resp.raise_for_status()
-                    remote_info = resp.json()
-                    remote_version = remote_info.get('version')
-                except Exception as e:
-                    # 当前路由连接失败，记录日志并尝试下一个路由
-                    _log_task(task, _('lki.install.error.fonts_version_check') % f"{route_id}: {e}")
-                    continue
 
                 if not remote_version:
                     _log_task(task, _('lki.install.error.fonts_version_invalid') + f" ({route_id})")
                     continue
 
                 # Check cache
-                if info_path.is_file() and mkmod_path.is_file():
-                    try:
-                        with open(info_path, 'r', encoding='utf-8') as f:
-                            local_info = json.load(f)
-                        if local_info.get('version') == remote_version:
-                            actual_hash = utils.get_sha256(mkmod_path)
-                            expected_hash = local_info.get('file_sha256')
-                            if actual_hash == expected_hash:
-                                log(_('lki.install.debug.cache_hit') % job.job_id)
-                                return True, mkmod_path
-                    except Exception as e:
-                        log(_('lki.install.debug.cache_check_failed') % e)
+                try:
+                    local_info = cache_store.load(mkmod_path, info_path)
+                    if local_info and local_info.get('version') == remote_version:
+                        log(_('lki.install.debug.cache_hit') % job.job_id)
+                        return True, cache_store.get_entry_path(local_info)
+                except Exception as e:
+                    log(_('lki.install.debug.cache_check_failed') % e)
 
                 # Download
                 _log_task(task, _('lki.install.status.packing_fonts'))
-                temp_zip_path = utils.TEMP_DIR / "fonts.zip"
+                # (已修改：下载到缓存目录，以便中断后可以续传)
+                temp_zip_path = cache_dir / "fonts.zip"
 
-                if not self._download_file_with_retry(ZIP_URL, temp_zip_path, f"Fonts ({job.job_id}) - {route_id}", 15):
+                # (已修改：版本来自有效期内的缓存时，线路尚未通过 allow()，由下载流程占用试探名额)
+                if not self._download_file_with_retry(ZIP_URL, temp_zip_path, f"Fonts ({job.job_id}) - {route_id}", 15,
+                                                      segments=job.segments, stats=job.stats, route_id=route_id,
+                                                      admitted=route_id in admitted_routes):
                     continue
 
                 try:
@@ -515,13 +1031,22 @@ class InstallationManager:
                     if not files_to_add:
                         raise Exception("Empty zip file")
 
-                    utils.create_mkmod(mkmod_path, files_to_add)
+                    # (已修改：打包到临时文件并同步计算 SHA-256，随后与 cache_info.json 一起原子提交)
+                    temp_mkmod_path = atomic_io.get_temp_path(mkmod_path)
+                    new_hash = utils.create_mkmod(temp_mkmod_path, files_to_add)
+                    if not new_hash:
+                        raise Exception(f"Failed to create {mkmod_path.name}")
+                    fonts_blob_path = cache_store.commit(mkmod_path, info_path,
+                                                         {'version': remote_version, 'file_sha256': new_hash},
+                                                         temp_path=temp_mkmod_path)
 
-                    new_hash = utils.get_sha256(mkmod_path)
-                    with open(info_path, 'w', encoding='utf-8') as f:
-                        json.dump({'version': remote_version, 'file_sha256': new_hash}, f)
+                    # 已打包为 mkmod，原始 zip 不再需要
+                    try:
+                        os.remove(temp_zip_path)
+                    except OSError as e:
+                        log(f"Warning: Could not remove {temp_zip_path}: {e}")
 
-                    return True, mkmod_path
+                    return True, fonts_blob_path
 
                 except Exception as e:
                     _log_task(task, f"Fonts packing failed for {route_id}, retrying next: {e}")
@@ -535,30 +1060,199 @@ class InstallationManager:
 
         return False, None
 
-    def _download_file_with_retry(self, url: str, dest: Path, log_prefix: str, timeout: int) -> bool:
-        """使用 requests 下载文件。"""
-        from localizer import _  # <-- (修复 UnboundLocalError)
+    def _adopt_expected(self, job: DownloadJob, info_path: Path) -> Optional[Path]:
+        """(新增) 来源清单给出的内容已在 blobs 中 (例如其他实例类型的相同文件) 时，直接为其建立索引。"""
+        from localizer import _
+
+        if not job.expected or not job.expected.sha256:
+            return None
+        blob_path = cache_store.adopt(info_path, job.expected.sha256, job.expected.size)
+        if blob_path:
+            log(_('lki.install.debug.cache_hit') % job.job_id)
+        return blob_path
+
+    def _check_expected(self, job: DownloadJob, dest: Path, log_prefix: str, digest: Optional[str]) -> Optional[str]:
+        """(新增) 下载结果与来源清单的 SHA-256 不符时丢弃文件并返回 None。"""
+        from localizer import _
+
+        if not digest or not job.expected or not job.expected.sha256 or digest == job.expected.sha256:
+            return digest
+        _log_overall(self, f"{log_prefix}: {_('lki.install.status.manifest_hash_mismatch')}")
         try:
-            # (已修改：修复 %s 格式化)
-            _log_overall(self, f"{log_prefix}: {_('lki.install.status.connecting') % url}")
-            proxies = root_utils.get_configured_proxies()
+            os.remove(dest)
+        except OSError as e:
+            log(f"Could not remove {dest}: {e}")
+        return None
+
+    def _download_expected(self, job: DownloadJob, dest: Path, log_prefix: str) -> Optional[str]:
+        """(新增) 从提供来源清单的线路下载清单中的 URL，并校验 SHA-256。"""
+        if not job.expected or self._cancel_event.is_set():
+            return None
+        digest = self._download_file_with_retry(job.expected.url, dest, f"{log_prefix} - {job.expected_route}", 5,
+                                                segments=job.segments, stats=job.stats,
+                                                route_id=job.expected_route)
+        return self._check_expected(job, dest, log_prefix, digest)
+
+    def _try_delta_update(self, job: DownloadJob, task: InstallationTask, mo_path: Path, info_path: Path,
+                          log_prefix: str) -> Optional[Path]:
+        """
+        (增量更新) 以同一主版本下最近缓存的子版本为基础，下载并应用 global.mo 的增量补丁。
+        结果的 SHA-256 与补丁中记录的一致后才会写入缓存。
+        成功时返回缓存的数据文件；没有可用的基础版本或补丁、或应用失败时返回 None，由调用者回退到完整下载。
+        """
+        from localizer import _
 
-            response = requests.get(url, stream=True, proxies=proxies, timeout=timeout)
-            response.raise_for_status()
+        main_dir = L10N_CACHE / job.lang_code / job.version_info['main']
+        target_sub = job.version_info['sub']
+        if not main_dir.is_dir():
+            return None
 
-            with open(dest, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if self._cancel_event.is_set():
-                        _log_overall(self, f"{log_prefix}: {_('lki.install.status.cancelled')}")
-                        return False
-                    f.write(chunk)
+        base_dirs = [d for d in main_dir.iterdir() if d.name != target_sub and (d / "file_info.json").is_file()]
+        if not base_dirs:
+            return None
+        base_dir = max(base_dirs, key=lambda d: (d / "file_info.json").stat().st_mtime)
+        base_info = cache_store.load(base_dir / "global.mo", base_dir / "file_info.json")
+        if not base_info:
+            return None
 
-            _log_overall(self, f"{log_prefix}: {_('lki.install.status.success')}")
-            return True
+        source = global_source_manager.get_source(job.lang_code)
+        for route_id in self.download_routes_priority:
+            if self._cancel_event.is_set(): return None
+
+            delta_url = source.get_delta_url(task.instance.type, route_id, base_dir.name, target_sub)
+            if not delta_url or not global_circuit_breaker.allow(route_id, delta_url):
+                continue
+
+            try:
+                # (已修改) 与其他下载一样经过限速器，并计入作业的传输统计
+                delta = downloader.fetch_bytes(delta_url, 10, self._cancel_event.is_set, stats=job.stats)
+                global_circuit_breaker.record_success(route_id, delta_url)
+            except requests.exceptions.HTTPError as e:
+                if e.response is not None and e.response.status_code == 404:
+                    # 补丁未发布 (各线路内容相同，无需再尝试其他线路)
+                    log(f"No delta published at {delta_url}")
+                    global_circuit_breaker.record_success(route_id, delta_url)
+                    return None
+                log(f"Delta download failed on {route_id}: {e}")
+                global_circuit_breaker.record(route_id, delta_url, e)
+                continue
+            except requests.exceptions.RequestException as e:
+                log(f"Delta download failed on {route_id}: {e}")
+                global_circuit_breaker.record(route_id, delta_url, e)
+                continue
+            if delta is None:
+                return None
+
+            try:
+                # (已修改) 镜像返回的内容可能不是补丁 (例如截断或错误页面)，读取目标哈希同样可能失败
+                target_sha256 = mo_delta.get_target_sha256(delta)
+                if job.expected and job.expected.sha256 and target_sha256 != job.expected.sha256:
+                    log(f"Delta {delta_url} does not produce the file listed in the source manifest, ignoring")
+                    return None
+                patched = mo_delta.apply_delta(cache_store.get_entry_path(base_info).read_bytes(), delta)
+                temp_path = atomic_io.get_temp_path(mo_path)
+                with open(temp_path, 'wb') as f:
+                    f.write(patched)
+                blob_path = cache_store.commit(mo_path, info_path, {'file_sha256': target_sha256},
+                                               temp_path=temp_path)
+            except (mo_delta.DeltaError, ValueError, OSError) as e:
+                log(f"Failed to apply delta {delta_url}: {e}")
+                return None
+
+            _log_overall(self, f"{log_prefix}: {_('lki.install.status.delta_applied') % base_dir.name}")
+            return blob_path
+
+        return None
+
+    def _try_striped_download(self, job: DownloadJob, task: InstallationTask, url_key: str,
+                              dest: Path, log_prefix: str, timeout: int) -> Optional[str]:
+        """
+        (跨镜像条带模式) 收集所有线路中 url_key 对应的 URL，同时从多个镜像拉取不同的数据块。
+        成功时返回文件的 SHA-256；可用线路不足或下载失败时返回 None，由调用者回退到逐条线路尝试。
+        """
+        from localizer import _
+
+        if not job.striping or self._cancel_event.is_set():
+            return None
+
+        source = global_source_manager.get_source(job.lang_code)
+        mirror_urls: List[str] = []
+        version = job.version_info or {}
+        for route_id in self.download_routes_priority:
+            urls = source.get_urls(task.instance.type, route_id, version.get('main'), version.get('sub'))
+            # (已修改) 正在恢复的线路不参与条带下载，由之后的逐条线路尝试发送唯一的试探请求
+            if urls and urls.get(url_key) and global_circuit_breaker.is_closed(route_id, urls.get(url_key)):
+                mirror_urls.append(urls.get(url_key))
+
+        if len(mirror_urls) < 2:
+            return None
 
+        _log_overall(self, f"{log_prefix}: {_('lki.install.status.striping') % len(mirror_urls)}")
+        try:
+            digest = downloader.download_striped(mirror_urls, dest, timeout, self._cancel_event.is_set,
+                                                 connections_per_mirror=max(1, job.segments // 2),
+                                                 stats=job.stats)
+            if digest:
+                _log_overall(self, f"{log_prefix}: {_('lki.install.status.success')}")
+                return digest
         except requests.exceptions.RequestException as e:
             _log_overall(self, f"{log_prefix}: {_('lki.install.status.failed')} ({e})")
-            return False
+        return None
+
+    def _download_file_with_retry(self, url: str, dest: Path, log_prefix: str, timeout: int,
+                                  retries: int = 3, segments: int = 1,
+                                  stats: Optional[TransferStats] = None,
+                                  route_id: Optional[str] = None, admitted: bool = False) -> Optional[str]:
+        """
+        使用 requests 下载文件 (支持断点续传)。
+        数据先写入 dest.part，完整后才会移动到 dest；
+        连接中断时会在同一线路上从断点重试 retries 次。
+        segments > 1 时，大文件会被切分为多段并发下载。
+        stats 用于报告接收的字节数与速度。
+        指定 route_id 时，结果会计入该线路的断路器，断路器不允许访问时直接跳过；
+        admitted 表示调用者已经通过 allow() 获得了访问许可。
+        成功时返回文件的 SHA-256 (写入时同步计算)，失败时返回 None。
+        """
+        from localizer import _  # <-- (修复 UnboundLocalError)
+
+        # (已修改) 冷却期结束后只有一个请求能通过 allow() 试探线路，其余作业改用其他线路；
+        # 已经通过 allow() 的流程 (admitted) 只需确认线路没有重新断开
+        if route_id and (global_circuit_breaker.is_open(route_id, url) if admitted
+                         else not global_circuit_breaker.allow(route_id, url)):
+            _log_overall(self, f"{log_prefix}: "
+                               f"{_('lki.install.status.route_circuit_open') % get_route_id_to_name().get(route_id, route_id)}")
+            return None
+
+        for attempt in range(retries):
+            if self._cancel_event.is_set():
+                return None
+            try:
+                # (已修改：修复 %s 格式化)
+                _log_overall(self, f"{log_prefix}: {_('lki.install.status.connecting') % url}")
+
+                digest = downloader.download_segmented(url, dest, timeout, self._cancel_event.is_set, segments, stats)
+                if route_id:
+                    global_circuit_breaker.record_success(route_id, url)
+                if digest:
+                    _log_overall(self, f"{log_prefix}: {_('lki.install.status.success')}")
+                    return digest
+
+                if self._cancel_event.is_set():
+                    _log_overall(self, f"{log_prefix}: {_('lki.install.status.cancelled')}")
+                    return None
+
+            except requests.exceptions.RequestException as e:
+                _log_overall(self, f"{log_prefix}: {_('lki.install.status.failed')} ({e})")
+                if route_id:
+                    global_circuit_breaker.record(route_id, url, e)
+                    if global_circuit_breaker.is_open(route_id, url):
+                        return None
+
+            if attempt + 1 < retries:
+                _log_overall(self, f"{log_prefix}: {_('lki.install.status.retrying') % (attempt + 2, retries)}")
+                self._cancel_event.wait(min(2 ** attempt, 5))
+
+        return None
 
     def _on_download_complete(self, job: Optional[DownloadJob], success: bool):
         """(在主线程中) 在下载完成后更新任务状态。"""
@@ -791,7 +1485,7 @@ class InstallationManager:
                     files_info = {'i18n': {}, 'ee': {}, 'font': {}, 'mods': {}}
                     try:
                         core_rel_path = f"mods/{dest_core_mod_path.name}"
-                        files_info["i18n"][core_rel_path] = utils.get_sha256(dest_core_mod_path)
+                        files_info["i18n"][core_rel_path] = sha256_file(dest_core_mod_path)
                     except Exception as e:
                         # 如果核心包哈希失败，这是致命错误
                         raise Exception(f"Critical error hashing core mod: {e}") from e
@@ -801,7 +1495,7 @@ class InstallationManager:
                         try:
                             root_utils.copy_with_log(ee_mkmod_path, dest_ee_mod_path)
                             ee_rel_path = f"mods/{dest_ee_mod_path.name}"
-                            files_info["ee"][ee_rel_path] = utils.get_sha256(dest_ee_mod_path)
+                            files_info["ee"][ee_rel_path] = sha256_file(dest_ee_mod_path)
                         except Exception as e:
                             log(_('lki.install.debug.hash_failed') % (f"{task.task_name} (EE)", e))
                             non_critical_errors.append(_('lki.component.ee'))
@@ -811,7 +1505,7 @@ class InstallationManager:
                         try:
                             root_utils.copy_with_log(fo_mkmod_path, dest_fo_mod_path)
                             font_rel_path = f"mods/{dest_fo_mod_path.name}"
-                            files_info["font"][font_rel_path] = utils.get_sha256(dest_fo_mod_path)
+                            files_info["font"][font_rel_path] = sha256_file(dest_fo_mod_path)
                         except Exception as e:
                             log(_('lki.install.debug.hash_failed') % (f"{task.task_name} (Font)", e))
                             non_critical_errors.append(_('lki.component.font'))
@@ -821,7 +1515,7 @@ class InstallationManager:
                         try:
                             root_utils.copy_with_log(mods_mo_mkmod_path, dest_mo_mod_path)
                             mods_mo_rel_path = f"mods/{dest_mo_mod_path.name}"
-                            files_info["mods"][mods_mo_rel_path] = utils.get_sha256(dest_mo_mod_path)
+                            files_info["mods"][mods_mo_rel_path] = sha256_file(dest_mo_mod_path)
                         except Exception as e:
                             log(_('lki.install.debug.hash_failed') % (f"{task.task_name} (Mods-MO)", e))
                             non_critical_errors.append(_('lki.component.mods'))
@@ -831,7 +1525,7 @@ class InstallationManager:
                         try:
                             root_utils.copy_with_log(mods_json_mkmod_path, dest_json_mod_path)
                             mods_json_rel_path = f"mods/{dest_json_mod_path.name}"
-                            files_info["mods"][mods_json_rel_path] = utils.get_sha256(dest_json_mod_path)
+                            files_info["mods"][mods_json_rel_path] = sha256_file(dest_json_mod_path)
                         except Exception as e:
                             log(_('lki.install.debug.hash_failed') % (f"{task.task_name} (Mods-JSON)", e))
                             # 仅当组件尚未在列表中时才添加
@@ -894,6 +1588,8 @@ class InstallationManager:
             log(f"Error in install worker for {task.task_name}: {e}")
             traceback.print_exc()
             self._mark_task_failed(task, str(e))
+        finally:
+            self._unpin_task(task)
 
     def _uninstall_worker(self, task: InstallationTask):
         """(在线程中) 为单个实例执行文件删除。"""
@@ -974,6 +1670,8 @@ class InstallationManager:
             status_key = 'lki.uninstall.status.failed' if self.is_uninstalling else 'lki.install.status.failed'
             status_text = f"{_(status_key)}: {reason}"
             _log_task(task, status_text, 100)  # (日志现在也使用最终文本)
+        if not self.is_uninstalling:
+            self._unpin_task(task)
 
     def _mark_task_finished(self, task: InstallationTask, success: bool, status_key: str = 'lki.install.status.done'):
         from localizer import _
@@ -983,14 +1681,34 @@ class InstallationManager:
             self.root_tk.after(0, self.window.mark_task_complete, task.task_name, success, status_text)
         self._check_if_all_finished()
 
+    def _log_hashing_stats(self):
+        """(新增) 与传输统计一起报告本次安装的哈希计算量 (文件数、字节数、速度与跳过的未变化文件)。"""
+        from localizer import _
+        stats = get_hashing_stats()
+        start = self._hashing_stats_start
+        files = int(stats['files_hashed'] - start.get('files_hashed', 0))
+        hashed = stats['bytes_hashed'] - start.get('bytes_hashed', 0)
+        seconds = stats['seconds'] - start.get('seconds', 0)
+        memo_hits = int(stats['memo_hits'] - start.get('memo_hits', 0))
+        if not files and not memo_hits:
+            return
+        _log_overall(self, _('lki.install.status.hash_stats') % (
+            files, format_size(hashed), format_size(hashed / seconds if seconds else 0), memo_hits))
+
     def _check_if_all_finished(self):
         from localizer import _
         with self._lock:
             all_done = all(t.status in ["done", "failed"] for t in self.tasks)
             if all_done:
                 all_done_key = 'lki.uninstall.status.all_done' if self.is_uninstalling else 'lki.action.status.all_done'
+                if not self.is_uninstalling:
+                    self._log_hashing_stats()
                 _log_overall(self, _(all_done_key))
                 self.root_tk.after(0, self.window.all_tasks_finished)
+                global_prefetcher.resume()
+                if not self.is_uninstalling:
+                    # (新增) 安装结束后在后台执行缓存容量管理
+                    cache_manager.enforce_budget_in_background()
                 if self.on_complete_callback:
                     self.root_tk.after(0, self.on_complete_callback)
 
@@ -1006,6 +1724,16 @@ def _log_overall(manager: InstallationManager, message: str):
         manager.root_tk.after(0, manager.window.update_overall_status, message)
 
 
+def _format_transfer(snapshot: TransferSnapshot) -> str:
+    """将传输状态格式化为任务行中显示的文字。"""
+    from localizer import _
+    if not snapshot.total:
+        return f"{format_size(snapshot.received)} ({format_size(snapshot.speed)}/s)"
+    eta = format_duration(snapshot.eta) if snapshot.eta is not None else '--:--'
+    return _('lki.install.status.transfer_stats') % (format_size(snapshot.received), format_size(snapshot.total),
+                                                      format_size(snapshot.speed), eta)
+
+
 def _log_task(task: InstallationTask, message: str, progress: Optional[float] = None):
     """安全地记录到任务的 UI。"""
     log(f"[{task.task_name}] {message}")
@@ -26,7 +26,10 @@ from typing import Dict, List, Union, Any, Optional, Tuple, Set
 
 import polib
 
+import dirs
 from dirs import CACHE_DIR, TEMP_DIR
+from file_lock import FileLock
+from hashing import sha256_file
 from utils import copy_with_log
 
 BUILTIN_LOCALE_CONFIG_CJK = '''<locale_config>
@@ -55,13 +58,38 @@ def mkdir(t_dir: Any):
 
 
 def clear_temp_dir():
-    """在每次安装开始时清除临时文件夹"""
-    if TEMP_DIR.is_dir():
-        try:
-            shutil.rmtree(TEMP_DIR)
-        except Exception as e:
-            log(f"Warning: Could not clear temp dir: {e}")
-    mkdir(TEMP_DIR)
+    """
+    (已修改) 在每次安装开始时清除本进程的临时文件夹，
+    并清理已退出的进程遗留的临时文件夹 (其他正在运行的进程的临时文件夹不受影响)。
+    """
+    dirs.ensure_temp_dir()
+    for entry in TEMP_DIR.iterdir():
+        if entry.name == dirs.ALIVE_LOCK_NAME:
+            continue
+        _remove_path(entry)
+
+    for entry in dirs.TEMP_ROOT.iterdir():
+        if entry == TEMP_DIR:
+            continue
+        if entry.is_dir() and entry.name.isdigit():
+            # .alive 锁可以获取，说明持有它的进程已经退出
+            alive_lock = FileLock(entry / dirs.ALIVE_LOCK_NAME)
+            if not alive_lock.acquire(blocking=False):
+                continue
+            alive_lock.release()
+            log(f"Removing temp dir left by exited process {entry.name}")
+        # 其余条目是旧版本 (所有进程共用 temp 目录时) 遗留的文件
+        _remove_path(entry)
+
+
+def _remove_path(path: Path):
+    try:
+        if path.is_dir():
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+    except Exception as e:
+        log(f"Warning: Could not clear temp path {path}: {e}")
 
 
 def process_possible_gbk_zip(zip_file: zipfile.ZipFile):
@@ -78,20 +106,10 @@ def process_possible_gbk_zip(zip_file: zipfile.ZipFile):
     return zip_file
 
 
-def get_sha256(filepath: Path) -> Optional[str]:
-    """计算文件的 SHA256 哈希值"""
-    if not filepath.is_file():
-        return None
-
-    sha256_hash = hashlib.sha256()
-    try:
-        with open(filepath, "rb") as f:
-            for byte_block in iter(lambda: f.read(4096), b""):
-                sha256_hash.update(byte_block)
-            return sha256_hash.hexdigest()
-    except Exception as e:
-        log(f"Error calculating SHA256 for {filepath}: {e}")
-        return None
+def parse_version_info(text: str) -> Tuple[Optional[str], str]:
+    """解析 version.info：第一行为子版本，第二行为对应的游戏主版本。返回 (子版本, 主版本)。"""
+    lines = text.splitlines()
+    return (lines[0].strip() if lines else None), (lines[1].strip() if len(lines) >= 2 else '?')
 
 
 def fix_paths_xml(build_dir: Path):
@@ -177,25 +195,85 @@ def write_locale_config_to_temp(lang_code: str) -> Optional[Path]:
     return config_path
 
 
-def create_mkmod(output_path: Path, files_to_add: Dict[str, Path]):
+class _HashingWriter:
+    """
+    写入文件的同时计算 SHA-256 的包装器 (供 zipfile 使用)。
+    zipfile 写完一个条目后会回到该条目的本地文件头改写 CRC 与大小，然后回到文件末尾，
+    因此文件尾部的数据先暂存，等写入位置回到文件末尾时才计入摘要。
+    """
+
+    def __init__(self, raw):
+        self.raw = raw
+        self._hash = hashlib.sha256()
+        self._hashed = 0
+        self._tail = bytearray()
+        self._pos = 0
+        self.valid = True
+
+    def _commit(self):
+        self._hash.update(self._tail)
+        self._hashed += len(self._tail)
+        self._tail = bytearray()
+
+    def write(self, data) -> int:
+        data = memoryview(data).cast('B')
+        start = self._pos - self._hashed
+        if start < 0 or start > len(self._tail):
+            # 改写已计入摘要的数据，或在文件中留下空洞：摘要不再可信
+            self.valid = False
+        else:
+            self._tail[start:start + len(data)] = data
+        self.raw.write(data)
+        self._pos += len(data)
+        return len(data)
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        self._pos = self.raw.seek(offset, whence)
+        if self._pos == self._hashed + len(self._tail):
+            self._commit()
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seekable(self) -> bool:
+        return True
+
+    def flush(self):
+        self.raw.flush()
+
+    def hexdigest(self) -> Optional[str]:
+        if not self.valid or self._pos != self._hashed + len(self._tail):
+            return None
+        self._commit()
+        return self._hash.hexdigest()
+
+
+def create_mkmod(output_path: Path, files_to_add: Dict[str, Path]) -> Optional[str]:
     """
     创建一个不压缩的 .mkmod (zip) 文件.
     files_to_add: {'zip内的路径': '本地文件路径'}
+    (已修改) 返回写入时同步计算的 SHA-256；失败时返回 None。
     """
     mkdir(output_path.parent)
     try:
-        with zipfile.ZipFile(output_path, 'w', compression=zipfile.ZIP_STORED) as zf:
-            for arcname, local_path in files_to_add.items():
-                if local_path and local_path.is_file():
-                    # Check for placeholder file (using startswith for safe check)
-                    if local_path.name.startswith("mod_placeholder_src"):
-                        # Write "placeholder" content directly into the zip
-                        zf.writestr(arcname, "placeholder")
-                    else:
-                        zf.write(local_path, arcname=arcname)
+        with open(output_path, 'wb') as raw:
+            writer = _HashingWriter(raw)
+            with zipfile.ZipFile(writer, 'w', compression=zipfile.ZIP_STORED) as zf:
+                for arcname, local_path in files_to_add.items():
+                    if local_path and local_path.is_file():
+                        # Check for placeholder file (using startswith for safe check)
+                        if local_path.name.startswith("mod_placeholder_src"):
+                            # Write "placeholder" content directly into the zip
+                            zf.writestr(arcname, "placeholder")
+                        else:
+                            zf.write(local_path, arcname=arcname)
         log(f"Created {output_path}")
+        # 写入顺序不符合预期时 (理论上不会发生) 退回到重新读取文件
+        return writer.hexdigest() or sha256_file(output_path)
     except Exception as e:
         log(f"Failed to create {output_path}: {e}")
+        return None
 
 
 # (Mods 助手函数: _extract_zip_mods 保持不变)
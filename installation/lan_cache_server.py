@@ -0,0 +1,303 @@
+#  LKInstaller Next, a blazing-speed localization installer for Mir Korabley
+#  Copyright (C) 2025 LocalizedKorabli <localizedkorabli@outlook.com>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+局域网缓存服务器 (--serve-cache)：通过 HTTP 向局域网中的其他电脑提供本机 CACHE_DIR 中的有效缓存。
+
+- /manifest.json          所有可提供的文件及其 SHA-256、大小与版本；
+- /blobs/<sha256>         按哈希寻址的文件；
+- LAN_L10N_PATHS 与 LAN_FONTS_PATHS 中的路径 (见 localization_sources)：
+  与公共线路相同结构的 MO / EE / 字体 / 版本文件与来源清单，供客户端的 'lan' 线路直接使用
+  (MO 按主版本与子版本寻址，本机缓存的每个有效版本都可以下载)。
+
+只提供已经完整提交的缓存条目 (索引与数据一致)，支持 Range 请求以便客户端分段下载与续传。
+"""
+import json
+import os
+import threading
+import time
+from email.utils import formatdate
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+import installation.cache_store as cache_store
+import installation.installation_utils as utils
+from installation.offline_manifest import OfflineManifest
+from localization_sources import global_source_manager, LAN_DEFAULT_PORT, LAN_MANIFEST_PATH, LAN_BLOB_PATH, \
+    LAN_L10N_PATHS, LAN_FONTS_PATHS
+from logger import log
+
+# 索引的有效期 (秒)：分段下载的并发请求共用同一次扫描结果
+INDEX_TTL = 10
+COPY_BUFFER_SIZE = 1024 * 1024
+FONTS_ASSET_ID = 'fonts_srcwagon'
+
+
+class _Blob:
+    """索引中的一个文件。"""
+
+    def __init__(self, path: Path, sha256: str, size: int, content_type: str = 'application/octet-stream'):
+        self.path = path
+        self.sha256 = sha256
+        self.size = size
+        self.content_type = content_type
+
+
+class CacheIndex:
+    """扫描 CACHE_DIR，建立 URL 路径 -> 文件 以及 SHA-256 -> 文件 的映射。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._built_at = 0.0
+        self.paths: Dict[str, _Blob] = {}
+        self.texts: Dict[str, Tuple[bytes, str]] = {}
+        self.blobs: Dict[str, _Blob] = {}
+        self.manifest: Dict[str, Any] = {}
+
+    def refresh(self, force: bool = False):
+        with self._lock:
+            if not force and time.monotonic() - self._built_at < INDEX_TTL:
+                return
+            self._build()
+            self._built_at = time.monotonic()
+
+    def _add(self, url_path: str, blob: _Blob) -> Dict[str, Any]:
+        self.paths[url_path] = blob
+        self.blobs[blob.sha256] = blob
+        return {'sha256': blob.sha256, 'size': blob.size, 'blob': LAN_BLOB_PATH.format(sha256=blob.sha256)}
+
+    def _add_mo_versions(self, lang_code: str, instance_type: str, major: str) -> Dict[str, Dict[str, Any]]:
+        """登记该主版本下所有缓存有效的 MO，返回 子版本 -> 清单条目。"""
+        entries: Dict[str, Dict[str, Any]] = {}
+        main_dir = utils.L10N_CACHE / lang_code / major
+        if not main_dir.is_dir():
+            return entries
+        for cache_path in main_dir.iterdir():
+            info = cache_store.load(cache_path / "global.mo", cache_path / "file_info.json")
+            if not info:
+                continue
+            blob = _Blob(cache_store.get_entry_path(info), info['file_sha256'], info['size'])
+            url_path = LAN_L10N_PATHS['mo'].format(lang=lang_code, type=instance_type, major=major, sub=cache_path.name)
+            entries[cache_path.name] = self._add(url_path, blob)
+        return entries
+
+    def _build(self):
+        self.paths, self.texts, self.blobs = {}, {}, {}
+        # 每次重新读取离线清单：本机的安装会不断更新它
+        offline_manifest = OfflineManifest()
+        manifest: Dict[str, Any] = {'generated': time.time(), 'l10n': {}, 'ee': {}, 'fonts': {}}
+
+        for lang_code in global_source_manager.get_all_sources():
+            for instance_type in ('production', 'pts'):
+                fmt = {'lang': lang_code, 'type': instance_type}
+
+                # MO：按 (主版本, 子版本) 提供所有缓存有效的版本；
+                # version.info 与来源清单描述该语言与实例类型最近解析到、且缓存有效的版本
+                for major, sub in offline_manifest.get_recorded_versions(lang_code, instance_type):
+                    entry = self._add_mo_versions(lang_code, instance_type, major).get(sub)
+                    if not entry or f"{lang_code}|{instance_type}" in manifest['l10n']:
+                        continue
+                    manifest['l10n'][f"{lang_code}|{instance_type}"] = {**entry, 'major': major, 'sub': sub}
+                    # version.info: 第一行为子版本，第二行为对应的游戏主版本
+                    self.texts[LAN_L10N_PATHS['version'].format(**fmt)] = (f"{sub}\n{major}\n".encode('utf-8'),
+                                                                          'text/plain; charset=utf-8')
+
+                ee_dir = utils.EE_CACHE / lang_code / instance_type
+                info = cache_store.load(ee_dir / "ee.zip", ee_dir / "file_info.json")
+                if info:
+                    blob = _Blob(cache_store.get_entry_path(info), info['file_sha256'], info['size'], 'application/zip')
+                    manifest['ee'][f"{lang_code}|{instance_type}"] = self._add(LAN_L10N_PATHS['ee'].format(**fmt), blob)
+
+                # 来源清单 (见 source_manifest)：客户端一次请求即可得到子版本与各文件的哈希
+                mo_entry = manifest['l10n'].get(f"{lang_code}|{instance_type}")
+                if mo_entry:
+                    files = {'mo': mo_entry}
+                    if f"{lang_code}|{instance_type}" in manifest['ee']:
+                        files['ee'] = manifest['ee'][f"{lang_code}|{instance_type}"]
+                    source_manifest = {
+                        'schema': 1, 'sub': mo_entry['sub'], 'majors': [mo_entry['major']],
+                        'files': {file_type: {'url': entry['blob'], 'sha256': entry['sha256'], 'size': entry['size']}
+                                  for file_type, entry in files.items()}
+                    }
+                    self.texts[LAN_L10N_PATHS['manifest'].format(**fmt)] = (json.dumps(source_manifest).encode('utf-8'),
+                                                                           'application/json')
+
+        # 字体：mkmod 本身就是 zip，客户端按字体包 zip 的流程解压并重新打包即可
+        mkmod_path = utils.FONTS_CACHE / "srcwagon_mk.mkmod"
+        info = cache_store.load(mkmod_path, utils.FONTS_CACHE / "cache_info.json")
+        if info and info.get('version'):
+            blob = _Blob(cache_store.get_entry_path(info), info['file_sha256'], info['size'], 'application/zip')
+            fmt = {'asset': FONTS_ASSET_ID}
+            manifest['fonts'][FONTS_ASSET_ID] = {**self._add(LAN_FONTS_PATHS['zip'].format(**fmt), blob),
+                                                 'version': info['version']}
+            self.texts[LAN_FONTS_PATHS['version'].format(**fmt)] = (
+                json.dumps({'version': info['version']}).encode('utf-8'), 'application/json')
+
+        self.manifest = manifest
+        self.texts[LAN_MANIFEST_PATH] = (json.dumps(manifest, indent=2).encode('utf-8'), 'application/json')
+
+    def resolve(self, url_path: str) -> Tuple[Optional[_Blob], Optional[Tuple[bytes, str]]]:
+        """返回 (文件, 文本内容) 之一；都不存在时返回 (None, None)。"""
+        self.refresh()
+        with self._lock:
+            if url_path in self.texts:
+                return None, self.texts[url_path]
+            blob_prefix = LAN_BLOB_PATH.format(sha256='')
+            if url_path.startswith(blob_prefix):
+                return self.blobs.get(url_path[len(blob_prefix):].lower()), None
+            return self.paths.get(url_path), None
+
+
+def _parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """解析单个 'bytes=start-end' 区间；不支持或无效时返回 None。"""
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    start_text, _, end_text = header[len('bytes='):].strip().partition('-')
+    try:
+        if start_text:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+        else:
+            # bytes=-N：最后 N 个字节
+            start = max(0, size - int(end_text))
+            end = size - 1
+    except ValueError:
+        return None
+    end = min(end, size - 1)
+    if start > end:
+        return None
+    return start, end
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    server_version = 'LKInstallerCache/1'
+    index: CacheIndex = None
+
+    def do_HEAD(self):
+        self._handle(send_body=False)
+
+    def do_GET(self):
+        self._handle(send_body=True)
+
+    def _handle(self, send_body: bool):
+        url_path = self.path.split('?', 1)[0]
+        try:
+            blob, text = self.index.resolve(url_path)
+        except Exception as e:
+            log(f"LAN cache: failed to index cache: {e}")
+            self.send_error(500)
+            return
+
+        if text is not None:
+            body, content_type = text
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+            if send_body:
+                self.wfile.write(body)
+            return
+
+        if blob is None:
+            self.send_error(404)
+            return
+        self._send_blob(blob, send_body)
+
+    def _send_blob(self, blob: _Blob, send_body: bool):
+        try:
+            f = open(blob.path, 'rb')
+        except OSError:
+            self.send_error(404)
+            return
+
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            etag = f'"{blob.sha256}"'
+            byte_range = _parse_range(self.headers.get('Range'), size)
+            # If-Range 与当前版本不一致时返回完整内容
+            if_range = self.headers.get('If-Range')
+            if if_range and if_range != etag:
+                byte_range = None
+            if self.headers.get('Range') and byte_range is None and not if_range and size > 0:
+                self.send_response(416)
+                self.send_header('Content-Range', f"bytes */{size}")
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+            start, end = byte_range if byte_range else (0, size - 1)
+            self.send_response(206 if byte_range else 200)
+            self.send_header('Content-Type', blob.content_type)
+            self.send_header('Content-Length', str(end - start + 1))
+            self.send_header('Accept-Ranges', 'bytes')
+            self.send_header('ETag', etag)
+            self.send_header('Last-Modified', formatdate(os.fstat(f.fileno()).st_mtime, usegmt=True))
+            if byte_range:
+                self.send_header('Content-Range', f"bytes {start}-{end}/{size}")
+            self.end_headers()
+            if not send_body:
+                return
+
+            f.seek(start)
+            remaining = end - start + 1
+            try:
+                while remaining > 0:
+                    chunk = f.read(min(COPY_BUFFER_SIZE, remaining))
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+                    remaining -= len(chunk)
+            except (ConnectionError, OSError):
+                # 客户端断开 (例如取消下载)
+                pass
+
+    def log_message(self, format, *args):
+        log(f"LAN cache: {self.address_string()} {format % args}")
+
+
+class LanCacheServer:
+    """在局域网中提供本机缓存的 HTTP 服务器。"""
+
+    def __init__(self, host: str = '0.0.0.0', port: int = LAN_DEFAULT_PORT):
+        self.index = CacheIndex()
+        handler = type('_BoundRequestHandler', (_RequestHandler,), {'index': self.index})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self.httpd.server_address[1]
+
+    def serve_forever(self):
+        self.index.refresh(force=True)
+        manifest = self.index.manifest
+        log(f"LAN cache server listening on port {self.port} "
+            f"({len(manifest['l10n'])} MO, {len(manifest['ee'])} EE, {len(manifest['fonts'])} fonts)")
+        self.httpd.serve_forever()
+
+    def start(self):
+        """在后台线程中运行。"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
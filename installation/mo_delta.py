@@ -0,0 +1,180 @@
+#  LKInstaller Next, a blazing-speed localization installer for Mir Korabley
+#  Copyright (C) 2025 LocalizedKorabli <localizedkorabli@outlook.com>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+global.mo 子版本之间的二进制增量补丁 (.lkdelta)。
+
+文件格式 (大端序):
+    头部: b'LKDT' | 格式版本 (1 字节) | 基础文件大小 (8) | 基础文件 SHA-256 (32)
+          | 目标文件大小 (8) | 目标文件 SHA-256 (32)
+    正文: zlib 压缩的指令流
+          b'C' | 偏移 (8) | 长度 (4)   —— 从基础文件复制
+          b'A' | 长度 (4) | 数据         —— 追加新数据
+
+生成补丁: python -m installation.mo_delta <base.mo> <target.mo> <out.lkdelta>
+"""
+import hashlib
+import struct
+import sys
+import zlib
+from pathlib import Path
+from typing import List
+
+DELTA_MAGIC = b'LKDT'
+DELTA_FORMAT_VERSION = 1
+DELTA_SUFFIX = '.lkdelta'
+
+_HEADER = struct.Struct('>4sBQ32sQ32s')
+_COPY = struct.Struct('>QI')
+_ADD = struct.Struct('>I')
+
+# 生成补丁时用于匹配的块大小
+BLOCK_SIZE = 64
+# 单条指令的最大长度 (受 4 字节长度字段限制)
+_MAX_OP_LENGTH = 0xFFFFFFFF
+
+
+class DeltaError(Exception):
+    """补丁无效、与基础文件不匹配或结果校验失败。"""
+
+
+def _match_forward(a: bytes, ai: int, b: bytes, bi: int) -> int:
+    """返回 a[ai:] 与 b[bi:] 的公共前缀长度。"""
+    limit = min(len(a) - ai, len(b) - bi)
+    length = 0
+    # 先按大块比较，再逐字节比较
+    step = 4096
+    while length + step <= limit and a[ai + length:ai + length + step] == b[bi + length:bi + length + step]:
+        length += step
+    while length < limit and a[ai + length] == b[bi + length]:
+        length += 1
+    return length
+
+
+def create_delta(base: bytes, target: bytes) -> bytes:
+    """生成从 base 到 target 的补丁。"""
+    index = {}
+    for offset in range(0, len(base) - BLOCK_SIZE + 1, BLOCK_SIZE):
+        index.setdefault(base[offset:offset + BLOCK_SIZE], offset)
+
+    ops: List[bytes] = []
+
+    def _add(data: bytes):
+        for start in range(0, len(data), _MAX_OP_LENGTH):
+            chunk = data[start:start + _MAX_OP_LENGTH]
+            ops.append(b'A' + _ADD.pack(len(chunk)) + chunk)
+
+    def _copy(offset: int, length: int):
+        while length > 0:
+            size = min(length, _MAX_OP_LENGTH)
+            ops.append(b'C' + _COPY.pack(offset, size))
+            offset += size
+            length -= size
+
+    literal_start = 0
+    pos = 0
+    while pos + BLOCK_SIZE <= len(target):
+        base_offset = index.get(target[pos:pos + BLOCK_SIZE])
+        if base_offset is None:
+            pos += 1
+            continue
+
+        # 向前、向后扩展匹配区域
+        target_start, base_start = pos, base_offset
+        while target_start > literal_start and base_start > 0 \
+                and target[target_start - 1] == base[base_start - 1]:
+            target_start -= 1
+            base_start -= 1
+        length = (pos - target_start) + _match_forward(target, pos, base, base_offset)
+
+        if target_start > literal_start:
+            _add(target[literal_start:target_start])
+        _copy(base_start, length)
+        pos = literal_start = target_start + length
+
+    if literal_start < len(target):
+        _add(target[literal_start:])
+
+    header = _HEADER.pack(DELTA_MAGIC, DELTA_FORMAT_VERSION,
+                          len(base), hashlib.sha256(base).digest(),
+                          len(target), hashlib.sha256(target).digest())
+    return header + zlib.compress(b''.join(ops), 9)
+
+
+def apply_delta(base: bytes, delta: bytes) -> bytes:
+    """
+    将补丁应用到 base，返回目标文件内容。
+    基础文件不匹配、补丁损坏或结果的 SHA-256 与补丁中记录的不一致时抛出 DeltaError。
+    """
+    if len(delta) < _HEADER.size:
+        raise DeltaError("Delta is truncated")
+    magic, version, base_size, base_hash, target_size, target_hash = _HEADER.unpack_from(delta)
+    if magic != DELTA_MAGIC or version != DELTA_FORMAT_VERSION:
+        raise DeltaError("Unsupported delta format")
+    if len(base) != base_size or hashlib.sha256(base).digest() != base_hash:
+        raise DeltaError("Delta does not apply to this base file")
+
+    try:
+        ops = zlib.decompress(delta[_HEADER.size:])
+    except zlib.error as e:
+        raise DeltaError(f"Corrupted delta: {e}")
+
+    result = bytearray()
+    pos = 0
+    try:
+        while pos < len(ops):
+            op = ops[pos:pos + 1]
+            pos += 1
+            if op == b'C':
+                offset, length = _COPY.unpack_from(ops, pos)
+                pos += _COPY.size
+                if offset + length > len(base):
+                    raise DeltaError("Copy out of range")
+                result += base[offset:offset + length]
+            elif op == b'A':
+                (length,) = _ADD.unpack_from(ops, pos)
+                pos += _ADD.size
+                if pos + length > len(ops):
+                    raise DeltaError("Add out of range")
+                result += ops[pos:pos + length]
+                pos += length
+            else:
+                raise DeltaError(f"Unknown delta op {op!r}")
+            if len(result) > target_size:
+                raise DeltaError("Delta output exceeds expected size")
+    except struct.error as e:
+        raise DeltaError(f"Corrupted delta: {e}")
+
+    if len(result) != target_size or hashlib.sha256(result).digest() != target_hash:
+        raise DeltaError("Patched file does not match the expected SHA-256")
+    return bytes(result)
+
+
+def get_target_sha256(delta: bytes) -> str:
+    """读取补丁中记录的目标文件 SHA-256 (十六进制)。"""
+    if len(delta) < _HEADER.size:
+        raise DeltaError("Delta is truncated")
+    return _HEADER.unpack_from(delta)[5].hex()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 4:
+        print(f"Usage: python -m installation.mo_delta <base.mo> <target.mo> <out{DELTA_SUFFIX}>")
+        sys.exit(1)
+    base_data = Path(sys.argv[1]).read_bytes()
+    target_data = Path(sys.argv[2]).read_bytes()
+    delta_data = create_delta(base_data, target_data)
+    Path(sys.argv[3]).write_bytes(delta_data)
+    print(f"{len(target_data)} -> {len(delta_data)} bytes")
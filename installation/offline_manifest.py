@@ -0,0 +1,93 @@
+#  LKInstaller Next, a blazing-speed localization installer for Mir Korabley
+#  Copyright (C) 2025 LocalizedKorabli <localizedkorabli@outlook.com>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Tuple
+
+import atomic_io
+from dirs import CACHE_DIR
+from logger import log
+
+offline_manifest_path: Path = CACHE_DIR / 'offline_manifest.json'
+
+
+class OfflineManifest:
+    """
+    离线安装所需的最近一次在线结果 (offline_manifest.json):
+    - l10n: (语言, 实例类型, 游戏主版本) -> 最近解析到的子版本
+    (字体与 EE 的缓存索引中只有一个条目，离线时直接使用该条目)
+    网络不可用或指定了 --offline 时，安装只使用这里记录的缓存，不访问网络。
+    """
+
+    def __init__(self, path: Path = offline_manifest_path):
+        self.path = path
+        self._lock = threading.Lock()
+        # 由 --offline 设置：本次运行完全不访问网络
+        self.forced = False
+        self.data: Dict[str, Dict[str, Any]] = {'l10n': {}}
+        self.load()
+
+    def load(self):
+        if not self.path.is_file():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                for section in self.data:
+                    if isinstance(data.get(section), dict):
+                        self.data[section] = data[section]
+        except Exception as e:
+            log(f"Failed to load offline manifest: {e}")
+
+    def save(self):
+        with self._lock:
+            data = {section: dict(entries) for section, entries in self.data.items()}
+        try:
+            atomic_io.write_json(self.path, data)
+        except OSError as e:
+            log(f"Failed to save offline manifest: {e}")
+
+    def _update(self, section: str, key: str, entry: Dict[str, Any]):
+        with self._lock:
+            self.data[section][key] = {**entry, 'updated': time.time()}
+        self.save()
+
+    def _get(self, section: str, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self.data[section].get(key)
+            return dict(entry) if isinstance(entry, dict) else None
+
+    def record_version(self, lang_code: str, instance_type: str, major: str, sub: str):
+        self._update('l10n', f"{lang_code}|{instance_type}|{major}", {'sub': sub})
+
+    def get_version(self, lang_code: str, instance_type: str, major: str) -> Optional[str]:
+        entry = self._get('l10n', f"{lang_code}|{instance_type}|{major}")
+        return entry.get('sub') if entry else None
+
+    def get_recorded_versions(self, lang_code: str, instance_type: str) -> List[Tuple[str, str]]:
+        """该语言与实例类型记录过的所有 (主版本, 子版本)，最近记录的在前。"""
+        prefix = f"{lang_code}|{instance_type}|"
+        with self._lock:
+            entries = [(key[len(prefix):], entry) for key, entry in self.data['l10n'].items()
+                       if key.startswith(prefix) and isinstance(entry, dict) and entry.get('sub')]
+        entries.sort(key=lambda item: item[1].get('updated', 0), reverse=True)
+        return [(major, entry['sub']) for major, entry in entries]
+
+
+global_offline_manifest = OfflineManifest()
@@ -0,0 +1,250 @@
+#  LKInstaller Next, a blazing-speed localization installer for Mir Korabley
+#  Copyright (C) 2025 LocalizedKorabli <localizedkorabli@outlook.com>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+后台预取：检查已登记实例的预设所用的 (语言, 实例类型) 是否发布了新的子版本，并提前下载到缓存，
+之后的安装直接命中缓存。
+
+- 设置 prefetch.enabled 开启后 (默认关闭)，界面空闲时由 schedule() 按 prefetch.interval_minutes 定期运行；
+  也可以用 --prefetch 单独运行一次；
+- 安装或卸载开始时暂停 (pause)，已下载的部分保留在 .part 中，安装会从断点继续；
+- 条目正被其他进程下载时直接跳过，不等待；
+- 使用独立的后台限速器 (background_bandwidth_limiter)，同时进行的交互式安装不受后台限速影响。
+"""
+import os
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Set, Tuple
+
+import requests
+
+import installation.cache_store as cache_store
+import installation.installation_utils as utils
+import settings
+from installation.offline_manifest import global_offline_manifest
+from installation.source_manifest import SourceManifest
+from localization_sources import global_source_manager, get_download_route_priority
+from logger import log
+from network import downloader
+from network.circuit_breaker import global_circuit_breaker
+from network.http_cache import global_http_cache
+from network.rate_limiter import background_bandwidth_limiter
+
+# 界面启动后第一次检查的延迟，以及之后检查是否到期的间隔 (毫秒)
+STARTUP_DELAY_MS = 2 * 60 * 1000
+CHECK_INTERVAL_MS = 60 * 1000
+
+
+class Prefetcher:
+    """后台预取新的 MO 子版本。"""
+
+    def __init__(self):
+        self._cancel_event = threading.Event()
+        self._running = threading.Lock()
+        self._paused = False
+        self._last_run = 0.0
+
+    def pause(self):
+        """(安装或卸载开始时) 取消正在进行的预取，并暂停定时检查。"""
+        self._paused = True
+        self._cancel_event.set()
+
+    def resume(self):
+        self._paused = False
+
+    @property
+    def is_running(self) -> bool:
+        return self._running.locked()
+
+    def get_targets(self) -> List[Tuple[str, str, str]]:
+        """已登记实例的预设所用的 (语言, 实例类型, 游戏主版本)。"""
+        from instance.game_instance import GameInstance
+        from instance.instance_manager import global_instance_manager
+
+        targets: Set[Tuple[str, str, str]] = set()
+        for instance_id, data in global_instance_manager.get_all().items():
+            lang_codes = {preset.get('lang_code') for preset in data.get('presets', {}).values()}
+            lang_codes.discard(None)
+            if not lang_codes:
+                continue
+            try:
+                instance = GameInstance(instance_id, Path(data['path']), data['name'], data['type'])
+            except Exception as e:
+                log(f"Prefetch: skipping instance {data.get('name')}: {e}")
+                continue
+            latest = instance.get_latest_version()
+            if not latest or not latest.exe_version:
+                continue
+            major = ".".join(latest.exe_version.split('.')[:2])
+            for lang_code in lang_codes:
+                targets.add((lang_code, instance.type, major))
+        return sorted(targets)
+
+    def run_once(self) -> int:
+        """检查所有目标并下载新的子版本，返回下载的数量。已在运行时直接返回 0。"""
+        if not self._running.acquire(blocking=False):
+            return 0
+        try:
+            self._cancel_event.clear()
+            self._last_run = time.monotonic()
+            # 预取总是使用独立的后台限速器，不影响同时进行的交互式安装
+            background_bandwidth_limiter.refresh()
+            fetched = 0
+            routes = get_download_route_priority()
+            for lang_code, instance_type, major in self.get_targets():
+                if self._cancel_event.is_set():
+                    log("Prefetch cancelled.")
+                    break
+                try:
+                    if self._prefetch(lang_code, instance_type, major, routes):
+                        fetched += 1
+                except Exception as e:
+                    log(f"Prefetch of {lang_code}_{instance_type}_{major} failed: {e}")
+            return fetched
+        finally:
+            self._running.release()
+
+    def _fetch_text(self, route_id: str, url: str) -> Optional[str]:
+        if not global_circuit_breaker.allow(route_id, url):
+            return None
+        try:
+            text = global_http_cache.get_text(url, 5, use_fresh=False)
+        except requests.exceptions.RequestException as e:
+            global_circuit_breaker.record(route_id, url, e)
+            return None
+        global_circuit_breaker.record_success(route_id, url)
+        return text
+
+    def _resolve_sub_version(self, lang_code: str, instance_type: str, major: str,
+                             routes: List[str]) -> Optional[Tuple[str, str, str, Optional[str]]]:
+        """
+        按线路顺序获取来源清单或 version.info，返回 (线路, 子版本, MO 的 URL, 预期的 SHA-256)；
+        没有与游戏主版本匹配的版本时返回 None。
+        """
+        source = global_source_manager.get_source(lang_code)
+        if not source:
+            return None
+        for route_id in routes:
+            if self._cancel_event.is_set():
+                return None
+            urls = source.get_urls(instance_type, route_id)
+            if not urls:
+                continue
+            if urls.get('manifest'):
+                text = self._fetch_text(route_id, urls['manifest'])
+                try:
+                    manifest = SourceManifest.parse(text, urls['manifest']) if text is not None else None
+                except Exception as e:
+                    log(f"Prefetch: invalid source manifest {urls['manifest']}: {e}")
+                    manifest = None
+                if manifest:
+                    mo_file = manifest.get_file('mo')
+                    if manifest.supports(major) and mo_file:
+                        return route_id, manifest.sub, mo_file.url, mo_file.sha256
+                    continue
+            if not urls.get('version'):
+                continue
+            text = self._fetch_text(route_id, urls['version'])
+            if text is None:
+                continue
+            sub, remote_major = utils.parse_version_info(text)
+            # 局域网线路的 MO 按版本寻址，公共线路的 MO 为最新版本
+            mo_url = source.get_urls(instance_type, route_id, major, sub).get('mo') if sub else None
+            if mo_url and remote_major == major:
+                return route_id, sub, mo_url, None
+        return None
+
+    def _prefetch(self, lang_code: str, instance_type: str, major: str, routes: List[str]) -> bool:
+        resolved = self._resolve_sub_version(lang_code, instance_type, major, routes)
+        if not resolved:
+            return False
+        route_id, sub, mo_url, expected_sha256 = resolved
+
+        cache_path = utils.L10N_CACHE / lang_code / major / sub
+        mo_path = cache_path / "global.mo"
+        info_path = cache_path / "file_info.json"
+        if cache_store.load(mo_path, info_path):
+            return False
+
+        job_id = f"{lang_code}_{instance_type}_{major}.{sub}"
+        lock = cache_store.lock_entry(mo_path)
+        if not lock.acquire(blocking=False):
+            log(f"Prefetch: {job_id} is being downloaded by another process, skipping.")
+            return False
+        try:
+            # 获取锁之前其他进程可能已经提交
+            if cache_store.load(mo_path, info_path):
+                return False
+            utils.mkdir(cache_path)
+            if expected_sha256 and cache_store.adopt(info_path, expected_sha256):
+                global_offline_manifest.record_version(lang_code, instance_type, major, sub)
+                return False
+            # 只从返回该子版本的线路下载：其他镜像可能尚未同步，latest 可能是另一个子版本
+            log(f"Prefetch: downloading {job_id} from {route_id}")
+            try:
+                digest = downloader.download_segmented(mo_url, mo_path, 5, self._cancel_event.is_set,
+                                                       settings.global_settings.get('download.segments', 4),
+                                                       limiter=background_bandwidth_limiter)
+            except requests.exceptions.RequestException as e:
+                global_circuit_breaker.record(route_id, mo_url, e)
+                log(f"Prefetch: {job_id} failed on {route_id}: {e}")
+                return False
+            global_circuit_breaker.record_success(route_id, mo_url)
+            if not digest:
+                return False
+            if expected_sha256 and digest != expected_sha256:
+                log(f"Prefetch: {job_id} does not match the source manifest, discarding")
+                os.remove(mo_path)
+                return False
+            cache_store.commit(mo_path, info_path, {'file_sha256': digest})
+            global_offline_manifest.record_version(lang_code, instance_type, major, sub)
+            log(f"Prefetch: cached {job_id}")
+            return True
+        finally:
+            lock.release()
+
+    def start_background(self):
+        """在后台线程中运行一次。"""
+
+        def _run():
+            fetched = self.run_once()
+            log(f"Prefetch finished: {fetched} new sub-version(s) cached.")
+
+        threading.Thread(target=_run, daemon=True).start()
+
+    def _is_due(self) -> bool:
+        if self._paused or self.is_running or global_offline_manifest.forced:
+            return False
+        if not settings.global_settings.get('prefetch.enabled', False):
+            return False
+        try:
+            interval = max(1, int(settings.global_settings.get('prefetch.interval_minutes', 60))) * 60
+        except (TypeError, ValueError):
+            interval = 3600
+        return not self._last_run or time.monotonic() - self._last_run >= interval
+
+    def schedule(self, root_tk):
+        """(在主线程中) 在 Tk 事件循环中定期检查是否需要预取。"""
+
+        def _check():
+            if self._is_due():
+                self.start_background()
+            root_tk.after(CHECK_INTERVAL_MS, _check)
+
+        root_tk.after(STARTUP_DELAY_MS, _check)
+
+
+global_prefetcher = Prefetcher()
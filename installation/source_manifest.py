@@ -0,0 +1,100 @@
+#  LKInstaller Next, a blazing-speed localization installer for Mir Korabley
+#  Copyright (C) 2025 LocalizedKorabli <localizedkorabli@outlook.com>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+本地化仓库的来源清单 (线路中可选的 'manifest' 键)：一次请求即可得到本次安装所需的全部信息。
+
+    {
+      "schema": 1,
+      "sub": "7",                      子版本 (与 version.info 第一行相同)
+      "majors": ["25.9"],              兼容的游戏主版本
+      "files": {
+        "mo": {"url": "Localizations/7/global.mo", "sha256": "...", "size": 123456},
+        "ee": {"url": "BuiltInMods/LKExperienceEnhancement.zip", "sha256": "...", "size": 7890}
+      }
+    }
+
+文件的 URL 可以是相对于清单的路径。清单给出的 SHA-256 在下载前即可用于命中已有的缓存数据，
+下载后用于校验。线路没有清单、或清单无法获取与解析时，回退到 version.info 与各文件的固定 URL。
+"""
+import json
+from typing import Dict, List, Optional
+from urllib.parse import urljoin
+
+SCHEMA_VERSION = 1
+
+
+class ManifestFile:
+    """清单中的一个文件。"""
+
+    def __init__(self, url: str, sha256: Optional[str], size: Optional[int]):
+        self.url = url
+        self.sha256 = sha256
+        self.size = size
+
+
+class SourceManifest:
+    """一条线路上某个本地化仓库 (语言 + 实例类型) 的清单。"""
+
+    def __init__(self, sub: str, majors: List[str], files: Dict[str, ManifestFile]):
+        self.sub = sub
+        self.majors = majors
+        self.files = files
+        # 提供清单的线路，由调用者设置
+        self.route_id: Optional[str] = None
+
+    def supports(self, major: str) -> bool:
+        return major in self.majors
+
+    def get_file(self, file_type: str) -> Optional[ManifestFile]:
+        return self.files.get(file_type)
+
+    @classmethod
+    def parse(cls, text: str, base_url: str) -> 'SourceManifest':
+        """解析清单；格式无效 (包括字段类型不符) 或 schema 更新时抛出 ValueError。"""
+        data = json.loads(text)
+        if not isinstance(data, dict):
+            raise ValueError("manifest is not an object")
+        try:
+            schema = int(data.get('schema', 1))
+        except (TypeError, ValueError):
+            raise ValueError(f"invalid manifest schema {data.get('schema')!r}")
+        if schema > SCHEMA_VERSION:
+            raise ValueError(f"unsupported manifest schema {schema}")
+
+        sub = data.get('sub')
+        majors = data.get('majors')
+        if not isinstance(sub, (str, int)) or not str(sub).strip() or not isinstance(majors, list):
+            raise ValueError("manifest has no sub-version or compatible majors")
+
+        entries = data.get('files')
+        if entries is None:
+            entries = {}
+        if not isinstance(entries, dict):
+            raise ValueError("manifest 'files' is not an object")
+        files: Dict[str, ManifestFile] = {}
+        for file_type, entry in entries.items():
+            if not isinstance(entry, dict) or not isinstance(entry.get('url'), str) or not entry['url']:
+                raise ValueError(f"invalid manifest entry '{file_type}'")
+            sha256 = entry.get('sha256')
+            if sha256 is not None and not isinstance(sha256, str):
+                raise ValueError(f"invalid sha256 in manifest entry '{file_type}'")
+            size = entry.get('size')
+            try:
+                size = int(size) if size is not None else None
+            except (TypeError, ValueError):
+                raise ValueError(f"invalid size in manifest entry '{file_type}'")
+            files[file_type] = ManifestFile(urljoin(base_url, entry['url']), sha256.lower() if sha256 else None, size)
+        return cls(str(sub).strip(), [str(major) for major in majors], files)
@@ -13,31 +13,16 @@
 #
 #  You should have received a copy of the GNU Affero General Public License
 #  along with this program.  If not, see <https://www.gnu.org/licenses/>.
-import hashlib
 import json
 import os
 import subprocess  # (新增)
 from pathlib import Path
+from hashing import sha256_files
 from logger import log
 from typing import Dict, Optional, List, Tuple  # (新增 Tuple)
 
-import win32api
-
-
-def _calculate_sha256(filepath: Path) -> Optional[str]:
-    """计算文件的 SHA256 哈希值"""
-    if not filepath.is_file():
-        return None
-
-    sha256_hash = hashlib.sha256()
-    try:
-        with open(filepath, "rb") as f:
-            for byte_block in iter(lambda: f.read(4096), b""):
-                sha256_hash.update(byte_block)
-            return sha256_hash.hexdigest()
-    except Exception as e:
-        log(f"Error calculating SHA256 for {filepath}: {e}")
-        return None
+from instance import pe_version
+from instance.scan_cache import global_scan_cache, EXE_VERSION, L10N_INFO
 
 
 class LocalizationInfo:
@@ -76,13 +61,34 @@ class GameVersion:
     def _load_exe_version(self) -> Optional[str]:
         """
         从 bin64/Korabli64.exe 中提取产品版本 (a.b.c.d)
+        (已修改) 优先使用纯 Python 的 pe_version 读取版本资源，失败时回退到 win32api。
+        (已修改) exe 未变化 (大小与 mtime_ns 一致) 时使用扫描缓存中记录的版本。
         """
-        exe_path_str = str(self.bin_folder_path / "bin64" / "Korabli64.exe")
-        if not os.path.exists(exe_path_str):
+        exe_path = self.bin_folder_path / "bin64" / "Korabli64.exe"
+        if not exe_path.is_file():
             log(f"Warning: Did not find Korabli64.exe in {self.bin_folder_path}")
             return None
 
+        return global_scan_cache.lookup(EXE_VERSION, exe_path, lambda: self._read_exe_version(exe_path))
+
+    def _read_exe_version(self, exe_path: Path) -> Optional[str]:
+        try:
+            product_version_string = pe_version.read_product_version(exe_path)
+        except (OSError, pe_version.PEFormatError) as e:
+            log(f"Could not parse version resource of {exe_path}, falling back to win32api: {e}")
+            return self._load_exe_version_win32(str(exe_path))
+
+        if product_version_string:
+            # "25,11,0,8828504" -> "25.11.0.8828504"
+            return product_version_string.replace(',', '.').strip()
+        return self._load_exe_version_win32(str(exe_path))
+
+    @staticmethod
+    def _load_exe_version_win32(exe_path_str: str) -> Optional[str]:
+        """(回退) 通过 win32api.GetFileVersionInfo 读取产品版本。"""
         try:
+            import win32api
+
             # 1. 获取语言和代码页
             lang, codepage = win32api.GetFileVersionInfo(exe_path_str, '\\VarFileInfo\\Translation')[0]
 
@@ -121,16 +127,25 @@ class GameVersion:
         if not info_path.is_file():
             return None
 
+        # (已修改) 文件未变化时使用扫描缓存中记录的内容
+        data = global_scan_cache.lookup(L10N_INFO, info_path, lambda: self._read_l10n_info(info_path))
+        if data is None:
+            return None
+        return LocalizationInfo(
+            version=data.get("version"),
+            files=data.get("files", {}),
+            lang_code=data.get("lang_code"),
+            l10n_sub_version=data.get("l10n_sub_version")
+        )
+
+    @staticmethod
+    def _read_l10n_info(info_path: Path) -> Optional[Dict]:
         try:
             with open(info_path, 'r', encoding='utf-8') as f:
                 data = json.load(f)
-
-            return LocalizationInfo(
-                version=data.get("version"),
-                files=data.get("files", {}),
-                lang_code=data.get("lang_code"),
-                l10n_sub_version=data.get("l10n_sub_version")
-            )
+            if not isinstance(data, dict):
+                raise ValueError("not a JSON object")
+            return data
         except Exception as e:
             log(f"Error loading {info_path}: {e}")
             return None
@@ -152,6 +167,12 @@ class GameVersion:
         statuses = {}
         files_data = self.l10n_info.files
 
+        # (已修改：一次性并发计算所有组件的文件哈希，未变化的文件直接使用记住的结果)
+        # (relative_path 是 "mods/file.mkmod"，self.bin_folder_path 是 ".../bin/8828504")
+        actual_hashes = sha256_files(self.bin_folder_path / relative_path
+                                     for component in all_components
+                                     for relative_path in (files_data.get(component) or {}))
+
         for component in all_components:
             path_dict = files_data.get(component)
 
@@ -162,13 +183,7 @@ class GameVersion:
 
             is_verified = True
             for relative_path, expected_hash in path_dict.items():
-                # (新逻辑：relative_path 是 "mods/file.mkmod")
-                # (self.bin_folder_path 是 ".../bin/8828504")
-                absolute_path = self.bin_folder_path / relative_path
-
-                actual_hash = _calculate_sha256(absolute_path)
-
-                if actual_hash != expected_hash:
+                if actual_hashes.get(self.bin_folder_path / relative_path) != expected_hash:
                     log(f"Verification FAILED for {relative_path}: Hash mismatch.")
                     is_verified = False
                     break  # 一个坏文件使该组件失败
@@ -212,6 +227,8 @@ class GameInstance:
                     self.versions.append(GameVersion(folder_path, self.path))
 
         self.versions.sort(key=lambda v: v.exe_version or "0.0", reverse=True)
+        # (新增) 保存本次扫描中新读取的结果
+        global_scan_cache.save()
 
     def get_latest_version(self) -> Optional[GameVersion]:
         """
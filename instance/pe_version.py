@@ -0,0 +1,215 @@
+#  LKInstaller Next, a blazing-speed localization installer for Mir Korabley
+#  Copyright (C) 2025 LocalizedKorabli <localizedkorabli@outlook.com>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+纯 Python 的 PE 版本资源读取 (不依赖 pywin32)。
+
+以 mmap 打开可执行文件，依次读取 DOS 头、PE 头与节表，沿资源目录 (RT_VERSION -> 第一个名称 -> 第一个语言)
+找到 VS_VERSIONINFO，再读取其中的 ProductVersion 字符串；只会访问文件头与版本资源所在的几个页面。
+与 win32api.GetFileVersionInfo 一致：优先使用 VarFileInfo\\Translation 中第一个语言与代码页的字符串表，
+ProductVersion 为空时回退到 VS_FIXEDFILEINFO 中的数值版本。
+"""
+import mmap
+import struct
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+RT_VERSION = 16
+# 资源目录项的 OffsetToData 最高位表示指向下一级目录
+RESOURCE_SUBDIRECTORY = 0x80000000
+VS_FIXEDFILEINFO_SIGNATURE = 0xFEEF04BD
+PE32_MAGIC = 0x10B
+PE32_PLUS_MAGIC = 0x20B
+
+
+class PEFormatError(ValueError):
+    """文件不是有效的 PE 文件，或其中没有可读取的版本资源。"""
+
+
+class _VersionBlock:
+    """VS_VERSIONINFO 中的一个块 (VS_VERSIONINFO / StringFileInfo / StringTable / String / Var)。"""
+
+    def __init__(self, data: mmap.mmap, offset: int, limit: int):
+        if offset + 6 > limit:
+            raise PEFormatError("truncated version block")
+        self.length, self.value_length, self.type = struct.unpack_from('<HHH', data, offset)
+        self.end = offset + self.length
+        if self.length < 6 or self.end > limit:
+            raise PEFormatError("invalid version block length")
+
+        key_end = offset + 6
+        while key_end + 2 <= self.end and data[key_end:key_end + 2] != b'\0\0':
+            key_end += 2
+        self.key = data[offset + 6:key_end].decode('utf-16-le', errors='replace')
+        self.value_offset = _align4(key_end + 2)
+
+        value_size = self.value_length * 2 if self.type == 1 else self.value_length
+        self.children_offset = min(_align4(self.value_offset + value_size), self.end)
+        self._data = data
+
+    def value_bytes(self) -> bytes:
+        size = self.value_length * 2 if self.type == 1 else self.value_length
+        return self._data[self.value_offset:min(self.value_offset + size, self.end)]
+
+    def value_text(self) -> str:
+        # 部分编译器把字符串的 wValueLength 记为字节数，因此一直读到块尾或第一个 NUL
+        raw = self._data[self.value_offset:self.end]
+        return raw.decode('utf-16-le', errors='replace').split('\0', 1)[0]
+
+    def children(self) -> Iterator['_VersionBlock']:
+        pos = self.children_offset
+        while pos + 6 <= self.end:
+            child = _VersionBlock(self._data, pos, self.end)
+            yield child
+            pos = _align4(child.end)
+
+
+def _align4(offset: int) -> int:
+    return (offset + 3) & ~3
+
+
+class _PEImage:
+    """PE 文件的节表与 RVA -> 文件偏移的换算。"""
+
+    def __init__(self, data: mmap.mmap):
+        self.data = data
+        if len(data) < 0x40 or data[:2] != b'MZ':
+            raise PEFormatError("missing MZ header")
+        pe_offset = self._u32(0x3C)
+        if data[pe_offset:pe_offset + 4] != b'PE\0\0':
+            raise PEFormatError("missing PE signature")
+
+        coff = pe_offset + 4
+        section_count = self._u16(coff + 2)
+        optional_size = self._u16(coff + 16)
+        optional = coff + 20
+        magic = self._u16(optional)
+        if magic == PE32_MAGIC:
+            rva_count_offset, directories = optional + 92, optional + 96
+        elif magic == PE32_PLUS_MAGIC:
+            rva_count_offset, directories = optional + 108, optional + 112
+        else:
+            raise PEFormatError(f"unknown optional header magic 0x{magic:x}")
+
+        if self._u32(rva_count_offset) <= 2:
+            raise PEFormatError("no resource directory")
+        self.resource_rva, self.resource_size = struct.unpack_from('<II', data, directories + 2 * 8)
+
+        self.sections: List[Tuple[int, int, int, int]] = []
+        table = optional + optional_size
+        for i in range(section_count):
+            virtual_size, virtual_address, raw_size, raw_pointer = \
+                struct.unpack_from('<IIII', data, table + i * 40 + 8)
+            self.sections.append((virtual_address, max(virtual_size, raw_size), raw_pointer, raw_size))
+
+    def _u16(self, offset: int) -> int:
+        if offset + 2 > len(self.data):
+            raise PEFormatError("truncated header")
+        return struct.unpack_from('<H', self.data, offset)[0]
+
+    def _u32(self, offset: int) -> int:
+        if offset + 4 > len(self.data):
+            raise PEFormatError("truncated header")
+        return struct.unpack_from('<I', self.data, offset)[0]
+
+    def rva_to_offset(self, rva: int) -> int:
+        for virtual_address, virtual_size, raw_pointer, raw_size in self.sections:
+            if virtual_address <= rva < virtual_address + virtual_size:
+                delta = rva - virtual_address
+                if delta >= raw_size or raw_pointer + delta >= len(self.data):
+                    raise PEFormatError("RVA points outside the file")
+                return raw_pointer + delta
+        raise PEFormatError(f"RVA 0x{rva:x} is not in any section")
+
+    def _first_entry(self, directory: int, wanted_id: Optional[int] = None) -> int:
+        """返回资源目录中 wanted_id (为 None 时取第一项) 的 OffsetToData。"""
+        named, ids = struct.unpack_from('<HH', self.data, directory + 12)
+        entries = directory + 16
+        # 命名项在前，ID 项在后
+        for i in range(named + ids):
+            name, offset_to_data = struct.unpack_from('<II', self.data, entries + i * 8)
+            if wanted_id is None or (i >= named and name == wanted_id):
+                return offset_to_data
+        raise PEFormatError("version resource not found")
+
+    def find_version_resource(self) -> Tuple[int, int]:
+        """返回 VS_VERSIONINFO 的 (文件偏移, 大小)。"""
+        if not self.resource_rva:
+            raise PEFormatError("no resource directory")
+        root = self.rva_to_offset(self.resource_rva)
+
+        entry = self._first_entry(root, RT_VERSION)
+        for _level in range(2):
+            # 名称 (通常为 1) 与语言两级目录，都取第一项
+            if not entry & RESOURCE_SUBDIRECTORY:
+                raise PEFormatError("unexpected resource data entry")
+            entry = self._first_entry(root + (entry & ~RESOURCE_SUBDIRECTORY))
+        if entry & RESOURCE_SUBDIRECTORY:
+            raise PEFormatError("unexpected resource directory")
+
+        data_rva, size = struct.unpack_from('<II', self.data, root + entry)
+        return self.rva_to_offset(data_rva), size
+
+
+def _read_product_version(data: mmap.mmap) -> Optional[str]:
+    image = _PEImage(data)
+    offset, size = image.find_version_resource()
+    root = _VersionBlock(data, offset, min(offset + size, len(data)))
+    if root.key != 'VS_VERSION_INFO':
+        raise PEFormatError(f"unexpected version block '{root.key}'")
+
+    translation: Optional[str] = None
+    tables: List[_VersionBlock] = []
+    for child in root.children():
+        if child.key == 'StringFileInfo':
+            tables.extend(child.children())
+        elif child.key == 'VarFileInfo':
+            for var in child.children():
+                value = var.value_bytes()
+                if var.key == 'Translation' and len(value) >= 4:
+                    lang, codepage = struct.unpack_from('<HH', value)
+                    translation = f"{lang:04x}{codepage:04x}"
+
+    # 与 win32api 相同：使用 Translation 指定的字符串表，没有时使用第一个
+    tables.sort(key=lambda table: table.key.lower() != translation)
+    for table in tables[:1]:
+        for string in table.children():
+            if string.key == 'ProductVersion':
+                text = string.value_text().strip()
+                if text:
+                    return text
+
+    fixed = root.value_bytes()
+    if len(fixed) >= 52 and struct.unpack_from('<I', fixed)[0] == VS_FIXEDFILEINFO_SIGNATURE:
+        ms, ls = struct.unpack_from('<II', fixed, 16)
+        return f"{ms >> 16}.{ms & 0xffff}.{ls >> 16}.{ls & 0xffff}"
+    return None
+
+
+def read_product_version(exe_path: Path) -> Optional[str]:
+    """
+    读取可执行文件的 ProductVersion 字符串 (例如 "25,11,0,8828504")。
+    文件格式无效时抛出 PEFormatError；没有任何版本号时返回 None。
+    """
+    with open(exe_path, 'rb') as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise PEFormatError("empty file")
+    with data:
+        try:
+            return _read_product_version(data)
+        except struct.error as e:
+            raise PEFormatError(f"truncated structure: {e}")
@@ -0,0 +1,106 @@
+#  LKInstaller Next, a blazing-speed localization installer for Mir Korabley
+#  Copyright (C) 2025 LocalizedKorabli <localizedkorabli@outlook.com>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+实例扫描缓存 (scan_cache.json)：记录从文件中读取的结果 (Korabli64.exe 的版本、installation_info.json 的内容)，
+以 (路径, 大小, mtime_ns) 为键。文件未变化时直接使用记录的结果，刷新实例列表时只重新读取发生变化的文件。
+"""
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import atomic_io
+from dirs import CACHE_DIR
+from logger import log
+
+scan_cache_path: Path = CACHE_DIR / 'scan_cache.json'
+
+# 各类记录 (section) 的名称
+EXE_VERSION = 'exe_version'
+L10N_INFO = 'l10n_info'
+
+
+class ScanCache:
+    """按文件指纹缓存读取结果；取值为 None 的结果不会被记录。"""
+
+    def __init__(self, path: Path = scan_cache_path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.data: Dict[str, Dict[str, Dict[str, Any]]] = {EXE_VERSION: {}, L10N_INFO: {}}
+        self.load()
+
+    def load(self):
+        if not self.path.is_file():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                for section in self.data:
+                    if isinstance(data.get(section), dict):
+                        self.data[section] = data[section]
+        except Exception as e:
+            log(f"Failed to load scan cache: {e}")
+
+    def save(self):
+        """有变化时写入磁盘，并删除文件已不存在的记录。"""
+        with self._lock:
+            if not self._dirty:
+                return
+            for entries in self.data.values():
+                for key in [key for key in entries if not os.path.exists(key)]:
+                    del entries[key]
+            data = {section: dict(entries) for section, entries in self.data.items()}
+            self._dirty = False
+        try:
+            os.makedirs(self.path.parent, exist_ok=True)
+            atomic_io.write_json(self.path, data)
+        except OSError as e:
+            log(f"Failed to save scan cache: {e}")
+
+    def lookup(self, section: str, path: Path, loader: Callable[[], Any]) -> Optional[Any]:
+        """
+        返回 path 对应的结果：文件的大小与 mtime_ns 与记录一致时直接使用记录，
+        否则调用 loader() 重新读取并记录。文件不存在时返回 None。
+        """
+        key = str(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            with self._lock:
+                if self.data[section].pop(key, None) is not None:
+                    self._dirty = True
+            return None
+
+        with self._lock:
+            entry = self.data[section].get(key)
+        if entry and entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns:
+            return entry.get('value')
+
+        value = loader()
+        with self._lock:
+            if value is None:
+                if self.data[section].pop(key, None) is not None:
+                    self._dirty = True
+            else:
+                self.data[section][key] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'value': value}
+                self._dirty = True
+        return value
+
+
+global_scan_cache = ScanCache()
@@ -21,10 +21,13 @@ from pathlib import Path
 import dirs
 import settings
 from instance import instance_manager
+import installation.cache_store as cache_store
 from installation.installation_manager import InstallationManager, InstallationTask
+from installation.offline_manifest import global_offline_manifest
 from instance.game_instance import GameInstance
 from localizer import global_translator, _, _best_fonts
 from logger import setup_logger, log
+from network.rate_limiter import global_bandwidth_limiter, background_bandwidth_limiter, parse_rate
 
 def run_auto_execute(root, arg, run_client):
     """
@@ -32,6 +35,9 @@ def run_auto_execute(root, arg, run_client):
     """
     log(f"Auto-execute mode triggered with arg: {arg}, run_client: {run_client}")
 
+    # 简洁模式通常由快捷方式在启动游戏前触发，使用后台限速，避免与启动器争抢带宽
+    global_bandwidth_limiter.set_background(True)
+
     try:
         instance_id, preset_id = arg.split(':', 1)
     except ValueError:
@@ -97,6 +103,44 @@ def run_auto_execute(root, arg, run_client):
     root.mainloop()
 
 
+def run_serve_cache(args):
+    """
+    (新增) 作为局域网缓存服务器运行 (不显示界面)，按 Ctrl+C 退出。
+    --serve-cache 后面可以跟端口号。
+    """
+    from installation.lan_cache_server import LanCacheServer
+    from localization_sources import LAN_DEFAULT_PORT
+
+    port = LAN_DEFAULT_PORT
+    idx = args.index('--serve-cache')
+    if idx + 1 < len(args) and args[idx + 1].isdigit():
+        port = int(args[idx + 1])
+
+    try:
+        server = LanCacheServer(port=port)
+    except OSError as e:
+        log(f"Error: Could not start LAN cache server on port {port}: {e}")
+        sys.exit(1)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        log("LAN cache server stopped.")
+
+
+def run_prefetch():
+    """
+    (新增) 不显示界面，检查所有已登记实例并预取新的本地化子版本后退出。
+    适合由计划任务定期运行，使用后台限速。
+    """
+    from installation.prefetcher import global_prefetcher
+
+    if global_offline_manifest.forced:
+        log("Offline mode: prefetch skipped.")
+        return
+    fetched = global_prefetcher.run_once()
+    log(f"Prefetch finished: {fetched} new sub-version(s) cached.")
+
+
 if __name__ == '__main__':
     setup_logger()
     # HiDPI Awareness
@@ -115,13 +159,44 @@ if __name__ == '__main__':
         log(f"Warning: Could not set DPI awareness: {e}")
 
     global_translator.load_language(settings.global_settings.language)
+
+    # (已修改) 以下选项也适用于 --serve-cache 与 --prefetch，需在它们之前解析
+    # --limit-rate <速率>：本次运行的限速 (例如 500K、2M，0 表示不限速)，优先于设置
+    args = sys.argv[1:]
+    if '--limit-rate' in args:
+        idx = args.index('--limit-rate')
+        try:
+            rate = parse_rate(args[idx + 1])
+            global_bandwidth_limiter.set_override(rate)
+            background_bandwidth_limiter.set_override(rate)
+        except (IndexError, ValueError):
+            log("Error: --limit-rate requires a rate such as 500K or 2M.")
+            sys.exit(1)
+
+    # --offline：只使用本地缓存安装，不访问网络
+    if '--offline' in args:
+        global_offline_manifest.forced = True
+        log("Offline mode: installing from local cache only.")
+
+    # --paranoid：每次使用缓存前都重新计算完整哈希
+    if '--paranoid' in args:
+        cache_store.paranoid = True
+        log("Paranoid mode: verifying full hashes of all cache hits.")
+
+    if '--serve-cache' in args:
+        run_serve_cache(args)
+        sys.exit(0)
+
+    if '--prefetch' in args:
+        run_prefetch()
+        sys.exit(0)
+
     from app import LocalizationInstallerApp
     root = tk.Tk()
 
     auto_execute_arg = None
     run_client_flag = False
 
-    args = sys.argv[1:]
     if '--auto-execute-preset' in args:
         try:
             idx = args.index('--auto-execute-preset')
@@ -22,6 +22,13 @@ MODS_URL_EN = None
 MODS_URL_CHT = None
 MODS_URL_JA = None
 
+# global.mo 增量补丁的默认位置：与 latest 目录同级的 deltas 目录 (线路可以用 'delta' 键覆盖)
+MO_LATEST_SUFFIX = 'latest/global.mo'
+MO_DELTA_SUFFIX = 'deltas/{base}_{target}.lkdelta'
+
+# 线路还可以用 'manifest' 键指定来源清单 (格式见 installation/source_manifest.py)，
+# 一次请求即可得到子版本、兼容的主版本与各文件的 URL 和 SHA-256；'version' 等固定 URL 作为回退
+
 # 1. 简体中文路由
 CHS_LIVE_ROUTES = {
     'gitee': {
@@ -160,8 +167,70 @@ LKI_UPDATE_ROUTES = {
     }
 }
 
+# 7. 局域网缓存线路 (由局域网中另一台以 --serve-cache 运行的电脑提供，地址取自设置 lan.peer)
+LAN_ROUTE_ID = 'lan'
+LAN_DEFAULT_PORT = 18765
+LAN_MANIFEST_PATH = '/manifest.json'
+LAN_BLOB_PATH = '/blobs/{sha256}'
+LAN_L10N_PATHS = {
+    # MO 按 (主版本, 子版本) 寻址，客户端只会下载到自己解析出的版本
+    'mo': '/l10n/{lang}/{type}/{major}/{sub}/global.mo',
+    'version': '/l10n/{lang}/{type}/version.info',
+    'ee': '/ee/{lang}/{type}/ee.zip',
+    'manifest': '/l10n/{lang}/{type}/manifest.json'
+}
+LAN_FONTS_PATHS = {
+    'zip': '/fonts/{asset}/fonts.zip',
+    'version': '/fonts/{asset}/version_info.json'
+}
+
+
+def get_lan_peer() -> Optional[str]:
+    """返回局域网缓存服务器的基础 URL (例如 'http://192.168.1.10:18765')；未配置时返回 None。"""
+    import settings
+    peer = (settings.global_settings.get('lan.peer', '') or '').strip().rstrip('/')
+    if not peer:
+        return None
+    if '://' not in peer:
+        peer = f"http://{peer}"
+    if ':' not in peer.split('://', 1)[1]:
+        peer = f"{peer}:{LAN_DEFAULT_PORT}"
+    return peer
+
+
+def get_lan_urls(lang_code: str, instance_type: str, major: Optional[str] = None,
+                 sub: Optional[str] = None) -> Optional[Dict[str, Optional[str]]]:
+    """
+    局域网线路的 MO, EE, Version 与来源清单的 URL (服务器不提供增量补丁)。
+    MO 的 URL 包含版本，未指定 major 与 sub 时为 None。
+    """
+    peer = get_lan_peer()
+    if not peer:
+        return None
+    fmt = {'lang': lang_code, 'type': instance_type, 'major': major, 'sub': sub}
+    urls: Dict[str, Optional[str]] = {key: peer + path.format(**fmt) for key, path in LAN_L10N_PATHS.items()}
+    if not major or not sub:
+        urls['mo'] = None
+    urls['delta'] = None
+    return urls
+
+
+def get_download_route_priority() -> List[str]:
+    """
+    下载时尝试线路的顺序：按设置中的优先级与历史延迟、成功率排序；
+    配置了局域网缓存服务器时总是先尝试它，公共线路作为回退。
+    """
+    import settings
+    from network.route_selector import global_route_health
+    priority = global_route_health.rank(settings.global_settings.get('download_routes_priority'))
+    if get_lan_peer():
+        priority = [LAN_ROUTE_ID] + [r for r in priority if r != LAN_ROUTE_ID]
+    return priority
+
+
 def get_route_id_to_name():
     return {
+        LAN_ROUTE_ID: _('lki.i18n.route.lan'),
         'gitee': _('lki.i18n.route.gitee'),
         'gitlab': _('lki.i18n.route.gitlab'),
         'github': _('lki.i18n.route.github'),
@@ -190,17 +259,39 @@ class LocalizationSource:
         """获取 'production' 或 'pts' 的下载路由字典"""
         return self.routes.get(instance_type)
 
-    def get_urls(self, instance_type: str, route_id: str) -> Optional[Dict[str, str]]:
+    def get_urls(self, instance_type: str, route_id: str, major: Optional[str] = None,
+                 sub: Optional[str] = None) -> Optional[Dict[str, str]]:
         """
         根据实例类型和下载线路，获取 MO, EE 和 Version 的 URL。
         返回: {'mo': 'url', 'ee': 'url', 'version': 'url'}
+        (新增) major 与 sub 为要下载的 MO 版本：局域网线路只提供按版本寻址的 MO，未指定时其 'mo' 为 None；
+        公共线路的 'mo' 总是最新版本。
         """
+        if route_id == LAN_ROUTE_ID:
+            return get_lan_urls(self.id, instance_type, major, sub)
         routes_for_type = self.get_routes_for_type(instance_type)
         if routes_for_type:
             # (回退到第一个可用的路由)
             return routes_for_type.get(route_id)
         return None
 
+    def get_delta_url(self, instance_type: str, route_id: str, base_sub: str, target_sub: str) -> Optional[str]:
+        """
+        获取从 base_sub 子版本升级到 target_sub 子版本的 global.mo 增量补丁 URL。
+        线路中的 'delta' 键可以指定模板 (设为 None 则禁用)，否则按约定由 'mo' 的 URL 推导。
+        """
+        urls = self.get_urls(instance_type, route_id)
+        if not urls:
+            return None
+        if 'delta' in urls:
+            template = urls.get('delta')
+        else:
+            mo_url = urls.get('mo')
+            if not mo_url or not mo_url.endswith(MO_LATEST_SUFFIX):
+                return None
+            template = mo_url[:-len(MO_LATEST_SUFFIX)] + MO_DELTA_SUFFIX
+        return template.format(base=base_sub, target=target_sub) if template else None
+
     def get_available_route_ids(self) -> List[str]:
         """获取此来源所有可用的路由 ID (例如 ['gitee', 'gitlab'])"""
         routes_prod = self.routes.get('production', {})
@@ -208,7 +299,8 @@ class LocalizationSource:
 
         all_keys = list(routes_prod.keys()) + list(routes_pt.keys())
 
-        unique_keys = []
+        # (新增) 配置了局域网缓存服务器时优先使用
+        unique_keys = [LAN_ROUTE_ID] if get_lan_peer() else []
         for key in all_keys:
             if key not in unique_keys:
                 unique_keys.append(key)
@@ -303,6 +395,7 @@ class SourceManager:
             all_keys.update(asset.keys())
 
         all_keys.update(LKI_UPDATE_ROUTES.keys())
+        all_keys.add(LAN_ROUTE_ID)
 
         return sorted(list(all_keys))
 
@@ -318,6 +411,12 @@ class SourceManager:
         获取一个全局资产（如字体）的 URL 字典。
         """
         asset_routes = self.global_assets.get(asset_id)
+        if route_id == LAN_ROUTE_ID:
+            # (新增) 局域网线路不回退到其他线路
+            peer = get_lan_peer()
+            if not asset_routes or not peer:
+                return None
+            return {key: peer + path.format(asset=asset_id) for key, path in LAN_FONTS_PATHS.items()}
         if asset_routes:
             return asset_routes.get(route_id, next(iter(asset_routes.values()), None))
         return None
@@ -0,0 +1,185 @@
+#  LKInstaller Next, a blazing-speed localization installer for Mir Korabley
+#  Copyright (C) 2025 LocalizedKorabli <localizedkorabli@outlook.com>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+
+import atomic_io
+from dirs import SETTINGS_DIR
+from logger import log
+
+circuit_state_path: Path = SETTINGS_DIR / 'circuit_breakers.json'
+
+# 连续失败这么多次后断开
+FAILURE_THRESHOLD = 3
+# 断开后的冷却时间 (秒)；半开试探再次失败时加倍，最长 MAX_COOL_DOWN
+COOL_DOWN = 300
+MAX_COOL_DOWN = 3600
+# 半开状态下，试探请求超过这么久 (秒) 没有结果时允许重新试探
+PROBE_TIMEOUT = 60
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+
+def is_route_failure(error: Exception) -> bool:
+    """连接失败、超时与 5xx 说明线路不可用；4xx 等其他错误说明线路本身可以访问。"""
+    if isinstance(error, requests.exceptions.HTTPError):
+        response = error.response
+        return response is None or response.status_code >= 500
+    return isinstance(error, requests.exceptions.RequestException)
+
+
+class CircuitBreaker:
+    """
+    按 (线路, 主机) 记录的断路器，持久化到 circuit_breakers.json。
+    - closed:    正常使用，连续失败 FAILURE_THRESHOLD 次后断开；
+    - open:      冷却期内直接跳过该线路，不再等待超时；
+    - half_open: 冷却期结束后只放行一个试探请求，成功则恢复，失败则以加倍的冷却时间重新断开。
+    """
+
+    def __init__(self, path: Path = circuit_state_path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._probing: Dict[str, float] = {}  # 半开试探开始的时间 (不持久化)
+        self.load()
+
+    def load(self):
+        if not self.path.is_file():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self.entries = data
+        except Exception as e:
+            log(f"Failed to load circuit breaker state: {e}")
+
+    def save(self):
+        # (已修改) 原子写入：程序中断或多个进程同时保存时不会留下不完整的文件
+        with self._lock:
+            data = {key: dict(entry) for key, entry in self.entries.items()}
+        try:
+            os.makedirs(self.path.parent, exist_ok=True)
+            atomic_io.write_json(self.path, data)
+        except OSError as e:
+            log(f"Failed to save circuit breaker state: {e}")
+
+    @staticmethod
+    def _key(route_id: str, url: str) -> str:
+        return f"{route_id}|{urlparse(url).hostname or ''}"
+
+    def allow(self, route_id: str, url: str) -> bool:
+        """是否可以向该线路发送请求。冷却期结束后的第一次调用会占用半开试探名额。"""
+        key = self._key(route_id, url)
+        now = time.time()
+        with self._lock:
+            entry = self.entries.get(key)
+            if not entry or entry.get('state', STATE_CLOSED) == STATE_CLOSED:
+                return True
+            if now < entry.get('open_until', 0):
+                return False
+            probe_started = self._probing.get(key)
+            if probe_started is not None and now - probe_started < PROBE_TIMEOUT:
+                return False
+            entry['state'] = STATE_HALF_OPEN
+            self._probing[key] = now
+        log(f"Circuit half-open, probing {key}")
+        return True
+
+    def is_open(self, route_id: str, url: str) -> bool:
+        """是否处于冷却期内 (不占用半开试探名额，供已经通过 allow() 的流程中的后续请求使用)。"""
+        with self._lock:
+            entry = self.entries.get(self._key(route_id, url))
+            return bool(entry) and entry.get('state') == STATE_OPEN and time.time() < entry.get('open_until', 0)
+
+    def is_closed(self, route_id: str, url: str) -> bool:
+        """是否处于正常状态 (不在冷却期、也不在半开试探中)；不占用半开试探名额。"""
+        with self._lock:
+            entry = self.entries.get(self._key(route_id, url))
+            return not entry or entry.get('state', STATE_CLOSED) == STATE_CLOSED
+
+    def record_success(self, route_id: str, url: str):
+        key = self._key(route_id, url)
+        with self._lock:
+            self._probing.pop(key, None)
+            entry = self.entries.pop(key, None)
+        if entry:
+            log(f"Circuit closed for {key}")
+            self.save()
+
+    def record_failure(self, route_id: str, url: str):
+        key = self._key(route_id, url)
+        with self._lock:
+            self._probing.pop(key, None)
+            entry = self.entries.setdefault(key, {'state': STATE_CLOSED, 'failures': 0, 'cool_down': COOL_DOWN})
+            entry['failures'] = entry.get('failures', 0) + 1
+            half_open = entry.get('state') == STATE_HALF_OPEN
+            if half_open:
+                entry['cool_down'] = min(MAX_COOL_DOWN, entry.get('cool_down', COOL_DOWN) * 2)
+            should_open = half_open or entry['failures'] >= FAILURE_THRESHOLD
+            if should_open:
+                entry['state'] = STATE_OPEN
+                entry['open_until'] = time.time() + entry.get('cool_down', COOL_DOWN)
+            cool_down = entry.get('cool_down', COOL_DOWN)
+        if should_open:
+            log(f"Circuit open for {key} ({cool_down} s)")
+        self.save()
+
+    def record(self, route_id: str, url: str, error: Optional[Exception]):
+        """根据请求结果记录：error 为 None 表示成功；不属于线路故障的错误 (例如 404) 说明线路可以访问。"""
+        if error is None:
+            self.record_success(route_id, url)
+        elif is_route_failure(error):
+            self.record_failure(route_id, url)
+        else:
+            self.record_success(route_id, url)
+
+    def reset(self, route_id: str):
+        """手动恢复该线路的所有主机。"""
+        with self._lock:
+            for key in [k for k in self.entries if k.split('|', 1)[0] == route_id]:
+                del self.entries[key]
+                self._probing.pop(key, None)
+        self.save()
+
+    def get_route_state(self, route_id: str) -> Tuple[str, float]:
+        """返回线路在所有主机中最差的状态，以及 open 状态下距离可以试探的秒数。"""
+        now = time.time()
+        state, retry_in = STATE_CLOSED, 0.0
+        with self._lock:
+            for key, entry in self.entries.items():
+                if key.split('|', 1)[0] != route_id:
+                    continue
+                if entry.get('state') == STATE_CLOSED:
+                    continue
+                remaining = entry.get('open_until', 0) - now
+                if remaining > 0:
+                    state, retry_in = STATE_OPEN, max(retry_in, remaining)
+                elif state == STATE_CLOSED:
+                    state = STATE_HALF_OPEN
+        return state, retry_in
+
+
+global_circuit_breaker = CircuitBreaker()
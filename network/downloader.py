@@ -0,0 +1,772 @@
+#  LKInstaller Next, a blazing-speed localization installer for Mir Korabley
+#  Copyright (C) 2025 LocalizedKorabli <localizedkorabli@outlook.com>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Callable, Any, Tuple, List
+
+import requests
+
+import atomic_io
+from logger import log
+from network.rate_limiter import BandwidthLimiter, global_bandwidth_limiter
+from network.session import get_session
+from network.transfer_stats import TransferStats
+
+CHUNK_SIZE = 64 * 1024
+# 每写入这么多字节 (或经过这么长时间) 就刷新一次旁路文件
+META_FLUSH_BYTES = 1024 * 1024
+META_FLUSH_INTERVAL = 1.0
+# 分段下载: 小于该大小的文件仍使用单连接
+SEGMENT_THRESHOLD = 4 * 1024 * 1024
+# 每段的最小大小，避免把中等文件切得过碎
+SEGMENT_MIN_SIZE = 1024 * 1024
+# 跨镜像条带下载: 数据块大小 (文件很大时会自动增大，最多切为 256 块)
+STRIPE_BLOCK_SIZE = 1024 * 1024
+# 用于比对各镜像文件是否一致的文件尾长度
+STRIPE_TAIL_SIZE = 4096
+# 同一镜像连续失败这么多次后不再为其分配数据块
+STRIPE_MAX_MIRROR_FAILURES = 2
+# 边下载边计算摘要时，乱序到达的数据最多在内存中暂存这么多字节
+HASH_BUFFER_LIMIT = 32 * 1024 * 1024
+# 补读磁盘数据计算摘要时的块大小
+HASH_READ_SIZE = 1024 * 1024
+
+
+def get_part_path(dest: Path) -> Path:
+    """下载中的数据文件: global.mo -> global.mo.part"""
+    return dest.with_name(dest.name + '.part')
+
+
+def get_meta_path(dest: Path) -> Path:
+    """记录续传信息的旁路文件: global.mo -> global.mo.part.json"""
+    return dest.with_name(dest.name + '.part.json')
+
+
+def _load_part_meta(meta_path: Path) -> Dict[str, Any]:
+    if not meta_path.is_file():
+        return {}
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except Exception as e:
+        log(f"Warning: Could not read download sidecar {meta_path}: {e}")
+        return {}
+
+
+def _save_part_meta(meta_path: Path, meta: Dict[str, Any]):
+    try:
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+    except OSError as e:
+        log(f"Warning: Could not write download sidecar {meta_path}: {e}")
+
+
+def discard_partial(dest: Path):
+    """删除 dest 对应的 .part 与旁路文件。"""
+    for path in (get_part_path(dest), get_meta_path(dest)):
+        try:
+            if path.is_file():
+                os.remove(path)
+        except OSError as e:
+            log(f"Warning: Could not remove {path}: {e}")
+
+
+def _get_resume_offset(dest: Path, url: str) -> Tuple[int, Dict[str, Any]]:
+    """
+    检查是否存在可续传的 .part 文件。
+    返回 (offset, meta)；不可续传时 offset 为 0 且旧文件被清除。
+    """
+    part_path = get_part_path(dest)
+    meta = _load_part_meta(get_meta_path(dest))
+
+    if not part_path.is_file() or meta.get('url') != url or meta.get('mode', 'single') != 'single':
+        discard_partial(dest)
+        return 0, {}
+
+    # 旁路文件中的 offset 是最后一次确认写入的位置，超出部分可能不完整
+    offset = int(meta.get('offset', 0))
+    actual_size = part_path.stat().st_size
+    if offset <= 0 or actual_size < offset:
+        discard_partial(dest)
+        return 0, {}
+
+    if actual_size > offset:
+        with open(part_path, 'r+b') as f:
+            f.truncate(offset)
+
+    return offset, meta
+
+
+class _StreamHasher:
+    """
+    (线程安全) 在数据写入 .part 的同时计算 SHA-256，提交时不必再完整读取一遍文件。
+    多连接下载时数据不按顺序到达：与当前位置相接的数据直接计入摘要，其余数据暂存在内存中，
+    等前面的数据到达后再按顺序计入；暂存超过 HASH_BUFFER_LIMIT 后不再暂存。
+    续传前已有的数据与未能暂存的数据在 finish() 时从磁盘补读。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hash = hashlib.sha256()
+        self.position = 0
+        self._pending: Dict[int, bytes] = {}
+        self._pending_bytes = 0
+        self._overflow = False
+
+    def _read_disk(self, f, end: int):
+        """(需持有 _lock) 从磁盘读取 [position, end) 计入摘要。"""
+        f.seek(self.position)
+        while self.position < end:
+            data = f.read(min(HASH_READ_SIZE, end - self.position))
+            if not data:
+                raise OSError(f"Unexpected end of file while hashing at byte {self.position}")
+            self._hash.update(data)
+            self.position += len(data)
+
+    def prime(self, path: Path, upto: int):
+        """计入文件中已有的前 upto 字节 (单连接续传时使用)。"""
+        with self._lock, open(path, 'rb') as f:
+            self._read_disk(f, upto)
+
+    def feed(self, offset: int, data: bytes):
+        """报告写入 offset 处的数据。"""
+        with self._lock:
+            if offset == self.position:
+                self._hash.update(data)
+                self.position += len(data)
+                while self.position in self._pending:
+                    chunk = self._pending.pop(self.position)
+                    self._pending_bytes -= len(chunk)
+                    self._hash.update(chunk)
+                    self.position += len(chunk)
+            elif offset > self.position and not self._overflow:
+                if self._pending_bytes + len(data) > HASH_BUFFER_LIMIT:
+                    self._overflow = True
+                else:
+                    self._pending[offset] = bytes(data)
+                    self._pending_bytes += len(data)
+
+    def finish(self, path: Path, size: int) -> str:
+        """补读尚未计入摘要的部分，返回 [0, size) 的 SHA-256 (十六进制)。"""
+        with self._lock:
+            if self.position < size:
+                with open(path, 'rb') as f:
+                    while self.position < size:
+                        chunk = self._pending.pop(self.position, None)
+                        if chunk is not None:
+                            self._hash.update(chunk)
+                            self.position += len(chunk)
+                            continue
+                        gap_end = min((o for o in self._pending if o > self.position), default=size)
+                        self._read_disk(f, min(gap_end, size))
+            self._pending.clear()
+            self._pending_bytes = 0
+            return self._hash.hexdigest()
+
+
+def download_resumable(url: str, dest: Path, timeout: int,
+                       is_cancelled: Callable[[], bool],
+                       stats: Optional[TransferStats] = None,
+                       limiter: BandwidthLimiter = global_bandwidth_limiter) -> Optional[str]:
+    """
+    支持断点续传的下载。
+    数据先写入 dest.part，旁路文件 dest.part.json 记录 URL、ETag 与已确认的字节数；
+    之后的重试 (包括重启程序后) 会使用 Range 请求从该位置继续。
+    只有下载完整后，文件才会 (按落盘策略 fsync 后) 被原子地替换到 dest。
+    成功时返回文件的 SHA-256 (写入时同步计算)；
+    取消或网络错误时返回 None，并保留 .part 文件以便下次续传。
+    stats 用于报告接收的字节数；limiter 为使用的限速器 (默认为进程共享的 global_bandwidth_limiter)。
+    """
+    os.makedirs(dest.parent, exist_ok=True)
+    part_path = get_part_path(dest)
+    meta_path = get_meta_path(dest)
+
+    offset, meta = _get_resume_offset(dest, url)
+
+    headers = {}
+    if offset > 0:
+        headers['Range'] = f"bytes={offset}-"
+        # If-Range: 远端文件已变化时服务器会返回 200 完整内容而不是 206
+        validator = meta.get('etag') or meta.get('last_modified')
+        if validator:
+            headers['If-Range'] = validator
+        log(f"Resuming download of {url} at byte {offset}")
+
+    response = get_session().get(url, stream=True, timeout=timeout, headers=headers)
+
+    if response.status_code == 416 and offset > 0:
+        # Range 无效 (例如远端文件变短)，从头开始
+        response.close()
+        log(f"Server rejected range for {url}, restarting download")
+        discard_partial(dest)
+        return download_resumable(url, dest, timeout, is_cancelled, stats, limiter)
+
+    response.raise_for_status()
+
+    with response:
+        if offset > 0 and response.status_code == 206:
+            mode = 'ab'
+            content_range = response.headers.get('Content-Range', '')
+            if not content_range.startswith(f"bytes {offset}-"):
+                log(f"Unexpected Content-Range '{content_range}' for {url}, restarting download")
+                response.close()
+                discard_partial(dest)
+                return download_resumable(url, dest, timeout, is_cancelled, stats, limiter)
+        else:
+            # 服务器忽略了 Range 或文件已变化：从头开始
+            mode = 'wb'
+            offset = 0
+            meta = {
+                'mode': 'single',
+                'url': url,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+            }
+
+        content_length = response.headers.get('Content-Length')
+        expected_total = offset + int(content_length) if content_length and content_length.isdigit() else None
+        meta['total'] = expected_total
+
+        written = offset
+        hasher = _StreamHasher()
+        if offset > 0:
+            hasher.prime(part_path, offset)
+        if stats:
+            stats.begin(expected_total, offset)
+        last_flush_bytes = written
+        last_flush_time = time.monotonic()
+        meta['offset'] = written
+        _save_part_meta(meta_path, meta)
+
+        with open(part_path, mode) as f:
+            try:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    if is_cancelled():
+                        return None
+                    if not chunk:
+                        continue
+                    limiter.throttle(len(chunk), is_cancelled)
+                    f.write(chunk)
+                    hasher.feed(written, chunk)
+                    written += len(chunk)
+                    if stats:
+                        stats.add(len(chunk))
+
+                    now = time.monotonic()
+                    if written - last_flush_bytes >= META_FLUSH_BYTES or now - last_flush_time >= META_FLUSH_INTERVAL:
+                        f.flush()
+                        meta['offset'] = written
+                        _save_part_meta(meta_path, meta)
+                        last_flush_bytes = written
+                        last_flush_time = now
+            finally:
+                # 无论成功与否，记录已落盘的位置以便续传
+                f.flush()
+                meta['offset'] = written
+                _save_part_meta(meta_path, meta)
+
+    if expected_total is not None and written != expected_total:
+        log(f"Incomplete download for {url}: {written}/{expected_total} bytes")
+        if written > expected_total:
+            # 数据比声明的还多，.part 已不可信
+            discard_partial(dest)
+        return None
+
+    digest = hasher.finish(part_path, written)
+    atomic_io.replace_file(part_path, dest)
+    discard_partial(dest)
+    return digest
+
+
+def fetch_bytes(url: str, timeout: int, is_cancelled: Callable[[], bool],
+                stats: Optional[TransferStats] = None,
+                limiter: BandwidthLimiter = global_bandwidth_limiter) -> Optional[bytes]:
+    """
+    把较小的文件 (例如增量补丁) 下载到内存，与其他下载一样经过限速器 limiter 并向 stats 报告字节数。
+    取消时返回 None；HTTP 错误抛出 HTTPError，数据不完整时抛出 RequestException。
+    """
+    response = get_session().get(url, stream=True, timeout=timeout)
+    with response:
+        response.raise_for_status()
+        content_length = response.headers.get('Content-Length')
+        total = int(content_length) if content_length and content_length.isdigit() else None
+        if stats:
+            stats.begin(total)
+
+        buffer = bytearray()
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            if is_cancelled():
+                return None
+            if not chunk:
+                continue
+            limiter.throttle(len(chunk), is_cancelled)
+            buffer.extend(chunk)
+            if stats:
+                stats.add(len(chunk))
+
+    if total is not None and len(buffer) != total:
+        raise requests.exceptions.RequestException(f"Short read from {url}: {len(buffer)}/{total} bytes")
+    return bytes(buffer)
+
+
+class RemoteFileInfo:
+    """通过 Range 探测得到的远端文件信息。"""
+
+    def __init__(self, size: Optional[int], accepts_ranges: bool,
+                 etag: Optional[str], last_modified: Optional[str]):
+        self.size = size
+        self.accepts_ranges = accepts_ranges
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+def probe_remote(url: str, timeout: int) -> RemoteFileInfo:
+    """
+    使用 "Range: bytes=0-0" 请求探测文件大小与 Range 支持情况。
+    (部分 raw 文件服务器不能正确响应 HEAD，所以这里使用 GET)
+    """
+    response = get_session().get(url, stream=True, timeout=timeout, headers={'Range': 'bytes=0-0'})
+    with response:
+        response.raise_for_status()
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+
+        if response.status_code == 206:
+            # Content-Range: bytes 0-0/12345
+            total = response.headers.get('Content-Range', '').rpartition('/')[2]
+            size = int(total) if total.isdigit() else None
+            return RemoteFileInfo(size, size is not None, etag, last_modified)
+
+        content_length = response.headers.get('Content-Length')
+        size = int(content_length) if content_length and content_length.isdigit() else None
+        return RemoteFileInfo(size, False, etag, last_modified)
+
+
+def _plan_segments(size: int, segments: int) -> List[List[int]]:
+    """将 [0, size) 切分为若干段，返回 [[start, end(含), done], ...]"""
+    count = max(1, min(segments, size // SEGMENT_MIN_SIZE))
+    step = size // count
+    plan = []
+    for i in range(count):
+        start = i * step
+        end = size - 1 if i == count - 1 else start + step - 1
+        plan.append([start, end, 0])
+    return plan
+
+
+def _load_segment_plan(dest: Path, url: str, remote: RemoteFileInfo) -> Optional[List[List[int]]]:
+    """读取可续传的分段进度；远端文件已变化时返回 None。"""
+    part_path = get_part_path(dest)
+    meta = _load_part_meta(get_meta_path(dest))
+    if not part_path.is_file() or meta.get('mode') != 'segmented' or meta.get('url') != url:
+        return None
+    if meta.get('total') != remote.size or part_path.stat().st_size != remote.size:
+        return None
+    if (remote.etag or meta.get('etag')) and remote.etag != meta.get('etag'):
+        return None
+    plan = meta.get('segments')
+    if not isinstance(plan, list) or not plan:
+        return None
+    return plan
+
+
+def download_segmented(url: str, dest: Path, timeout: int,
+                       is_cancelled: Callable[[], bool],
+                       segments: int = 4,
+                       stats: Optional[TransferStats] = None,
+                       limiter: BandwidthLimiter = global_bandwidth_limiter) -> Optional[str]:
+    """
+    多连接分段下载。
+    文件大于 SEGMENT_THRESHOLD 且服务器支持 Range 时，将文件切分为 segments 段并发下载到
+    预分配的 dest.part 中；各段进度记录在旁路文件中，失败后可以分段续传。
+    所有段的长度校验通过后才会提交到 dest，并返回文件的 SHA-256 (写入时同步计算)；失败时返回 None。
+    不满足条件时回退到 download_resumable。
+    """
+    if segments <= 1:
+        return download_resumable(url, dest, timeout, is_cancelled, stats, limiter)
+
+    remote = probe_remote(url, timeout)
+    if not remote.accepts_ranges or not remote.size or remote.size < SEGMENT_THRESHOLD:
+        return download_resumable(url, dest, timeout, is_cancelled, stats, limiter)
+
+    os.makedirs(dest.parent, exist_ok=True)
+    part_path = get_part_path(dest)
+    meta_path = get_meta_path(dest)
+
+    plan = _load_segment_plan(dest, url, remote)
+    if plan is None:
+        discard_partial(dest)
+        plan = _plan_segments(remote.size, segments)
+        # 预分配完整大小，各段直接写入自己的位置
+        with open(part_path, 'wb') as f:
+            f.truncate(remote.size)
+    else:
+        done = sum(seg[2] for seg in plan)
+        log(f"Resuming segmented download of {url} ({done}/{remote.size} bytes)")
+
+    if stats:
+        stats.begin(remote.size, sum(seg[2] for seg in plan))
+
+    meta = {
+        'mode': 'segmented',
+        'url': url,
+        'etag': remote.etag,
+        'last_modified': remote.last_modified,
+        'total': remote.size,
+        'segments': plan
+    }
+    meta_lock = threading.Lock()
+    stop_event = threading.Event()
+    errors: List[Exception] = []
+    hasher = _StreamHasher()
+
+    def _flush_meta():
+        with meta_lock:
+            _save_part_meta(meta_path, meta)
+
+    def _fetch_segment(seg: List[int]):
+        start, end, done = seg
+        if start + done > end:
+            return
+
+        headers = {'Range': f"bytes={start + done}-{end}"}
+        validator = remote.etag or remote.last_modified
+        if validator:
+            headers['If-Range'] = validator
+
+        try:
+            response = get_session().get(url, stream=True, timeout=timeout, headers=headers)
+            with response:
+                response.raise_for_status()
+                if response.status_code != 206:
+                    # 远端文件在下载过程中发生了变化
+                    raise requests.exceptions.RequestException(f"Range not honoured for {url}")
+
+                last_flush_time = time.monotonic()
+                with open(part_path, 'r+b') as f:
+                    f.seek(start + seg[2])
+                    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                        if is_cancelled() or stop_event.is_set():
+                            break
+                        if not chunk:
+                            continue
+                        remaining = end - start + 1 - seg[2]
+                        chunk = chunk[:remaining]
+                        limiter.throttle(len(chunk), lambda: is_cancelled() or stop_event.is_set())
+                        f.write(chunk)
+                        hasher.feed(start + seg[2], chunk)
+                        seg[2] += len(chunk)
+                        if stats:
+                            stats.add(len(chunk))
+                        if seg[2] >= end - start + 1:
+                            break
+
+                        now = time.monotonic()
+                        if now - last_flush_time >= META_FLUSH_INTERVAL:
+                            f.flush()
+                            _flush_meta()
+                            last_flush_time = now
+        except Exception as e:
+            errors.append(e)
+            stop_event.set()
+
+    with ThreadPoolExecutor(max_workers=len(plan)) as executor:
+        for seg in plan:
+            executor.submit(_fetch_segment, seg)
+
+    _flush_meta()
+
+    if errors:
+        raise errors[0]
+    if is_cancelled():
+        return None
+
+    # 校验：每一段都必须完整
+    for start, end, done in plan:
+        if done != end - start + 1:
+            log(f"Segment {start}-{end} of {url} incomplete: {done}/{end - start + 1} bytes")
+            return None
+    if part_path.stat().st_size != remote.size:
+        log(f"Segmented download size mismatch for {url}")
+        discard_partial(dest)
+        return None
+
+    digest = hasher.finish(part_path, remote.size)
+    atomic_io.replace_file(part_path, dest)
+    discard_partial(dest)
+    return digest
+
+
+def _fetch_range(url: str, start: int, end: int, timeout: int,
+                 should_stop: Callable[[], bool],
+                 limiter: BandwidthLimiter = global_bandwidth_limiter) -> Optional[bytes]:
+    """下载 [start, end] 的数据到内存。被中止时返回 None。"""
+    response = get_session().get(url, stream=True, timeout=timeout,
+                                 headers={'Range': f"bytes={start}-{end}"})
+    with response:
+        response.raise_for_status()
+        if response.status_code != 206:
+            raise requests.exceptions.RequestException(f"Range not honoured for {url}")
+
+        buffer = bytearray()
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            if should_stop():
+                return None
+            limiter.throttle(len(chunk), should_stop)
+            buffer.extend(chunk)
+
+    if len(buffer) != end - start + 1:
+        raise requests.exceptions.RequestException(
+            f"Short read from {url}: {len(buffer)}/{end - start + 1} bytes")
+    return bytes(buffer)
+
+
+class _MirrorState:
+    """条带下载中单个镜像的统计。"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.failures = 0
+        self.disabled = False
+        self.blocks = 0
+        self.bytes = 0
+        self.seconds = 0.0
+
+    def speed(self) -> float:
+        return self.bytes / self.seconds if self.seconds > 0 else 0.0
+
+
+def _select_identical_mirrors(urls: List[str], timeout: int) -> Tuple[List[str], Optional[RemoteFileInfo],
+                                                                    Dict[str, Optional[str]]]:
+    """
+    并发探测所有镜像，只保留支持 Range、大小一致且文件尾一致的镜像。
+    返回 (可用镜像, 远端信息, {url: etag})
+    """
+    def _probe(url: str) -> Optional[RemoteFileInfo]:
+        try:
+            return probe_remote(url, timeout)
+        except Exception as e:
+            log(f"Stripe probe failed for {url}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=len(urls)) as executor:
+        probes = dict(zip(urls, executor.map(_probe, urls)))
+
+    candidates = [u for u in urls if probes[u] and probes[u].accepts_ranges and probes[u].size]
+    if not candidates:
+        return [], None, {}
+
+    size = Counter(probes[u].size for u in candidates).most_common(1)[0][0]
+    candidates = [u for u in candidates if probes[u].size == size]
+
+    # 同样大小并不代表同样内容，再比对一次文件尾
+    tail_start = max(0, size - STRIPE_TAIL_SIZE)
+
+    def _tail(url: str) -> Optional[bytes]:
+        try:
+            return _fetch_range(url, tail_start, size - 1, timeout, lambda: False)
+        except Exception as e:
+            log(f"Stripe tail check failed for {url}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=len(candidates)) as executor:
+        tails = dict(zip(candidates, executor.map(_tail, candidates)))
+
+    valid_tails = [t for t in tails.values() if t is not None]
+    if not valid_tails:
+        return [], None, {}
+    majority_tail = Counter(valid_tails).most_common(1)[0][0]
+    mirrors = [u for u in candidates if tails[u] == majority_tail]
+
+    for url in candidates:
+        if url not in mirrors:
+            log(f"Mirror {url} serves different content, excluded from striping")
+
+    return mirrors, probes[mirrors[0]], {u: probes[u].etag for u in mirrors}
+
+
+def download_striped(urls: List[str], dest: Path, timeout: int,
+                     is_cancelled: Callable[[], bool],
+                     connections_per_mirror: int = 2,
+                     stats: Optional[TransferStats] = None,
+                     limiter: BandwidthLimiter = global_bandwidth_limiter) -> Optional[str]:
+    """
+    跨镜像条带下载：同时从多个提供相同文件的镜像拉取不同的数据块。
+    数据块放在共享队列中，每个镜像完成一块后再领取下一块，因此较快的镜像会自然承担更多数据；
+    连续失败的镜像会被剔除，其未完成的数据块退回队列由其他镜像接手；
+    队列清空后，空闲的连接会重复拉取耗时最长的在途数据块，避免被最慢的镜像拖尾。
+    已完成的数据块记录在旁路文件中，可以续传。
+    成功时返回文件的 SHA-256 (写入时同步计算)，失败时返回 None。
+    可用镜像不足两个时回退到 download_segmented (使用同一个限速器 limiter)。
+    """
+    urls = list(dict.fromkeys(u for u in urls if u))
+    if not urls:
+        return None
+    if len(urls) < 2:
+        return download_segmented(urls[0], dest, timeout, is_cancelled, stats=stats, limiter=limiter)
+
+    mirrors, remote, etags = _select_identical_mirrors(urls, timeout)
+    if len(mirrors) < 2 or remote.size < SEGMENT_THRESHOLD:
+        fallback_url = mirrors[0] if mirrors else urls[0]
+        return download_segmented(fallback_url, dest, timeout, is_cancelled, stats=stats, limiter=limiter)
+
+    size = remote.size
+    block_size = max(STRIPE_BLOCK_SIZE, -(-size // 256))
+    block_count = -(-size // block_size)
+
+    os.makedirs(dest.parent, exist_ok=True)
+    part_path = get_part_path(dest)
+    meta_path = get_meta_path(dest)
+
+    done_blocks = set()
+    meta = _load_part_meta(meta_path)
+    resumable = (part_path.is_file() and meta.get('mode') == 'striped'
+                 and meta.get('total') == size and meta.get('block_size') == block_size
+                 and part_path.stat().st_size == size
+                 and all(meta.get('etags', {}).get(u) in (None, etag) for u, etag in etags.items()))
+    if resumable:
+        done_blocks = set(meta.get('blocks_done', []))
+        log(f"Resuming striped download of {dest.name} ({len(done_blocks)}/{block_count} blocks)")
+    else:
+        discard_partial(dest)
+        with open(part_path, 'wb') as f:
+            f.truncate(size)
+
+    meta = {
+        'mode': 'striped',
+        'urls': mirrors,
+        'etags': etags,
+        'total': size,
+        'block_size': block_size,
+        'blocks_done': sorted(done_blocks)
+    }
+    _save_part_meta(meta_path, meta)
+
+    if stats:
+        stats.begin(size, sum(min(size, (i + 1) * block_size) - i * block_size for i in done_blocks))
+
+    states = [_MirrorState(url) for url in mirrors]
+    pending = deque(i for i in range(block_count) if i not in done_blocks)
+    in_flight: Dict[int, List[Any]] = {}  # block -> [开始时间, 正在拉取的镜像集合]
+    lock = threading.Lock()
+    stop_event = threading.Event()
+    last_flush = [time.monotonic()]
+    hasher = _StreamHasher()
+
+    def _should_stop() -> bool:
+        return stop_event.is_set() or is_cancelled()
+
+    def _next_block(state: _MirrorState) -> Optional[int]:
+        """(需持有 lock) 领取下一个数据块。"""
+        if pending:
+            index = pending.popleft()
+            in_flight[index] = [time.monotonic(), {state.url}]
+            return index
+        # 收尾阶段：重复拉取其他镜像上耗时最长的数据块
+        candidates = [(info[0], index) for index, info in in_flight.items()
+                      if state.url not in info[1] and len(info[1]) < 2]
+        if candidates:
+            index = min(candidates)[1]
+            in_flight[index][1].add(state.url)
+            return index
+        return None
+
+    def _worker(state: _MirrorState):
+        with open(part_path, 'r+b') as f:
+            while not _should_stop():
+                with lock:
+                    if state.disabled:
+                        return
+                    index = _next_block(state)
+                if index is None:
+                    return
+
+                start = index * block_size
+                end = min(size, start + block_size) - 1
+                began = time.monotonic()
+                try:
+                    data = _fetch_range(state.url, start, end, timeout,
+                                        lambda: _should_stop() or index in done_blocks, limiter)
+                except Exception as e:
+                    log(f"Stripe block {index} failed on {state.url}: {e}")
+                    data = None
+                    with lock:
+                        state.failures += 1
+                        info = in_flight.get(index)
+                        if info:
+                            info[1].discard(state.url)
+                            if not info[1] and index not in done_blocks:
+                                del in_flight[index]
+                                pending.appendleft(index)
+                        if state.failures >= STRIPE_MAX_MIRROR_FAILURES:
+                            state.disabled = True
+                            log(f"Mirror {state.url} removed from striping after {state.failures} failures")
+                            if all(s.disabled for s in states):
+                                stop_event.set()
+                    continue
+
+                if data is None:
+                    continue
+
+                with lock:
+                    if index in done_blocks:
+                        # 收尾阶段另一个镜像已经先完成了这一块
+                        continue
+                    f.seek(start)
+                    f.write(data)
+                    hasher.feed(start, data)
+                    done_blocks.add(index)
+                    in_flight.pop(index, None)
+                    if stats:
+                        stats.add(len(data))
+                    state.failures = 0
+                    state.blocks += 1
+                    state.bytes += len(data)
+                    state.seconds += time.monotonic() - began
+
+                    now = time.monotonic()
+                    if now - last_flush[0] >= META_FLUSH_INTERVAL:
+                        f.flush()
+                        meta['blocks_done'] = sorted(done_blocks)
+                        _save_part_meta(meta_path, meta)
+                        last_flush[0] = now
+
+    workers = [state for state in states for _ in range(max(1, connections_per_mirror))]
+    with ThreadPoolExecutor(max_workers=len(workers)) as executor:
+        for state in workers:
+            executor.submit(_worker, state)
+
+    meta['blocks_done'] = sorted(done_blocks)
+    _save_part_meta(meta_path, meta)
+
+    for state in states:
+        log(f"Stripe mirror {state.url}: {state.blocks} blocks, {state.speed() / 1024:.0f} KB/s"
+            + (" (removed)" if state.disabled else ""))
+
+    if is_cancelled() or len(done_blocks) != block_count:
+        return None
+
+    digest = hasher.finish(part_path, size)
+    atomic_io.replace_file(part_path, dest)
+    discard_partial(dest)
+    return digest
@@ -0,0 +1,149 @@
+#  LKInstaller Next, a blazing-speed localization installer for Mir Korabley
+#  Copyright (C) 2025 LocalizedKorabli <localizedkorabli@outlook.com>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import asyncio
+import concurrent.futures
+import functools
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+from logger import log
+from network.session import get_session, POOL_MAXSIZE_PER_HOST
+
+# 同时进行的网络请求总数上限 (也是执行阻塞调用的线程数上限)
+MAX_CONCURRENCY = 16
+# 单个主机同时进行的请求数上限
+PER_HOST_CONCURRENCY = POOL_MAXSIZE_PER_HOST
+# 检查取消标志的间隔 (秒)
+CANCEL_POLL_INTERVAL = 0.1
+
+
+class NetworkEngine:
+    """
+    运行在单个后台线程上的 asyncio 事件循环。
+    协程可以同时等待任意多个请求，而实际执行阻塞 I/O 的线程数量始终受 MAX_CONCURRENCY 限制，
+    不再随实例数或线路数增长。
+    HTTP 请求仍然通过共享的 requests 会话发出，在有界线程池中执行。
+    """
+
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY, per_host: int = PER_HOST_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+        self.per_host = per_host
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._global_semaphore: Optional[asyncio.Semaphore] = None
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is not None:
+                return self._loop
+
+            loop = asyncio.new_event_loop()
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='lki-net')
+            # (asyncio.to_thread 也会使用这个有界线程池)
+            loop.set_default_executor(self._executor)
+
+            ready = threading.Event()
+
+            def _run_loop():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            threading.Thread(target=_run_loop, name='lki-network-loop', daemon=True).start()
+            ready.wait()
+            self._loop = loop
+            return loop
+
+    def submit(self, coro: Awaitable[Any]) -> concurrent.futures.Future:
+        """(任意线程) 将协程提交到后台事件循环，返回 concurrent.futures.Future。"""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def run(self, coro: Awaitable[Any]) -> Any:
+        """(任意非事件循环线程) 提交协程并阻塞等待结果。"""
+        return self.submit(coro).result()
+
+    # --- (以下方法只能在事件循环中调用) ---
+
+    def _get_host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc.lower()
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.per_host)
+            self._host_semaphores[host] = semaphore
+        return semaphore
+
+    async def run_blocking(self, url: Optional[str], func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        在有界线程池中执行阻塞调用，并受全局并发数限制；
+        指定 url 时还受该主机的并发数限制。
+        """
+        if self._global_semaphore is None:
+            self._global_semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        loop = asyncio.get_running_loop()
+        call = functools.partial(func, *args, **kwargs)
+        async with self._global_semaphore:
+            if url is None:
+                return await loop.run_in_executor(self._executor, call)
+            async with self._get_host_semaphore(url):
+                return await loop.run_in_executor(self._executor, call)
+
+    async def get(self, url: str, **kwargs) -> requests.Response:
+        """使用共享会话发出 GET 请求 (响应体会被完整读取，不要用于大文件)。"""
+        return await self.run_blocking(url, get_session().get, url, **kwargs)
+
+    async def gather(self, coros: Iterable[Awaitable[Any]],
+                     cancel_event: Optional[threading.Event] = None) -> List[Any]:
+        """
+        并发运行一组协程，返回各自的结果 (抛出异常或被取消的返回 None)。
+        cancel_event 被设置时，所有未完成的协程都会被取消；
+        已经在线程池中执行的阻塞调用无法被打断，其结果会被丢弃。
+        """
+        tasks = [asyncio.ensure_future(c) for c in coros]
+        if not tasks:
+            return []
+
+        pending = set(tasks)
+        while pending:
+            _done, pending = await asyncio.wait(pending, timeout=CANCEL_POLL_INTERVAL)
+            if pending and cancel_event is not None and cancel_event.is_set():
+                for task in pending:
+                    task.cancel()
+                await asyncio.wait(pending)
+                break
+
+        results = []
+        for task in tasks:
+            if task.cancelled():
+                results.append(None)
+            elif task.exception() is not None:
+                error = task.exception()
+                log(f"Network task failed: {error}")
+                traceback.print_exception(type(error), error, error.__traceback__)
+                results.append(None)
+            else:
+                results.append(task.result())
+        return results
+
+
+global_network_engine = NetworkEngine()
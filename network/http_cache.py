@@ -0,0 +1,215 @@
+#  LKInstaller Next, a blazing-speed localization installer for Mir Korabley
+#  Copyright (C) 2025 LocalizedKorabli <localizedkorabli@outlook.com>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import atexit
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+import requests
+
+import atomic_io
+from dirs import CACHE_DIR
+from logger import log
+from network.session import get_session
+
+http_cache_path: Path = CACHE_DIR / 'http_cache.json'
+
+# 版本文件等小型响应的默认有效期 (秒)；服务器给出 Cache-Control: max-age 时以其为准
+DEFAULT_TTL = 300
+# 只缓存不超过该大小的响应正文
+MAX_BODY_SIZE = 64 * 1024
+# 条目更新后延迟这么久 (秒) 再写入磁盘，期间的多次更新合并为一次写入
+SAVE_DELAY = 2.0
+
+_MAX_AGE_PATTERN = re.compile(r'max-age=(\d+)')
+
+
+def _get_validators(response: requests.Response) -> Dict[str, Optional[str]]:
+    return {
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified')
+    }
+
+
+def _get_ttl(response: requests.Response) -> int:
+    cache_control = response.headers.get('Cache-Control', '')
+    if 'no-store' in cache_control or 'no-cache' in cache_control:
+        return 0
+    match = _MAX_AGE_PATTERN.search(cache_control)
+    return int(match.group(1)) if match else DEFAULT_TTL
+
+
+class HttpValidatorCache:
+    """
+    按 URL 记录 ETag / Last-Modified / 有效期 的磁盘缓存 (http_cache.json)。
+    - 小型文本响应 (版本文件) 连同正文一起缓存，有效期内直接使用，不访问网络；
+    - 过期后发送 If-None-Match / If-Modified-Since，304 即视为命中；
+    - 大文件只记录校验值以及对应的本地文件路径和大小，用于条件请求。
+    """
+
+    def __init__(self, path: Path = http_cache_path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._dirty = False
+        self._save_timer: Optional[threading.Timer] = None
+        self.load()
+        # 退出前写入尚未保存的更新
+        atexit.register(self.flush)
+
+    def load(self):
+        if not self.path.is_file():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self.entries = data
+        except Exception as e:
+            log(f"Failed to load HTTP cache: {e}")
+
+    def flush(self):
+        """立即写入尚未保存的更新 (原子写入，不会留下不完整的文件)。"""
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if not self._dirty:
+                return
+            data = {url: dict(entry) for url, entry in self.entries.items()}
+            self._dirty = False
+        try:
+            os.makedirs(self.path.parent, exist_ok=True)
+            atomic_io.write_json(self.path, data)
+        except OSError as e:
+            log(f"Failed to save HTTP cache: {e}")
+
+    def _schedule_save(self):
+        """(需持有 _lock) 标记有更新，SAVE_DELAY 秒后统一写入。"""
+        self._dirty = True
+        if self._save_timer is None:
+            self._save_timer = threading.Timer(SAVE_DELAY, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def _get_entry(self, url: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self.entries.get(url)
+            return dict(entry) if entry else None
+
+    def _update_entry(self, url: str, entry: Dict[str, Any]):
+        with self._lock:
+            self.entries[url] = entry
+            self._schedule_save()
+
+    @staticmethod
+    def _conditional_headers(entry: Dict[str, Any]) -> Dict[str, str]:
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def get_fresh_text(self, url: str) -> Optional[str]:
+        """返回有效期内的缓存正文；没有或已过期时返回 None。"""
+        entry = self._get_entry(url)
+        if not entry or entry.get('body') is None:
+            return None
+        if time.time() - entry.get('fetched', 0) >= entry.get('ttl', 0):
+            return None
+        return entry['body']
+
+    def get_text(self, url: str, timeout: int, use_fresh: bool = True) -> str:
+        """
+        获取小型文本资源。有效期内直接返回缓存 (use_fresh=False 时总是重新验证)；
+        否则发送条件请求，304 时返回缓存正文。
+        网络错误会以 requests 异常的形式抛出。
+        """
+        if use_fresh:
+            fresh = self.get_fresh_text(url)
+            if fresh is not None:
+                log(f"HTTP cache hit (fresh): {url}")
+                return fresh
+
+        entry = self._get_entry(url)
+        headers = self._conditional_headers(entry) if entry and entry.get('body') is not None else {}
+
+        response = get_session().get(url, timeout=timeout, headers=headers)
+        if response.status_code == 304 and headers:
+            log(f"HTTP cache hit (304): {url}")
+            entry['fetched'] = time.time()
+            entry['ttl'] = _get_ttl(response)
+            self._update_entry(url, entry)
+            return entry['body']
+
+        response.raise_for_status()
+        text = response.text
+        validators = _get_validators(response)
+        if len(text) <= MAX_BODY_SIZE:
+            self._update_entry(url, {
+                **validators,
+                'fetched': time.time(),
+                'ttl': _get_ttl(response),
+                'body': text
+            })
+        return text
+
+    def revalidate_file(self, url: str, dest: Path, timeout: int) -> Tuple[bool, Dict[str, Optional[str]]]:
+        """
+        检查本地文件 dest 是否仍与 url 的远端内容一致。
+        返回 (是否一致, 远端校验值)。不一致时，调用者应在下载成功后使用返回的校验值调用 remember_file；
+        校验值是在下载开始前取得的，因此远端文件在此期间发生变化只会导致下次多下载一次。
+        (使用 Range: bytes=0-0，不一致时也只会传输一个字节)
+        """
+        entry = self._get_entry(url)
+        matches = bool(entry) and entry.get('path') == str(dest) and dest.is_file() \
+            and dest.stat().st_size == entry.get('size')
+
+        headers = {'Range': 'bytes=0-0'}
+        if matches:
+            headers.update(self._conditional_headers(entry))
+
+        with get_session().get(url, stream=True, timeout=timeout, headers=headers) as response:
+            if response.status_code == 304 and matches:
+                log(f"HTTP cache hit (304): {url}")
+                entry['fetched'] = time.time()
+                self._update_entry(url, entry)
+                return True, _get_validators(response)
+            response.raise_for_status()
+            return False, _get_validators(response)
+
+    def remember_file(self, url: str, dest: Path, validators: Dict[str, Optional[str]]):
+        """记录 dest 对应 url 的校验值 (远端没有提供任何校验值时忽略)。"""
+        if not validators.get('etag') and not validators.get('last_modified'):
+            return
+        try:
+            size = dest.stat().st_size
+        except OSError:
+            return
+        self._update_entry(url, {
+            **validators,
+            'fetched': time.time(),
+            'path': str(dest),
+            'size': size
+        })
+
+
+global_http_cache = HttpValidatorCache()
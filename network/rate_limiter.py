@@ -0,0 +1,122 @@
+#  LKInstaller Next, a blazing-speed localization installer for Mir Korabley
+#  Copyright (C) 2025 LocalizedKorabli <localizedkorabli@outlook.com>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import re
+import threading
+import time
+from typing import Callable, Optional
+
+from logger import log
+
+# 令牌桶容量对应的时长 (秒)，允许短时间的突发
+BURST_SECONDS = 0.5
+# 等待令牌时检查取消标志的间隔 (秒)
+WAIT_SLICE = 0.1
+
+_RATE_UNITS = {'': 1, 'K': 1024, 'M': 1024 * 1024, 'G': 1024 * 1024 * 1024}
+_RATE_PATTERN = re.compile(r'^(\d+(?:\.\d+)?)\s*([KMG]?)(?:I?B)?(?:/S)?$')
+
+
+def parse_rate(text: str) -> int:
+    """
+    解析带单位的速率 (例如 "500K"、"2M"、"1.5MB/s"、"0")，返回字节/秒。0 表示不限速。
+    格式无效时抛出 ValueError。
+    """
+    match = _RATE_PATTERN.match(text.strip().upper())
+    if not match:
+        raise ValueError(f"Invalid rate: {text}")
+    return int(float(match.group(1)) * _RATE_UNITS[match.group(2)])
+
+
+class TokenBucket:
+    """
+    线程安全的令牌桶 (1 令牌 = 1 字节)。rate <= 0 表示不限速。
+    取用时允许令牌数暂时为负 (欠账)，调用者按欠账等待，因此大块数据也不会被饿死。
+    """
+
+    def __init__(self, rate: int = 0):
+        self._lock = threading.Lock()
+        self.rate = 0
+        self.capacity = 0.0
+        self._tokens = 0.0
+        self._last = time.monotonic()
+        self.set_rate(rate)
+
+    def set_rate(self, rate: int):
+        with self._lock:
+            self.rate = max(0, int(rate))
+            self.capacity = self.rate * BURST_SECONDS
+            self._tokens = min(self._tokens, self.capacity)
+            self._last = time.monotonic()
+
+    def consume(self, amount: int, is_cancelled: Callable[[], bool] = lambda: False):
+        """取用 amount 个令牌，必要时阻塞等待 (被取消时提前返回)。"""
+        with self._lock:
+            if self.rate <= 0:
+                return
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= amount
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        deadline = time.monotonic() + wait
+        while not is_cancelled():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(min(remaining, WAIT_SLICE))
+
+
+class BandwidthLimiter:
+    """
+    下载共享的限速器。
+    交互式运行与后台运行 (例如 --auto-execute-preset) 分别使用各自的限速设置；
+    命令行指定的 --limit-rate 优先于设置。
+    """
+
+    def __init__(self, background: bool = False):
+        self.bucket = TokenBucket()
+        self.background = background
+        self.override: Optional[int] = None
+
+    def set_background(self, background: bool):
+        self.background = background
+        self.refresh()
+
+    def set_override(self, rate: Optional[int]):
+        self.override = rate
+        self.refresh()
+
+    def refresh(self):
+        """根据当前模式与设置更新限速。"""
+        import settings  # Local import
+        if self.override is not None:
+            rate = self.override
+        else:
+            key = 'download.background_rate_limit' if self.background else 'download.rate_limit'
+            rate = int(settings.global_settings.get(key, 0) or 0) * 1024
+        if rate != self.bucket.rate:
+            log(f"Bandwidth limit: {f'{rate // 1024} KB/s' if rate > 0 else 'unlimited'}"
+                f"{' (background)' if self.background else ''}")
+        self.bucket.set_rate(rate)
+
+    def throttle(self, amount: int, is_cancelled: Callable[[], bool] = lambda: False):
+        self.bucket.consume(amount, is_cancelled)
+
+
+global_bandwidth_limiter = BandwidthLimiter()
+# (新增) 界面运行时的后台下载 (例如预取) 使用独立的令牌桶与后台限速，不影响同时进行的交互式安装
+background_bandwidth_limiter = BandwidthLimiter(background=True)
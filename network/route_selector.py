@@ -0,0 +1,242 @@
+#  LKInstaller Next, a blazing-speed localization installer for Mir Korabley
+#  Copyright (C) 2025 LocalizedKorabli <localizedkorabli@outlook.com>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import asyncio
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Callable, Optional, Tuple, Any, Awaitable
+
+import atomic_io
+from dirs import SETTINGS_DIR
+from logger import log
+
+route_stats_path: Path = SETTINGS_DIR / 'route_stats.json'
+
+# 竞速时，每隔这么久 (秒) 追加启动下一条线路 (前一条失败时立即启动)
+RACE_STAGGER = 0.3
+# 指数滑动平均的权重
+EWMA_ALPHA = 0.3
+# 每次记录时旧样本计数的衰减，使很久以前的失败逐渐被遗忘
+COUNT_DECAY = 0.9
+# 失败率折算成的延迟惩罚 (秒)
+FAILURE_PENALTY = 10.0
+
+
+class RouteSkipped(Exception):
+    """(新增) probe 没有实际访问线路 (例如断路器拒绝)；该线路视为失败，但不计入线路统计。"""
+
+
+class RouteHealth:
+    """
+    记录每条线路的延迟与成功率，并持久化到 route_stats.json。
+    rank() 会根据观测到的表现对线路重新排序，用户配置的顺序只作为先验。
+    """
+
+    def __init__(self, path: Path = route_stats_path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, float]] = {}
+        self.load()
+
+    def load(self):
+        if not self.path.is_file():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self.stats = data
+        except Exception as e:
+            log(f"Failed to load route stats: {e}")
+
+    def save(self):
+        # (已修改) 原子写入：程序中断或多个进程同时保存时不会留下不完整的文件
+        with self._lock:
+            data = {route_id: dict(entry) for route_id, entry in self.stats.items()}
+        try:
+            os.makedirs(self.path.parent, exist_ok=True)
+            atomic_io.write_json(self.path, data)
+        except OSError as e:
+            log(f"Failed to save route stats: {e}")
+
+    def _entry(self, route_id: str) -> Dict[str, float]:
+        entry = self.stats.setdefault(route_id, {'latency': 0.0, 'successes': 0.0, 'failures': 0.0})
+        entry['successes'] *= COUNT_DECAY
+        entry['failures'] *= COUNT_DECAY
+        entry['updated'] = time.time()
+        return entry
+
+    def record_success(self, route_id: str, latency: float):
+        with self._lock:
+            entry = self._entry(route_id)
+            if entry['successes'] + entry['failures'] < 0.5 or entry['latency'] <= 0:
+                entry['latency'] = latency
+            else:
+                entry['latency'] = EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * entry['latency']
+            entry['successes'] += 1
+
+    def record_failure(self, route_id: str):
+        with self._lock:
+            self._entry(route_id)['failures'] += 1
+
+    def score(self, route_id: str) -> Optional[float]:
+        """预估的请求耗时 (秒，越小越好)；没有数据时返回 None。"""
+        with self._lock:
+            entry = self.stats.get(route_id)
+            if not entry or entry.get('successes', 0) + entry.get('failures', 0) < 0.5:
+                return None
+            successes = entry.get('successes', 0)
+            failures = entry.get('failures', 0)
+            success_rate = (successes + 1) / (successes + failures + 2)
+            return entry.get('latency', 0) + (1 - success_rate) * FAILURE_PENALTY
+
+    def rank(self, route_ids: List[str]) -> List[str]:
+        """
+        按观测表现排序。没有数据的线路按其在列表中的位置得到一个先验分数，
+        因此在没有任何统计时结果与原顺序一致。
+        """
+        def _key(item: Tuple[int, str]) -> Tuple[float, int]:
+            index, route_id = item
+            observed = self.score(route_id)
+            prior = 0.5 + 0.1 * index
+            return (observed if observed is not None else prior), index
+
+        return [route_id for _, route_id in sorted(enumerate(route_ids), key=_key)]
+
+
+def race_routes(route_ids: List[str], probe: Callable[[str], Any],
+                is_cancelled: Callable[[], bool] = lambda: False,
+                stagger: float = RACE_STAGGER,
+                health: Optional[RouteHealth] = None) -> Optional[Tuple[str, Any]]:
+    """
+    按顺序错峰启动各线路的 probe(route_id)，返回第一个有效结果 (route_id, value)。
+    - probe 抛出异常：该线路失败，立即启动下一条线路；
+    - probe 返回 None：线路可用但答案不合适 (例如版本不匹配)，同样继续；
+    - probe 抛出 RouteSkipped：线路未被尝试，继续下一条线路，不记录统计；
+    得到结果后，尚未启动的线路会被取消，仍在进行的请求结果会被忽略 (但会计入统计)。
+    """
+    if health is None:
+        health = global_route_health
+    if not route_ids:
+        return None
+
+    results: queue.Queue = queue.Queue()
+    executor = ThreadPoolExecutor(max_workers=len(route_ids))
+
+    def _run(route_id: str):
+        began = time.monotonic()
+        try:
+            value = probe(route_id)
+        except RouteSkipped as e:
+            results.put((route_id, False, e))
+            return
+        except Exception as e:
+            health.record_failure(route_id)
+            results.put((route_id, False, e))
+            return
+        health.record_success(route_id, time.monotonic() - began)
+        results.put((route_id, True, value))
+
+    started = 0
+    finished = 0
+    try:
+        executor.submit(_run, route_ids[0])
+        started = 1
+        while finished < started:
+            if is_cancelled():
+                return None
+            try:
+                route_id, ok, value = results.get(timeout=stagger if started < len(route_ids) else 0.1)
+            except queue.Empty:
+                if started < len(route_ids):
+                    executor.submit(_run, route_ids[started])
+                    started += 1
+                continue
+
+            finished += 1
+            if ok and value is not None:
+                return route_id, value
+
+            if started < len(route_ids):
+                executor.submit(_run, route_ids[started])
+                started += 1
+        return None
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        health.save()
+
+
+async def race_routes_async(route_ids: List[str], probe: Callable[[str], Awaitable[Any]],
+                            stagger: float = RACE_STAGGER,
+                            health: Optional[RouteHealth] = None,
+                            record: bool = True) -> Optional[Tuple[str, Any]]:
+    """
+    race_routes 的协程版本，用于后台网络事件循环中；probe(route_id) 是一个协程函数。
+    规则与 race_routes 相同。得到结果 (或调用者被取消) 时，仍在进行的 probe 会被取消。
+    record 为 False 时不记录线路的延迟与成功率，由 probe 自行记录
+    (例如多个竞速共享同一请求时，该请求只应计入一次)。
+    """
+    if health is None:
+        health = global_route_health
+    if not route_ids:
+        return None
+
+    async def _run(route_id: str) -> Tuple[str, bool, Any]:
+        began = time.monotonic()
+        try:
+            value = await probe(route_id)
+        except asyncio.CancelledError:
+            raise
+        except RouteSkipped as e:
+            return route_id, False, e
+        except Exception as e:
+            if record:
+                health.record_failure(route_id)
+            return route_id, False, e
+        if record:
+            health.record_success(route_id, time.monotonic() - began)
+        return route_id, True, value
+
+    pending = {asyncio.ensure_future(_run(route_ids[0]))}
+    started = 1
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, timeout=stagger if started < len(route_ids) else None,
+                                               return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                pending.add(asyncio.ensure_future(_run(route_ids[started])))
+                started += 1
+                continue
+
+            for future in done:
+                route_id, ok, value = future.result()
+                if ok and value is not None:
+                    return route_id, value
+                if started < len(route_ids):
+                    pending.add(asyncio.ensure_future(_run(route_ids[started])))
+                    started += 1
+        return None
+    finally:
+        for future in pending:
+            future.cancel()
+        health.save()
+
+
+global_route_health = RouteHealth()
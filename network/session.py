@@ -0,0 +1,78 @@
+#  LKInstaller Next, a blazing-speed localization installer for Mir Korabley
+#  Copyright (C) 2025 LocalizedKorabli <localizedkorabli@outlook.com>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import json
+import threading
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from logger import log
+
+# 连接池中最多保留多少个主机的连接
+POOL_HOSTS = 16
+# 每个主机的最大并发连接数 (超出时请求会等待空闲连接，而不是新建连接)
+POOL_MAXSIZE_PER_HOST = 8
+
+_session_lock = threading.Lock()
+_session: Optional['PooledSession'] = None
+_session_proxy_key: Optional[str] = None
+
+
+class PooledSession(requests.Session):
+    """
+    进程内共享的 requests 会话。
+    按主机复用 keep-alive 连接 (省去重复的 DNS / TCP / TLS 握手)，并限制每个主机的并发连接数。
+    代理设置在创建时解析一次，调用者无需再传入 proxies。
+    """
+
+    def __init__(self, proxies: Optional[Dict[str, str]]):
+        super().__init__()
+        self.configured_proxies = proxies
+
+        adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=POOL_MAXSIZE_PER_HOST, pool_block=True)
+        self.mount('http://', adapter)
+        self.mount('https://', adapter)
+
+    def request(self, method, url, **kwargs):
+        # (与之前逐次传入 proxies 的行为保持一致：'system' 模式为 None，交给 requests 自动检测)
+        if kwargs.get('proxies') is None and self.configured_proxies is not None:
+            kwargs['proxies'] = self.configured_proxies
+        return super().request(method, url, **kwargs)
+
+
+def _get_proxy_settings_key() -> str:
+    import settings  # Local import
+    return json.dumps(settings.global_settings.get('proxy', {}), sort_keys=True)
+
+
+def get_session() -> PooledSession:
+    """
+    获取共享会话 (线程安全)。
+    仅当代理设置发生变化时才会重建连接池。
+    """
+    global _session, _session_proxy_key
+    from utils import get_configured_proxies  # Local import
+
+    proxy_key = _get_proxy_settings_key()
+    with _session_lock:
+        if _session is None or proxy_key != _session_proxy_key:
+            if _session is not None:
+                log("Proxy settings changed, rebuilding HTTP connection pool")
+            # (旧会话上可能仍有进行中的请求，交由垃圾回收关闭)
+            _session = PooledSession(get_configured_proxies())
+            _session_proxy_key = proxy_key
+        return _session
@@ -0,0 +1,118 @@
+#  LKInstaller Next, a blazing-speed localization installer for Mir Korabley
+#  Copyright (C) 2025 LocalizedKorabli <localizedkorabli@outlook.com>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import threading
+import time
+from collections import deque
+from typing import Optional, Iterable
+
+# 计算平均速度所用的时间窗口 (秒)
+SPEED_WINDOW = 5.0
+# 采样间隔 (秒)：界面与日志按该频率刷新，而不是每收到一个数据块就刷新
+SAMPLE_INTERVAL = 0.5
+
+
+def format_size(size: float) -> str:
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.2f} GB"
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds + 0.5)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+class TransferSnapshot:
+    """某一时刻的传输状态。"""
+
+    def __init__(self, received: int, total: Optional[int], speed: float):
+        self.received = received
+        self.total = total
+        self.speed = speed  # 字节/秒 (时间窗口内的平均值)
+
+    @property
+    def fraction(self) -> Optional[float]:
+        if not self.total:
+            return None
+        return min(1.0, self.received / self.total)
+
+    @property
+    def eta(self) -> Optional[float]:
+        if not self.total or self.speed <= 0:
+            return None
+        return max(0.0, (self.total - self.received) / self.speed)
+
+    def format(self) -> str:
+        """例如 "3.2 MB / 10.0 MB (1.5 MB/s, 0:05)"；不含本地化文字，供日志使用。"""
+        speed = f"{format_size(self.speed)}/s"
+        if not self.total:
+            return f"{format_size(self.received)} ({speed})"
+        eta = format_duration(self.eta) if self.eta is not None else '--:--'
+        return f"{format_size(self.received)} / {format_size(self.total)} ({speed}, {eta})"
+
+
+def combine(snapshots: Iterable[TransferSnapshot]) -> TransferSnapshot:
+    """合并多个传输 (例如同一任务依赖的 MO、EE 与字体下载)。"""
+    snapshots = list(snapshots)
+    totals = [s.total for s in snapshots]
+    total = sum(totals) if totals and all(totals) else None
+    return TransferSnapshot(sum(s.received for s in snapshots), total, sum(s.speed for s in snapshots))
+
+
+class TransferStats:
+    """
+    (线程安全) 单个下载作业的字节计数。
+    下载线程调用 begin() / add() / finish()，界面或日志按固定间隔调用 sample()。
+    续传时已有的字节计入 received，但不计入速度。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.received = 0
+        self.total: Optional[int] = None
+        self.active = False
+        self._samples: deque = deque()
+
+    def begin(self, total: Optional[int], already: int = 0):
+        with self._lock:
+            self.total = total
+            self.received = already
+            self.active = True
+            self._samples.clear()
+            self._samples.append((time.monotonic(), already))
+
+    def add(self, amount: int):
+        with self._lock:
+            self.received += amount
+
+    def finish(self):
+        with self._lock:
+            self.active = False
+
+    def sample(self) -> TransferSnapshot:
+        with self._lock:
+            now = time.monotonic()
+            self._samples.append((now, self.received))
+            while len(self._samples) > 2 and now - self._samples[0][0] > SPEED_WINDOW:
+                self._samples.popleft()
+            oldest_time, oldest_bytes = self._samples[0]
+            elapsed = now - oldest_time
+            speed = (self.received - oldest_bytes) / elapsed if elapsed > 0 else 0.0
+            return TransferSnapshot(self.received, self.total, speed)
@@ -94,6 +94,34 @@ class GlobalSettings:
                 'user': '',
                 'password': ''
             },
+            'download': {
+                'segments': 4,
+                'striping': True,
+                # 限速 (KB/s，0 表示不限速)；后台运行 (--auto-execute-preset) 使用 background_rate_limit
+                'rate_limit': 0,
+                'background_rate_limit': 0,
+                # 缓存提交时的落盘策略: 'full' / 'metadata' / 'none' (见 atomic_io)
+                'fsync': 'full'
+            },
+            # 局域网缓存服务器 (运行 --serve-cache 的电脑) 的地址，例如 '192.168.1.10:18765'；留空则不使用
+            'lan': {
+                'peer': ''
+            },
+            # 下载缓存的容量上限 (MB，0 表示不限制)，超出时按最近使用时间淘汰 (见 cache_manager)；
+            # 命中缓存时按指纹信任数据文件，每隔 verify_interval_days 天重新计算一次完整哈希 (0 表示从不)
+            'cache': {
+                'max_size_mb': 0,
+                'verify_interval_days': 30
+            },
+            # 后台预取 (默认关闭)：启用后界面空闲时每隔 interval_minutes 分钟检查已登记实例所用语言的新子版本并下载到缓存
+            'prefetch': {
+                'enabled': False,
+                'interval_minutes': 60
+            },
+            # 并发计算文件哈希的线程数 (0 表示自动；机械硬盘上可以设为 1)
+            'hashing': {
+                'workers': 0
+            },
             'ever_launched': False,
             'download_routes_priority': default_route_priority,
             'checked_instance_ids': []
@@ -135,6 +163,21 @@ class GlobalSettings:
         if 'proxy' in saved_data:
             self.data['proxy'].update(saved_data.get('proxy', {}))
 
+        if 'download' in saved_data:
+            self.data['download'].update(saved_data.get('download', {}))
+
+        if 'lan' in saved_data:
+            self.data['lan'].update(saved_data.get('lan', {}))
+
+        if 'cache' in saved_data:
+            self.data['cache'].update(saved_data.get('cache', {}))
+
+        if 'prefetch' in saved_data:
+            self.data['prefetch'].update(saved_data.get('prefetch', {}))
+
+        if 'hashing' in saved_data:
+            self.data['hashing'].update(saved_data.get('hashing', {}))
+
         if 'ever_launched' in saved_data:
             self.data['ever_launched'] = saved_data['ever_launched']
 
@@ -25,6 +25,8 @@ import utils
 from localization_sources import get_route_id_to_name
 from localizer import _
 from logger import log
+from network.circuit_breaker import global_circuit_breaker, STATE_OPEN, STATE_HALF_OPEN
+from network.transfer_stats import format_duration
 
 from tktooltip import ToolTip
 
@@ -164,6 +166,16 @@ class RoutePriorityWindow(BaseDialog):  # <-- 继承 BaseDialog
         ttk.Label(route_frame, text=_('lki.routes.hint'), style="Hint.TLabel", wraplength=utils.scale_dpi(self, 220)) \
             .grid(row=1, column=0, columnspan=3, sticky='w', padx=5, pady=(5, 0))
 
+        # --- (新增：所选线路的断路器状态) ---
+        circuit_frame = ttk.Frame(route_frame)
+        circuit_frame.grid(row=2, column=0, columnspan=3, sticky='ew', padx=5, pady=(5, 0))
+        circuit_frame.columnconfigure(0, weight=1)
+        self.circuit_label = ttk.Label(circuit_frame, text='', wraplength=utils.scale_dpi(self, 220))
+        self.circuit_label.grid(row=0, column=0, sticky='w')
+        self.btn_circuit_reset = ttk.Button(circuit_frame, text=_('lki.routes.circuit.reset'),
+                                            command=self._reset_circuit, state='disabled')
+        self.btn_circuit_reset.grid(row=0, column=1, sticky='e', padx=(5, 0))
+
         # --- (按钮) ---
         button_frame = ttk.Frame(main_frame, padding=(0, 10, 0, 0))
         button_frame.grid(row=1, column=0, columnspan=2, sticky='e')
@@ -192,6 +204,43 @@ class RoutePriorityWindow(BaseDialog):  # <-- 继承 BaseDialog
         for r_id in final_route_ids:
             name = get_route_id_to_name().get(r_id, r_id)
             self.route_listbox.insert('end', name)
+        self._refresh_circuit_states()
+
+    def _get_selected_route_id(self):
+        try:
+            idx = self.route_listbox.curselection()[0]
+        except IndexError:
+            return None
+        name = self.route_listbox.get(idx)
+        return self.route_name_to_id.get(name, name)
+
+    def _refresh_circuit_states(self):
+        """(新增) 按断路器状态为线路着色，并更新所选线路的状态说明。"""
+        colors = {STATE_OPEN: '#d9534f', STATE_HALF_OPEN: '#e0a030'}
+        for idx, name in enumerate(self.route_listbox.get(0, 'end')):
+            state, _retry_in = global_circuit_breaker.get_route_state(self.route_name_to_id.get(name, name))
+            self.route_listbox.itemconfig(idx, foreground=colors.get(state, ''))
+
+        route_id = self._get_selected_route_id()
+        if route_id is None:
+            self.circuit_label.config(text='')
+            self.btn_circuit_reset.config(state='disabled')
+            return
+        state, retry_in = global_circuit_breaker.get_route_state(route_id)
+        if state == STATE_OPEN:
+            text = _('lki.routes.circuit.open') % format_duration(retry_in)
+        elif state == STATE_HALF_OPEN:
+            text = _('lki.routes.circuit.half_open')
+        else:
+            text = _('lki.routes.circuit.closed')
+        self.circuit_label.config(text=_('lki.routes.circuit.status') % text)
+        self.btn_circuit_reset.config(state='normal' if state in colors else 'disabled')
+
+    def _reset_circuit(self):
+        route_id = self._get_selected_route_id()
+        if route_id is not None:
+            global_circuit_breaker.reset(route_id)
+        self._refresh_circuit_states()
 
     def _on_route_listbox_select(self, event=None):
         """更新上/下按钮的状态"""
@@ -205,6 +254,7 @@ class RoutePriorityWindow(BaseDialog):  # <-- 继承 BaseDialog
         except IndexError:
             self.btn_route_up.config(state='disabled')
             self.btn_route_down.config(state='disabled')
+        self._refresh_circuit_states()
 
     def _move_route_up(self):
         try:
@@ -20,13 +20,17 @@ import os  # (新增)
 import sys  # (新增)
 import subprocess  # (新增)
 import shutil  # (新增)
+import threading  # (新增)
 
 import settings
 import logger
+import installation.cache_manager as cache_manager
 from dirs import APP_DATA_PATH, base_path, CACHE_DIR, LOG_DIR
-from localization_sources import global_source_manager, get_route_id_to_name
+from localization_sources import global_source_manager, get_route_id_to_name, LAN_DEFAULT_PORT
 from localizer import _, get_available_languages
 from logger import log
+from network.rate_limiter import global_bandwidth_limiter
+from network.transfer_stats import format_size
 from ui.dialogs import RoutePriorityWindow, BaseDialog
 from ui.tabs.tab_base import BaseTab
 
@@ -143,6 +147,36 @@ class SettingsTab(BaseTab):
                                            command=self._open_route_priority_window)
         self.route_config_btn.grid(row=0, column=1, sticky='e')
 
+        # (新增：限速)
+        rate_limit_label = ttk.Label(download_frame, text=_('lki.settings.rate_limit'))
+        rate_limit_label.grid(row=2, column=0, sticky='e', padx=(0, 10), pady=10)
+
+        rate_limit_frame = ttk.Frame(download_frame)
+        rate_limit_frame.grid(row=2, column=1, sticky='we', pady=10)
+        rate_limit_frame.columnconfigure(0, weight=1)
+
+        self.rate_limit_status_label = ttk.Label(rate_limit_frame, text=self._get_rate_limit_status_text())
+        self.rate_limit_status_label.grid(row=0, column=0, sticky='w', padx=5)
+
+        self.rate_limit_config_btn = ttk.Button(rate_limit_frame, text=_('lki.btn.configure'),
+                                                command=self._open_rate_limit_window)
+        self.rate_limit_config_btn.grid(row=0, column=1, sticky='e')
+
+        # (新增：局域网缓存服务器)
+        lan_peer_label = ttk.Label(download_frame, text=_('lki.settings.lan_peer'))
+        lan_peer_label.grid(row=3, column=0, sticky='e', padx=(0, 10), pady=10)
+
+        lan_peer_frame = ttk.Frame(download_frame)
+        lan_peer_frame.grid(row=3, column=1, sticky='we', pady=10)
+        lan_peer_frame.columnconfigure(0, weight=1)
+
+        self.lan_peer_status_label = ttk.Label(lan_peer_frame, text=self._get_lan_peer_status_text())
+        self.lan_peer_status_label.grid(row=0, column=0, sticky='w', padx=5)
+
+        self.lan_peer_config_btn = ttk.Button(lan_peer_frame, text=_('lki.btn.configure'),
+                                              command=self._open_lan_peer_window)
+        self.lan_peer_config_btn.grid(row=0, column=1, sticky='e')
+
         # --- “文件”设置组 (row=2) ---
         files_frame = ttk.LabelFrame(self, text=_('lki.settings.category.files'), padding=10)
         files_frame.grid(row=2, column=0, sticky='we', pady=5)
@@ -180,9 +214,26 @@ class SettingsTab(BaseTab):
                                    command=lambda: self._open_directory(APP_DATA_PATH))
         data_path_btn.grid(row=0, column=1, sticky='e')
 
+        # (新增：缓存容量上限)
+        cache_limit_label = ttk.Label(files_frame, text=_('lki.settings.cache_limit'))
+        cache_limit_label.grid(row=2, column=0, sticky='e', padx=(0, 10), pady=10)
+
+        cache_limit_frame = ttk.Frame(files_frame)
+        cache_limit_frame.grid(row=2, column=1, sticky='we', pady=10)
+        cache_limit_frame.columnconfigure(0, weight=1)
+
+        # (已修改：统计缓存大小需要扫描所有数据文件，在后台线程中进行)
+        self.cache_limit_status_label = ttk.Label(cache_limit_frame, text=self._get_cache_limit_status_text(None))
+        self.cache_limit_status_label.grid(row=0, column=0, sticky='w', padx=5)
+        self._refresh_cache_limit_status()
+
+        self.cache_limit_config_btn = ttk.Button(cache_limit_frame, text=_('lki.btn.configure'),
+                                                 command=self._open_cache_limit_window)
+        self.cache_limit_config_btn.grid(row=0, column=1, sticky='e')
+
         # 清除按钮
         clear_frame = ttk.Frame(files_frame)
-        clear_frame.grid(row=2, column=0, columnspan=2, sticky='e', pady=(10, 5))
+        clear_frame.grid(row=3, column=0, columnspan=2, sticky='e', pady=(10, 5))
 
         self.clear_logs_btn = ttk.Button(clear_frame, text=_('lki.settings.btn.clear_logs'),
                                          command=self._on_clear_logs)
@@ -258,6 +309,57 @@ class SettingsTab(BaseTab):
     def _on_proxy_config_saved(self):
         self.proxy_status_label.config(text=self._get_proxy_status_text())
 
+    # (新增：限速)
+    def _get_rate_limit_status_text(self):
+        def _format(kbps: int) -> str:
+            return f"{kbps} KB/s" if kbps > 0 else _('lki.settings.rate_limit.unlimited')
+
+        return _('lki.settings.rate_limit.status') % (
+            _format(settings.global_settings.get('download.rate_limit', 0)),
+            _format(settings.global_settings.get('download.background_rate_limit', 0)))
+
+    def _open_rate_limit_window(self):
+        window = RateLimitConfigWindow(self.master.master, self._on_rate_limit_config_saved)
+
+    def _on_rate_limit_config_saved(self):
+        self.rate_limit_status_label.config(text=self._get_rate_limit_status_text())
+        global_bandwidth_limiter.refresh()
+
+    # (新增：局域网缓存服务器)
+    def _get_lan_peer_status_text(self):
+        return settings.global_settings.get('lan.peer', '') or _('lki.settings.lan_peer.none')
+
+    def _open_lan_peer_window(self):
+        window = LanPeerConfigWindow(self.master.master, self._on_lan_peer_config_saved)
+
+    def _on_lan_peer_config_saved(self):
+        self.lan_peer_status_label.config(text=self._get_lan_peer_status_text())
+
+    # (新增：缓存容量上限)
+    def _get_cache_limit_status_text(self, usage):
+        """usage 为 None 时表示仍在统计。"""
+        max_size = cache_manager.get_max_size()
+        limit = format_size(max_size) if max_size else _('lki.settings.cache_limit.unlimited')
+        return _('lki.settings.cache_limit.status') % (format_size(usage) if usage is not None else '...', limit)
+
+    def _refresh_cache_limit_status(self, enforce: bool = False):
+        """(在后台线程中) 按需执行容量管理并统计缓存大小，完成后更新状态文本。"""
+
+        def _worker():
+            if enforce:
+                cache_manager.enforce_budget()
+            usage = cache_manager.get_usage()
+            self.after(0, lambda: self.cache_limit_status_label.config(text=self._get_cache_limit_status_text(usage)))
+
+        threading.Thread(target=_worker, daemon=True).start()
+
+    def _open_cache_limit_window(self):
+        window = CacheLimitConfigWindow(self.master.master, self._on_cache_limit_config_saved)
+
+    def _on_cache_limit_config_saved(self):
+        self.cache_limit_status_label.config(text=self._get_cache_limit_status_text(None))
+        self._refresh_cache_limit_status(enforce=True)
+
     def update_icons(self):
         """当主题更改时更新此选项卡上的图标（如果需要）"""
         pass
@@ -374,6 +476,7 @@ class SettingsTab(BaseTab):
                     log(f"Could not remove item {item}: {e}")
 
             log("Cache cleared.")
+            self._refresh_cache_limit_status()
             messagebox.showinfo(_('lki.settings.clear_cache.confirm.title'),
                                 _('lki.settings.clear_cache.success'), parent=self)
         except Exception as e:
@@ -478,4 +581,153 @@ class ProxyConfigWindow(BaseDialog):
             settings.global_settings.set('proxy.password', password)
 
         self.on_save_callback()
-        self.destroy()
\ No newline at end of file
+        self.destroy()
+
+
+# (新增：限速设置窗口)
+class RateLimitConfigWindow(BaseDialog):
+    def __init__(self, parent, on_save_callback):
+        super().__init__(parent)
+        self.on_save_callback = on_save_callback
+
+        self.title(_('lki.rate_limit.title'))
+
+        self.interactive_var = tk.StringVar(value=str(settings.global_settings.get('download.rate_limit', 0)))
+        self.background_var = tk.StringVar(
+            value=str(settings.global_settings.get('download.background_rate_limit', 0)))
+
+        main_frame = ttk.Frame(self, padding=10)
+        main_frame.pack(fill='both', expand=True)
+
+        limits_frame = ttk.LabelFrame(main_frame, text=_('lki.rate_limit.limits'), padding=10)
+        limits_frame.pack(fill='x', pady=5)
+
+        ttk.Label(limits_frame, text=_('lki.rate_limit.interactive')).grid(row=0, column=0, sticky='w', padx=5, pady=2)
+        ttk.Entry(limits_frame, textvariable=self.interactive_var, width=10).grid(row=0, column=1, sticky='w',
+                                                                                 padx=5, pady=2)
+
+        ttk.Label(limits_frame, text=_('lki.rate_limit.background')).grid(row=1, column=0, sticky='w', padx=5, pady=2)
+        ttk.Entry(limits_frame, textvariable=self.background_var, width=10).grid(row=1, column=1, sticky='w',
+                                                                                padx=5, pady=2)
+
+        ttk.Label(limits_frame, text=_('lki.rate_limit.hint')).grid(row=2, column=0, columnspan=2, sticky='w',
+                                                                   padx=5, pady=(5, 0))
+
+        button_frame = ttk.Frame(main_frame)
+        button_frame.pack(fill='x', pady=(10, 0))
+
+        ttk.Button(button_frame, text=_('lki.btn.save'), command=self._save_settings).pack(side='right')
+        ttk.Button(button_frame, text=_('lki.btn.cancel'), command=self.destroy).pack(side='right', padx=5)
+
+        self.update_idletasks()
+        self.resizable(False, False)
+
+    def _save_settings(self):
+        """保存设置到 settings.global_settings 并关闭窗口"""
+        try:
+            interactive = int(self.interactive_var.get().strip() or 0)
+            background = int(self.background_var.get().strip() or 0)
+            if interactive < 0 or background < 0:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror(_('lki.rate_limit.title'), _('lki.rate_limit.error.invalid'), parent=self)
+            return
+
+        settings.global_settings.set('download.rate_limit', interactive)
+        settings.global_settings.set('download.background_rate_limit', background)
+        settings.global_settings.save()
+
+        self.on_save_callback()
+        self.destroy()
+
+
+class LanPeerConfigWindow(BaseDialog):
+    def __init__(self, parent, on_save_callback):
+        super().__init__(parent)
+        self.on_save_callback = on_save_callback
+
+        self.title(_('lki.lan_peer.title'))
+
+        self.peer_var = tk.StringVar(value=settings.global_settings.get('lan.peer', ''))
+
+        main_frame = ttk.Frame(self, padding=10)
+        main_frame.pack(fill='both', expand=True)
+
+        peer_frame = ttk.LabelFrame(main_frame, text=_('lki.lan_peer.server'), padding=10)
+        peer_frame.pack(fill='x', pady=5)
+
+        ttk.Label(peer_frame, text=_('lki.lan_peer.address')).grid(row=0, column=0, sticky='w', padx=5, pady=2)
+        ttk.Entry(peer_frame, textvariable=self.peer_var, width=24).grid(row=0, column=1, sticky='w', padx=5, pady=2)
+
+        ttk.Label(peer_frame, text=_('lki.lan_peer.hint') % LAN_DEFAULT_PORT, wraplength=320) \
+            .grid(row=1, column=0, columnspan=2, sticky='w', padx=5, pady=(5, 0))
+
+        button_frame = ttk.Frame(main_frame)
+        button_frame.pack(fill='x', pady=(10, 0))
+
+        ttk.Button(button_frame, text=_('lki.btn.save'), command=self._save_settings).pack(side='right')
+        ttk.Button(button_frame, text=_('lki.btn.cancel'), command=self.destroy).pack(side='right', padx=5)
+
+        self.update_idletasks()
+        self.resizable(False, False)
+
+    def _save_settings(self):
+        """保存设置到 settings.global_settings 并关闭窗口"""
+        peer = self.peer_var.get().strip()
+        if any(c.isspace() for c in peer):
+            messagebox.showerror(_('lki.lan_peer.title'), _('lki.lan_peer.error.invalid'), parent=self)
+            return
+
+        settings.global_settings.set('lan.peer', peer)
+        settings.global_settings.save()
+
+        self.on_save_callback()
+        self.destroy()
+
+
+class CacheLimitConfigWindow(BaseDialog):
+    def __init__(self, parent, on_save_callback):
+        super().__init__(parent)
+        self.on_save_callback = on_save_callback
+
+        self.title(_('lki.cache_limit.title'))
+
+        self.max_size_var = tk.StringVar(value=str(settings.global_settings.get('cache.max_size_mb', 0)))
+
+        main_frame = ttk.Frame(self, padding=10)
+        main_frame.pack(fill='both', expand=True)
+
+        limit_frame = ttk.LabelFrame(main_frame, text=_('lki.cache_limit.limits'), padding=10)
+        limit_frame.pack(fill='x', pady=5)
+
+        ttk.Label(limit_frame, text=_('lki.cache_limit.max_size')).grid(row=0, column=0, sticky='w', padx=5, pady=2)
+        ttk.Entry(limit_frame, textvariable=self.max_size_var, width=10).grid(row=0, column=1, sticky='w',
+                                                                            padx=5, pady=2)
+
+        ttk.Label(limit_frame, text=_('lki.cache_limit.hint'), wraplength=320) \
+            .grid(row=1, column=0, columnspan=2, sticky='w', padx=5, pady=(5, 0))
+
+        button_frame = ttk.Frame(main_frame)
+        button_frame.pack(fill='x', pady=(10, 0))
+
+        ttk.Button(button_frame, text=_('lki.btn.save'), command=self._save_settings).pack(side='right')
+        ttk.Button(button_frame, text=_('lki.btn.cancel'), command=self.destroy).pack(side='right', padx=5)
+
+        self.update_idletasks()
+        self.resizable(False, False)
+
+    def _save_settings(self):
+        """保存设置到 settings.global_settings 并关闭窗口"""
+        try:
+            max_size = int(self.max_size_var.get().strip() or 0)
+            if max_size < 0:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror(_('lki.cache_limit.title'), _('lki.rate_limit.error.invalid'), parent=self)
+            return
+
+        settings.global_settings.set('cache.max_size_mb', max_size)
+        settings.global_settings.save()
+
+        self.on_save_callback()
+        self.destroy()
@@ -173,31 +173,31 @@ def copy_with_log(src: Path, dst: Path, *, follow_symlinks=True):
     logger_log(f'Copying {str(src.absolute())} to {str(dst.absolute())}...')
 
 
-def _get_prioritized_update_routes() -> List[Dict[str, str]]:
+def _get_prioritized_update_routes() -> List[Tuple[str, Dict[str, str]]]:
     """
     获取按优先级排序的更新线路列表。
-    列表中的每一项都是一个字典 {'version': url, 'download': url}。
+    列表中的每一项都是 (线路 ID, {'version': url, 'download': url})。
     """
     import settings
     from localization_sources import LKI_UPDATE_ROUTES
+    from network.route_selector import global_route_health
 
     priority_keys = settings.global_settings.get('download_routes_priority', [])
 
-    sorted_routes = []
-    added_keys = set()
+    sorted_keys = []
 
     # 1. 添加设置中指定的优先线路
     for key in priority_keys:
-        if key in LKI_UPDATE_ROUTES and key not in added_keys:
-            sorted_routes.append(LKI_UPDATE_ROUTES[key])
-            added_keys.add(key)
+        if key in LKI_UPDATE_ROUTES and key not in sorted_keys:
+            sorted_keys.append(key)
 
     # 2. 如果设置中遗漏了某些线路，将其补充在最后 (作为安全回退)
-    for key, route in LKI_UPDATE_ROUTES.items():
-        if key not in added_keys:
-            sorted_routes.append(route)
+    for key in LKI_UPDATE_ROUTES:
+        if key not in sorted_keys:
+            sorted_keys.append(key)
 
-    return sorted_routes
+    # 3. 按历史延迟与成功率重新排序
+    return [(key, LKI_UPDATE_ROUTES[key]) for key in global_route_health.rank(sorted_keys)]
 
 
 # --- (NEW) Update Logic ---
@@ -207,7 +207,6 @@ def update_worker(window: ActionProgressWindow, root_tk: tk.Tk):
     支持多线路故障转移 (Fallback)。
     通过检查 window.is_cancelled() 来支持取消。
     """
-    import requests
     import semver
     import constants
     import subprocess
@@ -215,6 +214,10 @@ def update_worker(window: ActionProgressWindow, root_tk: tk.Tk):
     from localizer import _  # 局部导入
     from tkinter import messagebox  # 局部导入
     import settings
+    from network.route_selector import race_routes
+    from network.rate_limiter import global_bandwidth_limiter
+    from network.session import get_session
+    from network.transfer_stats import TransferStats, SAMPLE_INTERVAL
 
     # (新增导入)
     from pathlib import Path
@@ -225,7 +228,8 @@ def update_worker(window: ActionProgressWindow, root_tk: tk.Tk):
     # 辅助函数：安全地更新UI
     ui_log = lambda msg, p: root_tk.after(0, window.update_task_progress, _('lki.update.title'), p, msg)
 
-    def _download_and_run(remote_ver_str: str, proxies: Optional[dict], routes_list: List[Dict[str, str]]):
+    def _download_and_run(remote_ver_str: str,
+                          routes_list: List[Tuple[str, Dict[str, str]]]):
         """
         下载部分，在用户确认后在*新*线程中运行。
         会在 routes_list 中依次尝试下载，直到成功。
@@ -235,9 +239,10 @@ def update_worker(window: ActionProgressWindow, root_tk: tk.Tk):
                 return
 
             download_success = False
+            global_bandwidth_limiter.refresh()
 
             # --- 遍历所有线路进行下载 ---
-            for route in routes_list:
+            for _route_id, route in routes_list:
                 if window.is_cancelled():
                     ui_log(_('lki.install.status.cancelled'), 100)
                     return
@@ -251,11 +256,13 @@ def update_worker(window: ActionProgressWindow, root_tk: tk.Tk):
                     logger_log(f"Attempting update download from: {download_url}")
 
                     # 下载
-                    dl_resp = requests.get(download_url, stream=True, proxies=proxies, timeout=30)
+                    dl_resp = get_session().get(download_url, stream=True, timeout=30)
                     dl_resp.raise_for_status()
 
                     total_size = int(dl_resp.headers.get('content-length', 0))
-                    downloaded = 0
+                    stats = TransferStats()
+                    stats.begin(total_size or None)
+                    last_sample_time = 0.0
 
                     with open(INSTALLER_PATH, 'wb') as f:
                         for chunk in dl_resp.iter_content(chunk_size=8192):
@@ -263,11 +270,18 @@ def update_worker(window: ActionProgressWindow, root_tk: tk.Tk):
                                 ui_log(_('lki.install.status.cancelled'), 100)
                                 return
 
+                            global_bandwidth_limiter.throttle(len(chunk), window.is_cancelled)
                             f.write(chunk)
-                            downloaded += len(chunk)
-                            if total_size > 0:
-                                progress = 20 + (downloaded / total_size) * 70  # 进度从 20% 到 90%
-                                ui_log(_('lki.update.status.downloading'), progress)
+                            stats.add(len(chunk))
+
+                            # (已修改：按固定间隔刷新界面，而不是每个数据块都刷新)
+                            now = time.monotonic()
+                            if now - last_sample_time >= SAMPLE_INTERVAL:
+                                last_sample_time = now
+                                snapshot = stats.sample()
+                                progress = 20 + (snapshot.fraction or 0) * 70  # 进度从 20% 到 90%
+                                ui_log(f"{_('lki.update.status.downloading')} {snapshot.format()}", progress)
+                    stats.finish()
 
                     # 如果代码走到这里，说明下载成功
                     download_success = True
@@ -335,41 +349,43 @@ def update_worker(window: ActionProgressWindow, root_tk: tk.Tk):
     def _check_version_and_ask():
         """检查版本的主逻辑（在初始线程中运行）。"""
         try:
+            dirs.ensure_temp_dir()
             os.makedirs(UPDATE_DIR, exist_ok=True)
             if window.is_cancelled(): return
 
             ui_log(_('lki.update.status.checking'), 10)
-            proxies = get_configured_proxies()
 
             # 获取排序后的线路列表
             update_routes = _get_prioritized_update_routes()
 
             remote_version = None
+            routes_by_id = dict(update_routes)
 
-            # --- 遍历线路查询版本 ---
-            for route in update_routes:
-                if window.is_cancelled(): return
-
-                version_url = route.get('version')
-                if not version_url: continue
-
+            def _probe_version(route_id: str) -> Optional[str]:
+                version_url = routes_by_id[route_id].get('version')
                 try:
                     logger_log(f"Checking version from: {version_url}")
-                    resp = requests.get(version_url, timeout=10, proxies=proxies)
+                    resp = get_session().get(version_url, timeout=10)
                     resp.raise_for_status()
+                    ver_candidate = resp.json().get('version')
+                except Exception as e:
+                    logger_log(f"Version check failed for {version_url}: {e}")
+                    raise
 
-                    data = resp.json()
-                    ver_candidate = data.get('version')
+                if ver_candidate and semver.VersionInfo.is_valid(ver_candidate):
+                    return ver_candidate
+                return None
 
-                    if ver_candidate and semver.VersionInfo.is_valid(ver_candidate):
-                        remote_version = ver_candidate
-                        logger_log(f"Found valid version {remote_version} via {version_url}")
-                        break  # 成功获取，停止尝试其他线路
+            # --- 各线路错峰并发查询版本，取第一个有效结果 ---
+            version_route_ids = [route_id for route_id, route in update_routes if route.get('version')]
+            race_result = race_routes(version_route_ids, _probe_version, window.is_cancelled)
+            if window.is_cancelled(): return
 
-                except Exception as e:
-                    logger_log(f"Version check failed for {version_url}: {e}")
-                    continue
-            # --- 循环结束 ---
+            if race_result:
+                winner_id, remote_version = race_result
+                logger_log(f"Found valid version {remote_version} via {winner_id}")
+                # 最快响应的线路优先用于下载
+                update_routes.sort(key=lambda item: item[0] != winner_id)
 
             if not remote_version:
                 # 所有线路都无法获取版本
@@ -398,7 +414,7 @@ def update_worker(window: ActionProgressWindow, root_tk: tk.Tk):
                         # 在新线程中开始下载，并传入所有的线路列表以供重试
                         threading.Thread(
                             target=_download_and_run,
-                            args=(remote_version, proxies, update_routes),
+                            args=(remote_version, update_routes),
                             daemon=True
                         ).start()
                     else: